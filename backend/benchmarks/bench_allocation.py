@@ -0,0 +1,49 @@
+"""
+Measure the allocation engine's throughput. Its invariants are checked by tests/test_allocation.py.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_allocation
+    python -m benchmarks.bench_allocation --sizes 100000 1000000 10000000
+"""
+import argparse
+import time
+import numpy as np
+from services.allocation import allocate_cents
+
+
+def random_percentages(rng: np.random.Generator, charities: int) -> np.ndarray:
+    """Random two-decimal percentages, some of them zero, like user_charity_preferences rows"""
+    percentages = np.round(rng.uniform(0, 100, size=charities), 2)
+    percentages[rng.random(charities) < 0.15] = 0
+    return percentages
+
+
+def benchmark(sizes, charities_options, repeats: int, seed: int):
+    """Time allocate_cents over large arrays of transactions"""
+    rng = np.random.default_rng(seed)
+
+    for charities in charities_options:
+        percentages = random_percentages(rng, charities)
+        for size in sizes:
+            totals = rng.integers(1, 50_000, size=size, dtype=np.int64)
+            best = float('inf')
+            for _ in range(repeats):
+                started = time.perf_counter()
+                allocate_cents(totals, percentages)
+                best = min(best, time.perf_counter() - started)
+            print(
+                f"charities={charities:<3} transactions={size:<10} "
+                f"best={best * 1000:9.2f} ms  {size / best / 1e6:7.2f} M transactions/s"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Allocation engine micro-benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="Batch sizes to time")
+    parser.add_argument("--charities", type=int, nargs="+", default=[1, 3, 5], help="Charity counts to time")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats per case (best is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.charities, args.repeats, args.seed)
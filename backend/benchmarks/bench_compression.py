@@ -0,0 +1,83 @@
+"""
+Benchmark response compression: bytes saved against CPU spent, per encoding and level.
+
+Uses the same organizations page and stored transaction payloads as bench_json,
+serialized the way the API sends them, plus a small response that stays under
+COMPRESSION_MINIMUM_SIZE to show what skipping it saves.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --transactions 2000 --repeats 10
+"""
+import argparse
+import time
+import zlib
+from config import settings
+from middleware.compression import _Encoder, available_encodings
+from services.json_response import dumps
+from benchmarks.bench_json import organizations_page, transactions_response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+LEVELS = {"gzip": [1, 6, 9], "br": [1, 4, 6, 11], "zstd": [1, 3, 9, 19]}
+
+
+def decompress(encoding: str, data: bytes) -> bytes:
+    if encoding == "br":
+        return brotli.decompress(data)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return zlib.decompress(data, 16 + zlib.MAX_WBITS)
+
+
+def best_time(function, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response compression benchmark")
+    parser.add_argument("--organizations", type=int, default=100, help="Organizations per page (per_page)")
+    parser.add_argument("--transactions", type=int, default=500, help="Transactions per response")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats per case (best is reported)")
+    args = parser.parse_args()
+
+    _, stored = transactions_response(args.transactions, 0)
+    payloads = [
+        ("organizations page", dumps(organizations_page(args.organizations, 0))),
+        ("stored transactions", dumps(stored)),
+        ("small json", dumps({"success": True, "job_id": "job_0123456789abcdef", "status": "queued"})),
+    ]
+
+    for name, body in payloads:
+        print(f"\n{name}: {len(body)} bytes uncompressed")
+        if len(body) < settings.COMPRESSION_MINIMUM_SIZE:
+            print(f"  under COMPRESSION_MINIMUM_SIZE ({settings.COMPRESSION_MINIMUM_SIZE}), sent as-is")
+
+        for encoding in available_encodings(["gzip", "br", "zstd"]):
+            for level in LEVELS[encoding]:
+                compressed = _Encoder(encoding, level).compress_all(body)
+                assert decompress(encoding, compressed) == body, f"{encoding} {level} did not round-trip"
+
+                compress_time = best_time(lambda: _Encoder(encoding, level).compress_all(body), args.repeats)
+                decompress_time = best_time(lambda: decompress(encoding, compressed), args.repeats)
+                saved = len(body) - len(compressed)
+                print(
+                    f"  {encoding:<4} level {level:<2}  {len(compressed):>8} bytes  "
+                    f"saved {saved / len(body):6.1%}  compress {compress_time * 1000:7.3f} ms  "
+                    f"decompress {decompress_time * 1000:6.3f} ms  "
+                    f"{saved / 1024 / max(compress_time * 1000, 1e-6):8.1f} KiB saved per CPU ms"
+                )
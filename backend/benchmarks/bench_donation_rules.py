@@ -0,0 +1,116 @@
+"""
+Benchmark the compiled donation rule evaluator against a per-row Python loop.
+
+Transactions come from the synthetic generator, so merchant, category and amount
+mixes are realistic. Both evaluators must agree before anything is timed.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_donation_rules
+    python -m benchmarks.bench_donation_rules --sizes 1000 10000 100000 --excluded 200
+"""
+import argparse
+import time
+import random
+import numpy as np
+from datetime import date, timedelta
+from services.donation_rules import (
+    PLAID_CATEGORIES, category_codes, compile_rules, evaluate_rules, normalize_merchants
+)
+from services.sandbox_generator import MERCHANT_CATALOG, generate_transactions
+
+
+def realistic_settings(excluded: int, seed: int) -> dict:
+    """A user_settings row with a rule for most categories, some exclusions and a daily cap"""
+    rng = random.Random(seed)
+    catalog_merchants = [merchant[0] for merchant in MERCHANT_CATALOG]
+    return {
+        'auto_donation_percentage': 0.01,
+        'donation_rules': {
+            'category_percentages': {
+                category: round(rng.uniform(0.001, 0.05), 4)
+                for category in rng.sample(PLAID_CATEGORIES, 10)
+            },
+            'excluded_merchants': rng.sample(catalog_merchants, 3) + [f"Merchant {index}" for index in range(excluded)],
+            'daily_cap': 5.0
+        }
+    }
+
+
+def evaluate_naive(user_settings: dict, transactions: list) -> list:
+    """Reference implementation: one Python branch per transaction"""
+    rules = user_settings['donation_rules']
+    excluded = {merchant.strip().lower() for merchant in rules['excluded_merchants']}
+    cap_cents = round(rules['daily_cap'] * 100)
+    donated_by_date = {}
+    cents = []
+    for transaction in transactions:
+        if transaction['amount'] <= 0 or (transaction['merchant_name'] or "").strip().lower() in excluded:
+            cents.append(0)
+            continue
+        category = transaction['personal_finance_category']['primary']
+        percentage = rules['category_percentages'].get(category, user_settings['auto_donation_percentage'])
+        amount = int(np.rint(transaction['amount'] * percentage * 100))
+        donated = donated_by_date.get(transaction['date'], 0)
+        amount = max(0, min(amount, cap_cents - donated))
+        donated_by_date[transaction['date']] = donated + amount
+        cents.append(amount)
+    return cents
+
+
+def evaluate_compiled(user_settings: dict, transactions: list) -> np.ndarray:
+    rules = compile_rules(user_settings)
+    return evaluate_rules(
+        rules,
+        [transaction['amount'] for transaction in transactions],
+        category_codes(transaction['personal_finance_category']['primary'] for transaction in transactions),
+        normalize_merchants(transaction['merchant_name'] for transaction in transactions),
+        [transaction['date'] for transaction in transactions]
+    )
+
+
+def best_time(function, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Donation rule evaluator benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000], help="Transactions per batch")
+    parser.add_argument("--excluded", type=int, default=50, help="Extra excluded merchants in the rule set")
+    parser.add_argument("--repeats", type=int, default=5, help="Timing repeats per case (best is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    user_settings = realistic_settings(args.excluded, args.seed)
+    end = date.today()
+
+    for size in args.sizes:
+        # A week of purchases, so the daily cap is hit on busy days
+        transactions = generate_transactions("bench_user", size, args.seed, end - timedelta(days=6), end)
+
+        compiled = evaluate_compiled(user_settings, transactions)
+        naive = evaluate_naive(user_settings, transactions)
+        assert compiled.tolist() == naive, "Compiled and per-row evaluators disagree"
+
+        amounts = [transaction['amount'] for transaction in transactions]
+        codes = category_codes(transaction['personal_finance_category']['primary'] for transaction in transactions)
+        merchants = normalize_merchants(transaction['merchant_name'] for transaction in transactions)
+        dates = [transaction['date'] for transaction in transactions]
+        rules = compile_rules(user_settings)
+
+        naive_time = best_time(lambda: evaluate_naive(user_settings, transactions), args.repeats)
+        compile_time = best_time(lambda: compile_rules(user_settings), args.repeats)
+        evaluate_time = best_time(lambda: evaluate_rules(rules, amounts, codes, merchants, dates), args.repeats)
+        end_to_end_time = best_time(lambda: evaluate_compiled(user_settings, transactions), args.repeats)
+
+        print(
+            f"transactions={size:<8} donated={int(compiled.sum()) / 100:>10.2f}  "
+            f"per-row={naive_time * 1000:8.2f} ms  compile={compile_time * 1000:6.3f} ms  "
+            f"evaluate={evaluate_time * 1000:7.2f} ms  with-encoding={end_to_end_time * 1000:7.2f} ms  "
+            f"speedup={naive_time / evaluate_time:5.1f}x"
+        )
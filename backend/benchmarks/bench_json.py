@@ -0,0 +1,197 @@
+"""
+Benchmark response serialization: the stdlib JSONResponse path against FastJSONResponse.
+
+Payloads mirror the real responses: an organizations page from Pledge.to with long
+mission text, a transactions_get response deserialized into Plaid models the way
+the SDK returns it, and the locally stored transaction list. Both paths must
+produce the same JSON before anything is timed.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_json
+    python -m benchmarks.bench_json --transactions 5000 --organizations 100
+"""
+import argparse
+import json
+import time
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from plaid.api_client import ApiClient
+from plaid.model.transactions_get_response import TransactionsGetResponse
+from services.json_response import FastJSONResponse
+from services.sandbox_generator import generate_transactions
+
+CAUSES = ["Animals", "Education", "Environment", "Health", "Hunger", "Human Rights", "Disaster Relief"]
+
+
+class _RawResponse:
+    """The minimal urllib3 response surface the Plaid deserializer reads"""
+
+    def __init__(self, body: bytes):
+        self.data = body
+
+    def getheader(self, name, default=None):
+        return "application/json" if name.lower() == "content-type" else default
+
+
+def organizations_page(count: int, seed: int) -> dict:
+    """A Pledge.to organizations page with realistic field sizes"""
+    rng = random.Random(seed)
+    words = "community access support local families clean water children education food relief program".split()
+    return {
+        "results": [
+            {
+                "id": f"org_{index}",
+                "name": f"Organization {index}",
+                "alias": None,
+                "ngo_id": f"{rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}",
+                "mission": " ".join(rng.choice(words) for _ in range(rng.randint(60, 180))),
+                "street1": f"{rng.randint(1, 9999)} Main St",
+                "street2": None,
+                "city": "Springfield",
+                "region": "IL",
+                "postal_code": rng.randint(10000, 99999),
+                "country": "US",
+                "lat": f"{rng.uniform(25, 48):.6f}",
+                "lon": f"{rng.uniform(-123, -70):.6f}",
+                "causes": [
+                    {"id": cause_index, "name": CAUSES[cause_index], "parent_id": None}
+                    for cause_index in rng.sample(range(len(CAUSES)), 3)
+                ],
+                "website_url": f"https://org{index}.example.org",
+                "profile_url": f"https://www.pledge.to/organizations/org_{index}",
+                "logo_url": f"https://cdn.pledge.to/logos/org_{index}.png",
+                "disbursement_type": "pledge",
+                "impact_metrics": [],
+                "sustainable_development_goals": [],
+                "total_raised": Decimal(f"{rng.uniform(0, 1_000_000):.2f}")
+            }
+            for index in range(count)
+        ],
+        "page": 1,
+        "per": count,
+        "total_count": count * 50
+    }
+
+
+def plaid_transaction(transaction: dict) -> dict:
+    """Expand a synthetic transaction into a full transactions_get transaction body"""
+    merchant = transaction['merchant_name']
+    return {
+        **transaction,
+        "amount": transaction['amount'],
+        "date": str(transaction['date']),
+        "unofficial_currency_code": None,
+        "category": None,
+        "category_id": None,
+        "check_number": None,
+        "counterparties": [{
+            "name": merchant,
+            "type": "merchant",
+            "logo_url": f"https://plaid-merchant-logos.plaid.com/{merchant.lower().replace(' ', '_')}.png",
+            "website": f"{merchant.lower().replace(' ', '')}.com",
+            "entity_id": f"entity_{abs(hash(merchant)) % 10 ** 8}",
+            "confidence_level": "VERY_HIGH"
+        }],
+        "datetime": None,
+        "authorized_date": str(transaction['date']),
+        "authorized_datetime": None,
+        "location": {
+            "address": None, "city": None, "region": None, "postal_code": None,
+            "country": None, "lat": None, "lon": None, "store_number": None
+        },
+        "merchant_entity_id": f"entity_{abs(hash(merchant)) % 10 ** 8}",
+        "logo_url": None,
+        "website": None,
+        "payment_meta": {
+            "by_order_of": None, "payee": None, "payer": None, "payment_method": None,
+            "payment_processor": None, "ppd_id": None, "reason": None, "reference_number": None
+        },
+        "payment_channel": "in store",
+        "account_owner": None,
+        "transaction_type": "place",
+        "transaction_code": None,
+        "personal_finance_category": {
+            "primary": transaction['personal_finance_category']['primary'],
+            "detailed": f"{transaction['personal_finance_category']['primary']}_OTHER",
+            "confidence_level": "VERY_HIGH"
+        },
+        "personal_finance_category_icon_url": "https://plaid-category-icons.plaid.com/PFC_GENERAL.png"
+    }
+
+
+def transactions_response(count: int, seed: int) -> tuple:
+    """A transactions_get response as Plaid models, plus the same transactions as stored dicts"""
+    end = date.today()
+    transactions = [
+        plaid_transaction(transaction)
+        for transaction in generate_transactions("bench_user", count, seed, end - timedelta(days=90), end)
+    ]
+    body = {
+        "accounts": [],
+        "transactions": transactions,
+        "total_transactions": count,
+        "item": {
+            "item_id": "item_bench", "webhook": None, "error": None, "available_products": [],
+            "billed_products": ["transactions"], "consent_expiration_time": None,
+            "update_type": "background", "institution_id": "ins_109508"
+        },
+        "request_id": "bench"
+    }
+    model = ApiClient().deserialize(_RawResponse(json.dumps(body).encode()), (TransactionsGetResponse,), True)
+    return model, {"transactions": transactions, "total_transactions": count, "sync": None}
+
+
+def stdlib_render(content) -> bytes:
+    """What a route returning a dict costs today: jsonable_encoder, then json.dumps"""
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def stdlib_render_plaid(model) -> bytes:
+    """What a route returning response.to_dict() costs today"""
+    return stdlib_render(model.to_dict())
+
+
+def fast_render(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def best_time(function, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response serialization benchmark")
+    parser.add_argument("--organizations", type=int, default=100, help="Organizations per page (per_page)")
+    parser.add_argument("--transactions", type=int, default=500, help="Transactions per response")
+    parser.add_argument("--repeats", type=int, default=20, help="Timing repeats per case (best is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    organizations = organizations_page(args.organizations, args.seed)
+    plaid_model, stored = transactions_response(args.transactions, args.seed)
+
+    cases = [
+        ("organizations page", organizations, stdlib_render),
+        ("plaid transactions_get", plaid_model, stdlib_render_plaid),
+        ("stored transactions", stored, stdlib_render),
+    ]
+    for name, content, baseline in cases:
+        expected = json.loads(baseline(content))
+        assert json.loads(fast_render(content)) == expected, f"{name}: serializers disagree"
+
+        baseline_time = best_time(lambda: baseline(content), args.repeats)
+        fast_time = best_time(lambda: fast_render(content), args.repeats)
+        size = len(fast_render(content))
+        print(
+            f"{name:<24} {size / 1024:8.1f} KiB  stdlib={baseline_time * 1000:8.3f} ms  "
+            f"orjson={fast_time * 1000:8.3f} ms  speedup={baseline_time / fast_time:5.1f}x"
+        )
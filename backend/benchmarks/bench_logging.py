@@ -0,0 +1,115 @@
+"""
+Benchmark logging overhead per request: the old synchronous basicConfig
+handler with eager f-strings against the queued JSON handler with lazy
+formatting and sampling.
+
+Each simulated request logs what a recent-donations dashboard call used to:
+route entry and exit, the access token lookup, and the full query result.
+Caller time is what the event loop pays; drain time is how long the
+listener thread takes to write everything afterwards.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --requests 20000
+"""
+import argparse
+import logging
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener
+from logging_config import (
+    JSONFormatter, NonBlockingQueueHandler, SamplingFilter, TraceContextFilter, skip_unused_record_fields
+)
+
+DONATIONS = [
+    {
+        "id": index, "user_id": "user_bench", "charity_id": f"org_{index}", "charity_name": f"Organization {index}",
+        "donation_amount": 0.25, "original_transaction_id": f"txn_{index:08d}", "merchant_name": "Coffee Shop",
+        "transaction_amount": 4.95, "donation_date": "2026-10-01", "created_at": "2026-10-01T12:00:00+00:00"
+    }
+    for index in range(10)
+]
+
+
+def eager_request(route: logging.Logger, supabase: logging.Logger, user_id: str):
+    """The log calls one request made before: f-strings at INFO, including the query result"""
+    route.info(f"Fetching recent donations for user: {user_id}")
+    supabase.info(f"Successfully retrieved access token for user: {user_id}")
+    supabase.info(f"Fetching recent donations for user: {user_id}")
+    supabase.info(f"Query result: {DONATIONS}")
+    supabase.info(f"Found {len(DONATIONS)} recent donations for user {user_id}")
+    route.info(f"Successfully fetched recent donations for user: {user_id}")
+
+
+def lazy_request(route: logging.Logger, supabase: logging.Logger, user_id: str):
+    """The same request now: lazy arguments, no result dump"""
+    route.debug("Fetching recent donations for user: %s", user_id)
+    supabase.info("Retrieved access token for user: %s", user_id)
+    supabase.info("Found %d recent donations for user %s", len(DONATIONS), user_id)
+    route.info("Fetched recent donations for user: %s", user_id)
+
+
+def loggers(prefix: str, handler: logging.Handler):
+    created = []
+    for name in ("routes.plaid", "services.supabase_client"):
+        logger = logging.getLogger(f"{prefix}.{name}")
+        logger.handlers = [handler]
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        created.append(logger)
+    return created
+
+
+def run_sync(requests: int, path: str) -> float:
+    handler = logging.StreamHandler(open(path, "w"))
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    route, supabase = loggers("sync", handler)
+    started = time.perf_counter()
+    for index in range(requests):
+        eager_request(route, supabase, f"user_{index}")
+    elapsed = time.perf_counter() - started
+    handler.close()
+    return elapsed
+
+
+def run_queued(requests: int, path: str, sample_rate: float) -> tuple:
+    output = logging.StreamHandler(open(path, "w"))
+    output.setFormatter(JSONFormatter())
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=requests * 4 + 1))
+    handler.addFilter(SamplingFilter({
+        "queued.routes.plaid": sample_rate,
+        "queued.services.supabase_client": sample_rate
+    }))
+    handler.addFilter(TraceContextFilter())
+    listener = QueueListener(handler.queue, output)
+    route, supabase = loggers("queued", handler)
+
+    listener.start()
+    started = time.perf_counter()
+    for index in range(requests):
+        lazy_request(route, supabase, f"user_{index}")
+    caller = time.perf_counter() - started
+    listener.stop()
+    drained = time.perf_counter() - started
+    output.close()
+    return caller, drained
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument("--requests", type=int, default=10000, help="Simulated requests")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = run_sync(args.requests, f"{directory}/sync.log")
+        print(f"sync basicConfig, eager f-strings  caller={baseline / args.requests * 1e6:7.2f} us/request")
+        skip_unused_record_fields()
+        for rate in (1.0, 0.1):
+            caller, drained = run_queued(args.requests, f"{directory}/queued.log", rate)
+            print(
+                f"queued JSON, lazy, sample {rate:<4}  caller={caller / args.requests * 1e6:7.2f} us/request  "
+                f"with drain={drained / args.requests * 1e6:7.2f} us/request  "
+                f"speedup={baseline / caller:5.1f}x"
+            )
@@ -0,0 +1,84 @@
+"""
+Benchmark instrumentation overhead: an instrumented client call and a request
+through MetricsMiddleware, each against the same thing uninstrumented.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_metrics
+    python -m benchmarks.bench_metrics --calls 200000
+"""
+import argparse
+import asyncio
+import time
+from fastapi import FastAPI
+from middleware.metrics import MetricsMiddleware
+from services.metrics import instrument
+
+
+class _Client:
+    async def get_user_total_donation(self, user_id: str) -> float:
+        return 12.5
+
+
+async def time_calls(client: _Client, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        await client.get_user_total_donation("user_bench")
+    return time.perf_counter() - started
+
+
+async def time_requests(app, calls: int) -> float:
+    scope = {
+        "type": "http", "method": "GET", "path": "/api/v1/total_donation/user_bench",
+        "root_path": "", "query_string": b"", "headers": [], "app": app
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        await app(dict(scope), receive, send)
+    return time.perf_counter() - started
+
+
+def bench_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/total_donation/{user_id}")
+    async def total_donation(user_id: str):
+        return {"user_id": user_id, "total_donation": 12.5}
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Metrics instrumentation overhead benchmark")
+    parser.add_argument("--calls", type=int, default=100000, help="Client calls to time")
+    parser.add_argument("--requests", type=int, default=5000, help="Requests to time")
+    args = parser.parse_args()
+
+    plain, instrumented = _Client(), _Client()
+    instrument(instrumented, "bench")
+    baseline = asyncio.run(time_calls(plain, args.calls))
+    timed = asyncio.run(time_calls(instrumented, args.calls))
+    print(
+        f"client call  plain={baseline / args.calls * 1e6:6.2f} us  "
+        f"instrumented={timed / args.calls * 1e6:6.2f} us  "
+        f"overhead={(timed - baseline) / args.calls * 1e6:6.2f} us/call"
+    )
+
+    plain_app = bench_app()
+    metered_app = bench_app()
+    metered_app.add_middleware(MetricsMiddleware)
+    asyncio.run(time_requests(metered_app, 100))
+    baseline = asyncio.run(time_requests(plain_app, args.requests))
+    timed = asyncio.run(time_requests(metered_app, args.requests))
+    print(
+        f"request      plain={baseline / args.requests * 1e6:6.1f} us  "
+        f"metered={timed / args.requests * 1e6:6.1f} us  "
+        f"overhead={(timed - baseline) / args.requests * 1e6:6.1f} us/request"
+    )
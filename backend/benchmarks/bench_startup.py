@@ -0,0 +1,89 @@
+"""
+Benchmark cold start: time from launching the server to the first successful response.
+
+Each run starts a fresh uvicorn process serving main:app, polls /ping until it
+answers 200 and reports how long that took, so interpreter startup, imports,
+app construction and the lifespan startup are all included. With --max-seconds
+the exit status is non-zero when the median is over budget, which lets CI catch
+a heavy SDK creeping back into the import path.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --runs 10 --max-seconds 3
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(env: Dict[str, str], path: str, timeout: float) -> float:
+    """Start the server and return seconds until path first answers 200"""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}{path}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with {server.returncode}:\n{server.stderr.read().decode()}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.005)
+        raise RuntimeError(f"No response from {url} within {timeout}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to time")
+    parser.add_argument("--path", default="/ping", help="Path polled for the first response")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for each start")
+    parser.add_argument("--max-seconds", type=float, help="Fail when the median time to first request exceeds this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ)
+        env.setdefault("PLEDGE_TO_API_KEY", "bench")
+        env["LOCAL_DB_PATH"] = os.path.join(directory, "bench.db")
+
+        # The first start compiles bytecode; time the ones after it, like a warm container image
+        time_to_first_request(env, args.path, args.timeout)
+        timings = [time_to_first_request(env, args.path, args.timeout) for _ in range(args.runs)]
+
+    median = statistics.median(timings)
+    print(f"Time to first request on {args.path} over {args.runs} runs")
+    print(f"  median {median * 1000:8.1f}ms")
+    print(f"  min    {min(timings) * 1000:8.1f}ms")
+    print(f"  max    {max(timings) * 1000:8.1f}ms")
+
+    if args.max_seconds is not None and median > args.max_seconds:
+        print(f"Median {median:.2f}s is over the {args.max_seconds:.2f}s budget")
+        sys.exit(1)
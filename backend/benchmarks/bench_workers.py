@@ -0,0 +1,112 @@
+"""
+Benchmark throughput as worker processes are added.
+
+For each worker count, starts server.py with WORKERS set, drives it with
+keep-alive clients in separate processes for a fixed time and reports requests
+per second and the speedup over one worker. The default path exercises routing,
+the middleware stack and JSON rendering without touching any upstream service,
+so the numbers reflect how the server itself scales across cores.
+
+The load generator runs on the same machine and takes CPU from the workers;
+expect scaling to flatten once workers plus clients exceed the core count.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_workers
+    python -m benchmarks.bench_workers --workers 1,2,4,8 --clients 16 --duration 10
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+from benchmarks.bench_startup import free_port
+
+
+def client(port: int, path: str, deadline: float) -> int:
+    """Send requests over one keep-alive connection until the deadline; returns how many succeeded"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    completed = 0
+    while time.time() < deadline:
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                completed += 1
+        except (http.client.HTTPException, OSError):
+            # A worker being recycled closes its connections; reconnect
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.close()
+    return completed
+
+
+def measure(workers: int, clients: int, path: str, duration: float, env: Dict[str, str]) -> float:
+    """Requests per second with the given number of workers"""
+    port = free_port()
+    env = dict(env, WORKERS=str(workers), HOST="127.0.0.1", PORT=str(port))
+    server = subprocess.Popen([sys.executable, "server.py"], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.time() + 30
+        while True:
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+                connection.request("GET", "/ping")
+                if connection.getresponse().status == 200:
+                    break
+            except OSError:
+                if time.time() > deadline or server.poll() is not None:
+                    raise RuntimeError(f"Server with {workers} workers did not start")
+                time.sleep(0.05)
+        # Let every worker finish its lifespan startup before timing
+        time.sleep(1.0 + 0.2 * workers)
+
+        with multiprocessing.get_context("fork").Pool(clients) as pool:
+            deadline = time.time() + duration
+            started = time.perf_counter()
+            counts = pool.starmap(client, [(port, path, deadline)] * clients)
+            elapsed = time.perf_counter() - started
+        return sum(counts) / elapsed
+    finally:
+        server.send_signal(signal.SIGTERM)
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+if __name__ == "__main__":
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Worker process scaling benchmark")
+    parser.add_argument(
+        "--workers", default=",".join(str(count) for count in sorted({1, 2, 4, cores}) if count <= max(cores, 2)),
+        help="Comma separated worker counts to compare"
+    )
+    parser.add_argument("--clients", type=int, default=max(4, 2 * cores), help="Concurrent keep-alive clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds of load per worker count")
+    parser.add_argument("--path", default="/", help="Path requested by every client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ)
+        env.setdefault("PLEDGE_TO_API_KEY", "bench")
+        env["LOCAL_DB_PATH"] = os.path.join(directory, "bench.db")
+        # Measure the server, not logging or the limits meant for real clients
+        env.setdefault("RATE_LIMIT_ENABLED", "false")
+        env.setdefault("LOG_LEVEL", "WARNING")
+        env.setdefault("WARM_CLIENTS_ON_STARTUP", "false")
+
+        print(f"{cores} CPU cores, {args.clients} clients, {args.duration:g}s per run, GET {args.path}")
+        print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+        results: List[float] = []
+        for workers in [int(count) for count in args.workers.split(",")]:
+            rate = measure(workers, args.clients, args.path, args.duration, env)
+            results.append(rate)
+            print(f"{workers:>8} {rate:>10.0f} {rate / results[0]:>7.2f}x")
@@ -14,6 +14,109 @@ class Settings:
     PLEDGE_TO_SANDBOX_URL: str = os.getenv("PLEDGE_TO_SANDBOX_URL", "https://api-staging.pledge.to")
     USE_SANDBOX_FOR_DONATIONS: bool = os.getenv("USE_SANDBOX_FOR_DONATIONS", "true").lower() == "true"
     
+    # Plaid API Configuration
+    PLAID_HOST: str = os.getenv("PLAID_HOST", "")  # Overrides the PLAID_ENV host, e.g. a local stand-in for load tests
+    
+    # Plaid Executor Configuration (bulkhead for blocking Plaid SDK calls)
+    PLAID_MAX_WORKERS: int = int(os.getenv("PLAID_MAX_WORKERS", "8"))
+    PLAID_MAX_QUEUE: int = int(os.getenv("PLAID_MAX_QUEUE", "32"))
+    PLAID_QUEUE_TIMEOUT: float = float(os.getenv("PLAID_QUEUE_TIMEOUT", "5.0"))
+    PLAID_SYNC_PAGE_SIZE: int = int(os.getenv("PLAID_SYNC_PAGE_SIZE", "500"))
+    PLAID_TRANSACTIONS_PAGE_SIZE: int = int(os.getenv("PLAID_TRANSACTIONS_PAGE_SIZE", "500"))
+    PLAID_PAGINATION_CONCURRENCY: int = int(os.getenv("PLAID_PAGINATION_CONCURRENCY", "4"))
+    BALANCE_CACHE_MAX_STALENESS: float = float(os.getenv("BALANCE_CACHE_MAX_STALENESS", "60.0"))
+    BALANCE_CACHE_MAX_ENTRIES: int = int(os.getenv("BALANCE_CACHE_MAX_ENTRIES", "10000"))
+    
+    # Plaid Webhook Configuration
+    PLAID_WEBHOOK_URL: str = os.getenv("PLAID_WEBHOOK_URL", "")
+    PLAID_WEBHOOK_VERIFY: bool = os.getenv("PLAID_WEBHOOK_VERIFY", "true").lower() == "true"
+    WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", "2"))
+    WEBHOOK_QUEUE_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+    
+    # Donation Settlement Configuration (micro-donations accrue locally, then settle to Pledge.to)
+    DONATION_SETTLEMENT_THRESHOLD_CENTS: int = int(os.getenv("DONATION_SETTLEMENT_THRESHOLD_CENTS", "500"))
+    DONATION_SETTLEMENT_WINDOW_HOURS: float = float(os.getenv("DONATION_SETTLEMENT_WINDOW_HOURS", "168"))
+    DONATION_SETTLEMENT_TIME: str = os.getenv("DONATION_SETTLEMENT_TIME", "02:00")  # Daily run, HH:MM UTC
+    DONATION_SETTLEMENT_CONCURRENCY: int = int(os.getenv("DONATION_SETTLEMENT_CONCURRENCY", "8"))
+    
+    # Donation Dedupe Configuration (Bloom filter of already donated transactions)
+    DONATION_DEDUPE_CAPACITY: int = int(os.getenv("DONATION_DEDUPE_CAPACITY", "1000000"))
+    DONATION_DEDUPE_ERROR_RATE: float = float(os.getenv("DONATION_DEDUPE_ERROR_RATE", "0.001"))
+    
+    # Job Queue Configuration (durable background processing of auto-donations)
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "2.0"))
+    JOB_POLL_INTERVAL_SECONDS: float = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1.0"))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "60.0"))  # Renewed while the job runs
+    
+    # Response Compression Configuration (negotiated from Accept-Encoding)
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))  # Bytes; smaller bodies are sent as-is
+    COMPRESSION_ENCODINGS: str = os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip")  # Server preference on ties
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    COMPRESSION_ZSTD_LEVEL: int = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+    
+    # Rate Limit Configuration (per user and route; in-memory, so limits apply per worker process)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_REQUESTS: int = int(os.getenv("RATE_LIMIT_REQUESTS", "120"))  # Default per window for each route
+    RATE_LIMIT_WINDOW_SECONDS: float = float(os.getenv("RATE_LIMIT_WINDOW_SECONDS", "60"))
+    RATE_LIMIT_ROUTES: str = os.getenv(
+        "RATE_LIMIT_ROUTES",
+        "/api/v1/balance=10/60,/api/v1/transactions/get_transactions=20/60,"
+        "/api/v1/transactions/stream_transactions=10/60,/api/v1/transactions/auto_donate=20/60,"
+        "/api/v1/transactions/auto_donate_batch=5/60,/api/v1/donations=20/60"
+    )  # Overrides as "route=requests/seconds", comma separated
+    RATE_LIMIT_EXEMPT_PATHS: str = os.getenv("RATE_LIMIT_EXEMPT_PATHS", "/,/health,/ready,/ping,/api/v1/webhooks/plaid")
+    CONCURRENCY_LIMIT_DEFAULT: int = int(os.getenv("CONCURRENCY_LIMIT_DEFAULT", "4"))  # In-flight requests per user and route
+    CONCURRENCY_LIMIT_ROUTES: str = os.getenv(
+        "CONCURRENCY_LIMIT_ROUTES",
+        "/api/v1/balance=2,/api/v1/transactions/stream_transactions=1,/api/v1/transactions/auto_donate_batch=1"
+    )  # Overrides as "route=count", comma separated
+    
+    # Metrics Configuration (Prometheus exposition at /metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    METRICS_LOOP_LAG_INTERVAL_SECONDS: float = float(os.getenv("METRICS_LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+    PROMETHEUS_MULTIPROC_DIR: str = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")  # Worker metric files; a temporary directory when unset
+    
+    # Tracing Configuration (W3C traceparent, spans around upstream calls)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    TRACING_SAMPLE_RATE: float = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))  # For requests without a traceparent
+    TRACING_EXPORTERS: str = os.getenv("TRACING_EXPORTERS", "ring")  # Comma separated: ring, log
+    TRACING_BUFFER_SIZE: int = int(os.getenv("TRACING_BUFFER_SIZE", "1000"))  # Recent traces kept for /debug/traces
+    TRACING_MAX_SPANS_PER_TRACE: int = int(os.getenv("TRACING_MAX_SPANS_PER_TRACE", "256"))
+    TRACING_DEBUG_ENDPOINT: bool = os.getenv("TRACING_DEBUG_ENDPOINT", "false").lower() == "true"
+    
+    # Logging Configuration (queued, non-blocking; tokens and emails are redacted)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # json or text
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()  # DEBUG=true overrides to DEBUG
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records beyond this are dropped, not waited on
+    LOG_SAMPLING: str = os.getenv(
+        "LOG_SAMPLING",
+        "services.supabase_client=0.1,routes.organizations=0.1,routes.plaid=0.1"
+    )  # Share of INFO-and-below records kept per logger, as "logger=rate"
+    
+    # Startup Configuration (the Plaid and Supabase SDKs are imported on first use)
+    WARM_CLIENTS_ON_STARTUP: bool = os.getenv("WARM_CLIENTS_ON_STARTUP", "true").lower() == "true"  # Build them in the background once serving
+    
+    # Worker Process Configuration (production server, see server.py)
+    WORKERS: int = int(os.getenv("WORKERS", "1"))  # 0 = one per CPU core
+    WORKER_MAX_REQUESTS: int = int(os.getenv("WORKER_MAX_REQUESTS", "0"))  # Recycle a worker after this many requests, 0 = never
+    WORKER_MAX_REQUESTS_JITTER: int = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", "0"))  # Up to this many more, so workers recycle at different times
+    WORKER_GRACEFUL_TIMEOUT: float = float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30"))  # Seconds a stopping worker has to finish requests
+    
+    # Shutdown Configuration (graceful drain on SIGTERM)
+    SHUTDOWN_DRAIN_DELAY_SECONDS: float = float(os.getenv("SHUTDOWN_DRAIN_DELAY_SECONDS", "5"))  # /ready fails this long before new connections are refused
+    SHUTDOWN_TIMEOUT_SECONDS: float = float(os.getenv("SHUTDOWN_TIMEOUT_SECONDS", "25"))  # Deadline for donation writes and background work after requests finish
+    
+    # Shared Cache Configuration (one shared-memory segment for all worker processes)
+    SHARED_CACHE_SIZE_MB: int = int(os.getenv("SHARED_CACHE_SIZE_MB", "64"))
+    SHARED_CACHE_MAX_ENTRIES: int = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "16384"))
+    ORGANIZATION_CACHE_TTL_SECONDS: float = float(os.getenv("ORGANIZATION_CACHE_TTL_SECONDS", "300"))
+    
+    # Local Storage Configuration (SQLite database for synced transactions)
+    LOCAL_DB_PATH: str = os.getenv("LOCAL_DB_PATH", "buy4good.db")
+    
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
@@ -0,0 +1,382 @@
+"""
+Load test: boot the API against the upstream stand-ins and drive a traffic mix at a target rate.
+
+Starts loadtest.upstreams and server.py as subprocesses, then sends requests on
+an open-loop schedule. Arrivals do not wait for earlier responses, so a server
+that cannot keep up builds a queue instead of quietly lowering the rate, and
+latency is measured from each request's scheduled start, so time spent waiting
+for a connection counts. The report gives p50/p95/p99 latency, throughput and
+error rate per endpoint and overall, how long the auto-donation jobs took to
+finish and the calls each upstream received.
+
+Save a run as a baseline and compare later runs against it. With --compare the
+exit status is non-zero when latency, throughput or the error rate regress by
+more than the tolerance.
+
+The load generator, the stand-ins and the API share the machine's cores; compare
+runs from the same machine rather than reading the numbers as absolute capacity.
+
+Run from the backend directory:
+
+    python -m loadtest.run --scenario dashboard --rps 50 --duration 30
+    python -m loadtest.run --scenario auto_donate --rps 20 --save loadtest/baseline.json
+    python -m loadtest.run --scenario mixed --rps 40 --workers 2 --compare loadtest/baseline.json
+    python -m loadtest.run --plaid "latency=400,p99=3000,errors=0.05"   # a degraded Plaid
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+from benchmarks.bench_startup import free_port
+from loadtest.scenarios import API, SCENARIOS, PlannedRequest, Scenario, Traffic
+from loadtest.upstreams import PLAID_CLIENT_ID, PLAID_SECRET, SUPABASE_KEY, FaultProfile, add_arguments, charity_ids, user_ids
+
+# (label, status or None when the request failed outright, seconds from scheduled start, response body if kept)
+Result = Tuple[str, Optional[int], float, Optional[Dict[str, Any]]]
+
+# Latency changes smaller than this are noise, whatever the relative change
+NOISE_FLOOR_MS = 5.0
+# Endpoints with fewer measured requests than this are not compared against the baseline
+MIN_COMPARED_REQUESTS = 50
+
+
+def wait_for(url: str, process: subprocess.Popen, timeout: float, log_path: str):
+    """Poll url until it answers 200, failing if the process exits first"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    with open(log_path) as log:
+        tail = log.read()[-4000:]
+    raise RuntimeError(f"{url} did not come up within {timeout:g}s:\n{tail}")
+
+
+def stop(process: subprocess.Popen):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def api_environment(upstream_url: str, port: int, workers: int, directory: str) -> Dict[str, str]:
+    """Environment that points the API at the stand-ins"""
+    env = dict(os.environ)
+    env.update({
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "WORKERS": str(workers),
+        "DEBUG": "false",
+        "PLEDGE_TO_API_KEY": "loadtest",
+        "PLEDGE_TO_SANDBOX_API_KEY": "loadtest",
+        "PLEDGE_TO_BASE_URL": upstream_url,
+        "PLEDGE_TO_SANDBOX_URL": upstream_url,
+        "PLAID_HOST": upstream_url,
+        "PLAID_ENV": "sandbox",
+        "PLAID_CLIENT_ID": PLAID_CLIENT_ID,
+        "PLAID_SECRET": PLAID_SECRET,
+        "SUPABASE_URL": upstream_url,
+        "SUPABASE_SERVICE_ROLE_KEY": SUPABASE_KEY,
+        "LOCAL_DB_PATH": os.path.join(directory, "loadtest.db"),
+        "SHUTDOWN_DRAIN_DELAY_SECONDS": "0"
+    })
+    # Every simulated user would otherwise share one client address and hit the limits meant for real clients
+    env.setdefault("RATE_LIMIT_ENABLED", "false")
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+async def send(client: httpx.AsyncClient, request: PlannedRequest, scheduled: float, keep_body: bool) -> Result:
+    try:
+        response = await client.request(request.method, request.path, json=request.body)
+        latency = time.perf_counter() - scheduled
+        body = response.json() if keep_body and response.status_code == 202 else None
+        return request.label, response.status_code, latency, body
+    except httpx.HTTPError:
+        return request.label, None, time.perf_counter() - scheduled, None
+
+
+async def drive(
+    base_url: str,
+    scenario: Scenario,
+    rps: float,
+    duration: float,
+    warmup: float,
+    connections: int,
+    timeout: float,
+    poisson: bool
+) -> Tuple[List[Result], float]:
+    """
+    Send requests at rps for warmup + duration seconds
+
+    Returns:
+        Results of the requests scheduled after the warmup, and the 99th
+        percentile of how late the generator sent requests
+    """
+    rng = scenario.traffic.rng
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    tasks: List[asyncio.Task] = []
+    measured_tasks: List[asyncio.Task] = []
+    lateness: List[float] = []
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        started = time.perf_counter()
+        offset = 0.0
+        while offset < warmup + duration:
+            scheduled = started + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            measured = offset >= warmup
+            if measured:
+                lateness.append(max(0.0, time.perf_counter() - scheduled))
+            task = asyncio.create_task(send(client, scenario.next_request(), scheduled, keep_body=measured))
+            tasks.append(task)
+            if measured:
+                measured_tasks.append(task)
+            offset += rng.expovariate(rps) if poisson else 1 / rps
+        await asyncio.gather(*tasks)
+    results = [task.result() for task in measured_tasks]
+    return results, float(np.percentile(lateness, 99)) if lateness else 0.0
+
+
+async def wait_for_jobs(base_url: str, job_ids: List[str], timeout: float) -> Dict[str, Any]:
+    """Poll the jobs until they finish; report outcomes and queued-to-finished latency"""
+    statuses: Dict[str, Dict[str, Any]] = {}
+    started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=base_url, timeout=10) as client:
+        pending = list(job_ids)
+        while pending and time.perf_counter() - started < timeout:
+            responses = await asyncio.gather(
+                *(client.get(f"{API}/jobs/{job_id}") for job_id in pending),
+                return_exceptions=True
+            )
+            for job_id, response in zip(pending, responses):
+                if isinstance(response, httpx.Response) and response.status_code == 200:
+                    statuses[job_id] = response.json()
+            pending = [job_id for job_id in pending if statuses.get(job_id, {}).get("status") not in ("succeeded", "dead")]
+            if pending:
+                await asyncio.sleep(0.5)
+
+    latencies = [
+        (datetime.fromisoformat(job["updated_at"]) - datetime.fromisoformat(job["created_at"])).total_seconds() * 1000
+        for job in statuses.values() if job.get("status") == "succeeded"
+    ]
+    return {
+        "sampled": len(job_ids),
+        "succeeded": sum(1 for job in statuses.values() if job.get("status") == "succeeded"),
+        "dead": sum(1 for job in statuses.values() if job.get("status") == "dead"),
+        "unfinished": len(pending),
+        "drained_after_s": round(time.perf_counter() - started, 2),
+        **percentiles(latencies)
+    }
+
+
+def percentiles(latencies_ms: List[float]) -> Dict[str, float]:
+    if not latencies_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 2),
+        "p95_ms": round(float(p95), 2),
+        "p99_ms": round(float(p99), 2),
+        "max_ms": round(float(max(latencies_ms)), 2)
+    }
+
+
+def summarize(results: List[Result], duration: float) -> Dict[str, Any]:
+    """Latency percentiles, throughput and error rate overall and per endpoint"""
+    def summary(rows: List[Result]) -> Dict[str, Any]:
+        errors: Dict[str, int] = {}
+        for _, status, _, _ in rows:
+            if status is None or status >= 400:
+                key = str(status) if status is not None else "failed"
+                errors[key] = errors.get(key, 0) + 1
+        return {
+            "requests": len(rows),
+            "throughput_rps": round(sum(1 for row in rows if row[1] is not None and row[1] < 400) / duration, 2),
+            "error_rate": round(sum(errors.values()) / len(rows), 4) if rows else 0.0,
+            "errors": errors,
+            **percentiles([latency * 1000 for _, _, latency, _ in rows])
+        }
+
+    by_label: Dict[str, List[Result]] = {}
+    for row in results:
+        by_label.setdefault(row[0], []).append(row)
+    return {
+        "overall": summary(results),
+        "endpoints": {label: summary(rows) for label, rows in sorted(by_label.items())}
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(
+        f"\n{report['scenario']} at {report['rps']:g} req/s for {report['duration']:g}s, "
+        f"{report['workers']} worker(s), generator p99 lateness {report['generator_lateness_p99_ms']:.1f}ms"
+    )
+    print(f"{'endpoint':<52} {'requests':>8} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = list(report["endpoints"].items()) + [("all", report["overall"])]
+    for label, row in rows:
+        print(
+            f"{label:<52} {row['requests']:>8} {row['throughput_rps']:>7.1f} {row['error_rate'] * 100:>6.2f}% "
+            f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['max_ms']:>8.1f}"
+        )
+    failed = report["overall"]["errors"]
+    if failed:
+        print("errors by status: " + ", ".join(f"{status}: {count}" for status, count in sorted(failed.items())))
+    jobs = report.get("jobs")
+    if jobs:
+        print(
+            f"auto-donate jobs: {jobs['succeeded']} succeeded, {jobs['dead']} dead, {jobs['unfinished']} unfinished "
+            f"of {jobs['sampled']} sampled, drained {jobs['drained_after_s']:.1f}s after the run; "
+            f"queued to done p50 {jobs['p50_ms']:.0f}ms, p95 {jobs['p95_ms']:.0f}ms, p99 {jobs['p99_ms']:.0f}ms"
+        )
+    for name, upstream in report.get("upstreams", {}).items():
+        calls = ", ".join(f"{label} {count}" for label, count in upstream["calls"].items())
+        print(f"{name} ({upstream['profile']}): {upstream['errors']} injected errors; {calls}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of report against baseline, as readable lines"""
+    regressions = []
+    if (report["scenario"], report["rps"]) != (baseline["scenario"], baseline["rps"]):
+        print(f"Warning: baseline ran {baseline['scenario']} at {baseline['rps']:g} req/s")
+
+    def check(label: str, current: Dict[str, Any], previous: Dict[str, Any]):
+        for key in ("p95_ms", "p99_ms"):
+            if current[key] > previous[key] * (1 + tolerance) and current[key] - previous[key] > NOISE_FLOOR_MS:
+                regressions.append(f"{label} {key} {previous[key]:.1f} -> {current[key]:.1f}")
+        if current["error_rate"] > previous["error_rate"] + 0.01:
+            regressions.append(f"{label} error rate {previous['error_rate']:.2%} -> {current['error_rate']:.2%}")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{label} throughput {previous['throughput_rps']:.1f} -> {current['throughput_rps']:.1f} req/s")
+
+    check("all", report["overall"], baseline["overall"])
+    for label, current in report["endpoints"].items():
+        previous = baseline["endpoints"].get(label)
+        if previous and min(current["requests"], previous["requests"]) >= MIN_COMPARED_REQUESTS:
+            check(label, current, previous)
+    return regressions
+
+
+def run(args: argparse.Namespace, directory: str) -> Dict[str, Any]:
+    """Boot the stand-ins and the API unless --target is given, drive the load and build the report"""
+    processes: List[subprocess.Popen] = []
+    target = args.target
+    upstream_url = args.upstream
+    try:
+        if target is None:
+            if upstream_url is None:
+                upstream_port = free_port()
+                upstream_url = f"http://127.0.0.1:{upstream_port}"
+                log_path = os.path.join(directory, "upstreams.log")
+                with open(log_path, "w") as log:
+                    processes.append(subprocess.Popen([
+                        sys.executable, "-m", "loadtest.upstreams", "--port", str(upstream_port),
+                        "--users", str(args.users), "--charities", str(args.charities), "--seed", str(args.seed),
+                        "--pledge", args.pledge, "--plaid", args.plaid, "--supabase", args.supabase
+                    ], stdout=log, stderr=subprocess.STDOUT))
+                wait_for(f"{upstream_url}/_stats", processes[-1], 30, log_path)
+
+            port = free_port()
+            target = f"http://127.0.0.1:{port}"
+            log_path = os.path.join(directory, "api.log")
+            with open(log_path, "w") as log:
+                processes.append(subprocess.Popen(
+                    [sys.executable, "server.py"],
+                    env=api_environment(upstream_url, port, args.workers, directory),
+                    stdout=log, stderr=subprocess.STDOUT
+                ))
+            wait_for(f"{target}/ping", processes[-1], 60, log_path)
+            # Let every worker finish its lifespan startup and client warmup
+            time.sleep(1.0 + 0.5 * args.workers)
+
+        rng = random.Random(args.seed)
+        scenario = Scenario(args.scenario, Traffic(user_ids(args.users), charity_ids(args.charities), rng))
+        print(f"Driving {args.scenario} at {args.rps:g} req/s against {target} ({args.warmup:g}s warmup, {args.duration:g}s measured)")
+        results, lateness = asyncio.run(drive(
+            target, scenario, args.rps, args.duration, args.warmup, args.connections, args.timeout, args.arrival == "poisson"
+        ))
+
+        report = {
+            "scenario": args.scenario,
+            "rps": args.rps,
+            "duration": args.duration,
+            "workers": args.workers,
+            "generator_lateness_p99_ms": round(lateness * 1000, 2),
+            **summarize(results, args.duration)
+        }
+
+        # Retried purchases get their original job back, so each job is polled once
+        job_ids = list(dict.fromkeys(body["job_id"] for _, _, _, body in results if body and "job_id" in body))
+        if job_ids:
+            sample = job_ids[::max(1, len(job_ids) // args.job_sample)][:args.job_sample]
+            report["jobs"] = asyncio.run(wait_for_jobs(target, sample, args.job_timeout))
+
+        if upstream_url is not None:
+            try:
+                report["upstreams"] = httpx.get(f"{upstream_url}/_stats", timeout=5).json()
+            except httpx.HTTPError:
+                pass
+        return report
+    finally:
+        for process in reversed(processes):
+            stop(process)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test against local upstream stand-ins")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed", help="Traffic mix")
+    parser.add_argument("--rps", type=float, default=20.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Seconds of load before measuring")
+    parser.add_argument("--arrival", choices=["poisson", "uniform"], default="poisson", help="Spacing of request arrivals")
+    parser.add_argument("--connections", type=int, default=100, help="Maximum concurrent connections")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--workers", type=int, default=1, help="WORKERS for the API server")
+    parser.add_argument("--target", help="Load an already running API at this URL instead of starting one")
+    parser.add_argument("--upstream", help="Use stand-ins already running at this URL instead of starting them")
+    parser.add_argument("--job-sample", type=int, default=200, help="Auto-donate jobs polled until they finish")
+    parser.add_argument("--job-timeout", type=float, default=60.0, help="Seconds to wait for sampled jobs after the run")
+    parser.add_argument("--save", help="Write the report as JSON, e.g. as a baseline")
+    parser.add_argument("--compare", help="Baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression against the baseline")
+    add_arguments(parser)
+    args = parser.parse_args()
+    for spec in (args.pledge, args.plaid, args.supabase):
+        FaultProfile.parse(spec)
+
+    with tempfile.TemporaryDirectory() as directory:
+        report = run(args, directory)
+    print_report(report)
+
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Saved report to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(report, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print(f"Regressions against {args.compare} (tolerance {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
@@ -0,0 +1,170 @@
+"""
+Traffic mixes for the load test.
+
+Each scenario is a weighted set of request builders modelled on what the
+mobile app sends: the dashboard loading a user's totals, recent activity,
+settings, charities and balance, and purchases reported for auto-donation.
+Users are picked uniformly from the seeded ones, and a share of auto-donations
+repeat a recent transaction the way client retries do.
+"""
+import random
+import uuid
+from collections import deque
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import settings
+
+API = settings.API_V1_PREFIX
+
+# Share of auto-donations that resend a recent transaction
+RETRY_RATE = 0.05
+
+MERCHANTS = ["Target", "Whole Foods", "Amazon", "Starbucks", "Shell", "Walgreens", "Chipotle", "Best Buy"]
+
+
+class PlannedRequest:
+    """One request to send: label is the route template it is reported under"""
+
+    __slots__ = ("label", "method", "path", "body")
+
+    def __init__(self, label: str, method: str, path: str, body: Optional[Dict[str, Any]] = None):
+        self.label = label
+        self.method = method
+        self.path = path
+        self.body = body
+
+
+class Traffic:
+    """Picks users, charities and transactions for the request builders"""
+
+    def __init__(self, users: List[str], charities: List[str], rng: random.Random):
+        self.users = users
+        self.charities = charities
+        self.rng = rng
+        self._recent: deque = deque(maxlen=200)
+
+    def user(self) -> str:
+        return self.rng.choice(self.users)
+
+    def purchase(self) -> Dict[str, Any]:
+        if self._recent and self.rng.random() < RETRY_RATE:
+            return dict(self.rng.choice(self._recent))
+        merchant = self.rng.choice(MERCHANTS)
+        purchase = {
+            "user_id": self.user(),
+            "transaction_amount": round(self.rng.lognormvariate(3.2, 0.8), 2),
+            "original_transaction_id": f"loadtest-txn-{uuid.uuid4().hex}",
+            "donation_percentage": self.rng.choice([0.01, 0.02, 0.05]),
+            "merchant_name": merchant,
+            "product_name": f"{merchant} purchase"
+        }
+        self._recent.append(purchase)
+        return dict(purchase)
+
+
+def total_donation(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(f"GET {API}/total_donation/{{user_id}}", "GET", f"{API}/total_donation/{traffic.user()}")
+
+
+def recent_donations(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(f"GET {API}/recent_donations/{{user_id}}", "GET", f"{API}/recent_donations/{traffic.user()}?limit=10")
+
+
+def user_settings(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(f"GET {API}/get_user_settings/{{user_id}}", "GET", f"{API}/get_user_settings/{traffic.user()}")
+
+
+def charity_preferences(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(
+        f"GET {API}/get_user_charity_preferences/{{user_id}}", "GET", f"{API}/get_user_charity_preferences/{traffic.user()}"
+    )
+
+
+def check_connection(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(f"GET {API}/check_connection/{{user_id}}", "GET", f"{API}/check_connection/{traffic.user()}")
+
+
+def organization(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(
+        f"GET {API}/organizations/{{organization_id}}", "GET", f"{API}/organizations/{traffic.rng.choice(traffic.charities)}"
+    )
+
+
+def organizations_page(traffic: Traffic) -> PlannedRequest:
+    cause = traffic.rng.choice(["", "&cause_id=1", "&cause_id=2", "&cause_id=3"])
+    return PlannedRequest(f"GET {API}/organizations", "GET", f"{API}/organizations?page=1&per_page=20{cause}")
+
+
+def donation_ledger(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(f"GET {API}/donations/ledger/{{user_id}}", "GET", f"{API}/donations/ledger/{traffic.user()}")
+
+
+def balance(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(f"POST {API}/balance", "POST", f"{API}/balance", {"user_id": traffic.user()})
+
+
+def get_transactions(traffic: Traffic) -> PlannedRequest:
+    today = date.today()
+    return PlannedRequest(f"POST {API}/transactions/get_transactions", "POST", f"{API}/transactions/get_transactions", {
+        "user_id": traffic.user(),
+        "start_date": (today - timedelta(days=30)).isoformat(),
+        "end_date": today.isoformat(),
+        "refresh": True
+    })
+
+
+def auto_donate(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(f"POST {API}/transactions/auto_donate", "POST", f"{API}/transactions/auto_donate", traffic.purchase())
+
+
+def auto_donate_batch(traffic: Traffic) -> PlannedRequest:
+    return PlannedRequest(
+        f"POST {API}/transactions/auto_donate_batch", "POST", f"{API}/transactions/auto_donate_batch",
+        {"transactions": [traffic.purchase() for _ in range(10)]}
+    )
+
+
+Mix = List[Tuple[float, Callable[[Traffic], PlannedRequest]]]
+
+# Opening the app: the dashboard header, summary stats, recent activity and cause breakdown
+DASHBOARD: Mix = [
+    (20, total_donation),
+    (20, recent_donations),
+    (15, user_settings),
+    (10, charity_preferences),
+    (10, check_connection),
+    (15, organization),
+    (5, organizations_page),
+    (5, balance)
+]
+
+# Purchases reported from the in-app browser, new transactions synced, and the totals they change
+AUTO_DONATE: Mix = [
+    (55, auto_donate),
+    (5, auto_donate_batch),
+    (10, get_transactions),
+    (15, total_donation),
+    (10, recent_donations),
+    (5, donation_ledger)
+]
+
+SCENARIOS: Dict[str, Mix] = {
+    "dashboard": DASHBOARD,
+    "auto_donate": AUTO_DONATE,
+    "mixed": [(weight * 0.7, build) for weight, build in DASHBOARD] + [(weight * 0.3, build) for weight, build in AUTO_DONATE]
+}
+
+
+class Scenario:
+    """Draws requests from a mix in proportion to their weights"""
+
+    def __init__(self, name: str, traffic: Traffic):
+        mix = SCENARIOS[name]
+        self.name = name
+        self.traffic = traffic
+        self._builders = [build for _, build in mix]
+        self._weights = [weight for weight, _ in mix]
+
+    def next_request(self) -> PlannedRequest:
+        build = self.traffic.rng.choices(self._builders, weights=self._weights)[0]
+        return build(self.traffic)
@@ -0,0 +1,652 @@
+"""
+Local stand-ins for Pledge.to, Plaid and Supabase (PostgREST), for load tests.
+
+One server answers the requests the API makes to all three, from in-memory
+data seeded with synthetic users, so a load test measures our own code and
+never touches a real upstream. Their paths do not overlap (/v1 for Pledge.to,
+/rest/v1 for PostgREST, the rest for Plaid), so the same address is used for
+PLEDGE_TO_BASE_URL, PLAID_HOST and SUPABASE_URL.
+
+Every upstream has its own fault profile: a lognormal latency given by its
+median and 99th percentile, and a share of requests that fail with an error
+status in that upstream's error format. GET /_stats reports the calls each
+upstream received.
+
+Run from the backend directory, to point a development server at it:
+
+    python -m loadtest.upstreams --port 9100 --users 1000 --plaid "latency=150,p99=800,errors=0.01"
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+# Dummy credentials the API is started with; the stand-ins accept anything
+SUPABASE_KEY = "loadtest-service-role-key"
+PLAID_CLIENT_ID = "loadtest-client-id"
+PLAID_SECRET = "loadtest-secret"
+
+CAUSES = ["Education", "Environment", "Health", "Hunger", "Animals", "Disaster Relief"]
+
+# z-score of the 99th percentile of a standard normal distribution
+_P99_Z = 2.326
+
+
+def user_ids(count: int) -> List[str]:
+    """IDs of the seeded users, shared by the stand-ins and the traffic generator"""
+    return [f"loadtest-user-{index:05d}" for index in range(count)]
+
+
+def charity_ids(count: int) -> List[str]:
+    """IDs of the seeded Pledge.to organizations"""
+    return [f"loadtest-org-{index:04d}" for index in range(count)]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class FaultProfile:
+    """
+    Latency and error injection for one upstream.
+
+    Parsed from a spec like "latency=120,p99=600,errors=0.01,status=503":
+    latency is the median in milliseconds, p99 the 99th percentile (equal to
+    the median when omitted, for a fixed delay), errors the share of requests
+    that fail and status the HTTP status they fail with.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, p99_ms: Optional[float] = None, error_rate: float = 0.0, error_status: int = 500):
+        self.latency_ms = latency_ms
+        self.p99_ms = p99_ms if p99_ms is not None else latency_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        if latency_ms > 0 and self.p99_ms > latency_ms:
+            self._sigma = math.log(self.p99_ms / latency_ms) / _P99_Z
+        else:
+            self._sigma = 0.0
+
+    @classmethod
+    def parse(cls, spec: str) -> "FaultProfile":
+        values: Dict[str, str] = {}
+        for part in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = part.partition("=")
+            values[key.strip()] = value.strip()
+        unknown = set(values) - {"latency", "p99", "errors", "status"}
+        if unknown:
+            raise ValueError(f"Unknown fault profile settings: {', '.join(sorted(unknown))}")
+        return cls(
+            latency_ms=float(values.get("latency", 0)),
+            p99_ms=float(values["p99"]) if "p99" in values else None,
+            error_rate=float(values.get("errors", 0)),
+            error_status=int(values.get("status", 500))
+        )
+
+    def delay(self, rng: random.Random) -> float:
+        """Seconds to wait before answering one request"""
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms * math.exp(self._sigma * rng.gauss(0.0, 1.0)) / 1000
+
+    def fails(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+    def __str__(self) -> str:
+        return f"latency={self.latency_ms:g},p99={self.p99_ms:g},errors={self.error_rate:g},status={self.error_status}"
+
+
+class FakeUpstream:
+    """Counts calls and applies the fault profile around each endpoint"""
+
+    name = ""
+
+    def __init__(self, profile: FaultProfile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        self.calls: Dict[str, int] = {}
+        self.errors = 0
+
+    def routes(self) -> List[Route]:
+        raise NotImplementedError
+
+    def error_response(self) -> Response:
+        raise NotImplementedError
+
+    def endpoint(self, label: Optional[str], handler: Callable[[Request], Awaitable[Response]]) -> Callable[[Request], Awaitable[Response]]:
+        """Wrap handler with the fault profile; calls are counted under label unless it is None"""
+        async def run(request: Request) -> Response:
+            if label is not None:
+                self.calls[label] = self.calls.get(label, 0) + 1
+            delay = self.profile.delay(self.rng)
+            if delay:
+                await asyncio.sleep(delay)
+            if self.profile.fails(self.rng):
+                self.errors += 1
+                return self.error_response()
+            return await handler(request)
+        return run
+
+    def stats(self) -> Dict[str, Any]:
+        return {"profile": str(self.profile), "calls": dict(sorted(self.calls.items())), "errors": self.errors}
+
+
+class FakePledge(FakeUpstream):
+    """Pledge.to organizations and donations"""
+
+    name = "pledge"
+
+    def __init__(self, profile: FaultProfile, rng: random.Random, charities: List[str]):
+        super().__init__(profile, rng)
+        self.organizations = {charity_id: self._organization(index, charity_id) for index, charity_id in enumerate(charities)}
+        self._ordered = list(self.organizations.values())
+        self._donations_by_key: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _organization(index: int, charity_id: str) -> Dict[str, Any]:
+        cause = index % len(CAUSES)
+        return {
+            "id": charity_id,
+            "name": f"Load Test {CAUSES[cause]} Fund {index}",
+            "alias": None,
+            "ngo_id": f"{index:09d}",
+            "mission": f"Synthetic {CAUSES[cause].lower()} charity used for load testing.",
+            "street1": f"{100 + index} Main St",
+            "street2": None,
+            "city": "Springfield",
+            "region": "IL",
+            "postal_code": 62701,
+            "country": "US",
+            "lat": "39.7817",
+            "lon": "-89.6501",
+            "causes": [{"id": cause + 1, "name": CAUSES[cause], "parent_id": None}],
+            "website_url": f"https://example.org/{charity_id}",
+            "profile_url": f"https://www.pledge.to/organizations/{charity_id}",
+            "logo_url": f"https://example.org/{charity_id}/logo.png",
+            "disbursement_type": "ach",
+            "impact_metrics": [],
+            "sustainable_development_goals": []
+        }
+
+    def routes(self) -> List[Route]:
+        return [
+            Route("/v1/organizations/{organization_id}", self.endpoint("get_organization", self.get_organization), methods=["GET"]),
+            Route("/v1/organizations", self.endpoint("list_organizations", self.list_organizations), methods=["GET"]),
+            Route("/v1/donations", self.endpoint("create_donation", self.create_donation), methods=["POST"])
+        ]
+
+    def error_response(self) -> Response:
+        return JSONResponse({"error": "Injected failure"}, status_code=self.profile.error_status)
+
+    async def get_organization(self, request: Request) -> Response:
+        organization = self.organizations.get(request.path_params["organization_id"])
+        if organization is None:
+            return JSONResponse({"error": "Not found"}, status_code=404)
+        return JSONResponse(organization)
+
+    async def list_organizations(self, request: Request) -> Response:
+        page = max(1, int(request.query_params.get("page", 1)))
+        per_page = max(1, min(100, int(request.query_params.get("per_page", 20))))
+        organizations = self._ordered
+        if "cause_id" in request.query_params:
+            cause_id = int(request.query_params["cause_id"])
+            organizations = [o for o in organizations if any(cause["id"] == cause_id for cause in o["causes"])]
+        if "search" in request.query_params:
+            search = request.query_params["search"].lower()
+            organizations = [o for o in organizations if search in o["name"].lower()]
+        start = (page - 1) * per_page
+        return JSONResponse({
+            "organizations": organizations[start:start + per_page],
+            "total_count": len(organizations),
+            "page": page,
+            "per_page": per_page
+        })
+
+    async def create_donation(self, request: Request) -> Response:
+        donation = await request.json()
+        organization = self.organizations.get(donation.get("organization_id"))
+        if organization is None:
+            return JSONResponse({"error": "Organization not found"}, status_code=422)
+        # A repeated Idempotency-Key returns the donation it created instead of a new one
+        key = request.headers.get("idempotency-key")
+        if key and key in self._donations_by_key:
+            return JSONResponse(self._donations_by_key[key], status_code=201)
+        created = {
+            **donation,
+            "id": str(uuid.uuid4()),
+            "organization_name": organization["name"],
+            "beneficiaries": [{"id": organization["id"], "name": organization["name"]}],
+            "created_at": _now()
+        }
+        if key:
+            self._donations_by_key[key] = created
+        return JSONResponse(created, status_code=201)
+
+
+class FakePlaid(FakeUpstream):
+    """Plaid balances and transactions, with a new purchase or two per sync"""
+
+    name = "plaid"
+
+    MERCHANTS = ["Target", "Whole Foods", "Amazon", "Starbucks", "Shell", "Walgreens", "Chipotle", "Best Buy"]
+
+    def __init__(self, profile: FaultProfile, rng: random.Random):
+        super().__init__(profile, rng)
+        self._sequence = 0
+
+    def routes(self) -> List[Route]:
+        return [
+            Route("/accounts/balance/get", self.endpoint("accounts_balance_get", self.accounts_balance_get), methods=["POST"]),
+            Route("/accounts/get", self.endpoint("accounts_get", self.accounts_balance_get), methods=["POST"]),
+            Route("/transactions/sync", self.endpoint("transactions_sync", self.transactions_sync), methods=["POST"]),
+            Route("/transactions/get", self.endpoint("transactions_get", self.transactions_get), methods=["POST"])
+        ]
+
+    def error_response(self) -> Response:
+        return JSONResponse({
+            "error_type": "API_ERROR",
+            "error_code": "INTERNAL_SERVER_ERROR",
+            "error_message": "Injected failure",
+            "display_message": None,
+            "request_id": uuid.uuid4().hex
+        }, status_code=self.profile.error_status)
+
+    @staticmethod
+    def _account(access_token: str) -> Dict[str, Any]:
+        return {
+            "account_id": f"acct-{access_token[-12:]}",
+            "balances": {
+                "available": 1200.55,
+                "current": 1310.2,
+                "limit": None,
+                "iso_currency_code": "USD",
+                "unofficial_currency_code": None
+            },
+            "mask": "0000",
+            "name": "Load Test Checking",
+            "official_name": "Load Test Premium Checking",
+            "type": "depository",
+            "subtype": "checking"
+        }
+
+    @staticmethod
+    def _item(access_token: str) -> Dict[str, Any]:
+        return {
+            "item_id": f"item-{access_token[-12:]}",
+            "webhook": None,
+            "error": None,
+            "available_products": ["balance"],
+            "billed_products": ["transactions"],
+            "consent_expiration_time": None,
+            "update_type": "background"
+        }
+
+    def _transaction(self, account_id: str, day: date) -> Dict[str, Any]:
+        self._sequence += 1
+        merchant = self.rng.choice(self.MERCHANTS)
+        return {
+            "transaction_id": f"txn-{self._sequence:010d}-{uuid.uuid4().hex[:8]}",
+            "account_id": account_id,
+            "amount": round(self.rng.lognormvariate(3.2, 0.8), 2),
+            "iso_currency_code": "USD",
+            "unofficial_currency_code": None,
+            "date": day.isoformat(),
+            "authorized_date": day.isoformat(),
+            "authorized_datetime": None,
+            "datetime": None,
+            "name": merchant.upper(),
+            "merchant_name": merchant,
+            "pending": False,
+            "pending_transaction_id": None,
+            "payment_channel": "in store",
+            "transaction_code": None
+        }
+
+    async def accounts_balance_get(self, request: Request) -> Response:
+        access_token = (await request.json()).get("access_token", "")
+        return JSONResponse({
+            "accounts": [self._account(access_token)],
+            "item": self._item(access_token),
+            "request_id": uuid.uuid4().hex
+        })
+
+    async def transactions_sync(self, request: Request) -> Response:
+        body = await request.json()
+        access_token = body.get("access_token", "")
+        account = self._account(access_token)
+        cursor = int(body.get("cursor") or 0)
+        # The first sync returns a short history, later ones the purchases made since
+        count = 20 if cursor == 0 else self.rng.choice([0, 0, 1, 1, 2])
+        today = date.today()
+        added = [self._transaction(account["account_id"], today - timedelta(days=index % 30)) for index in range(count)]
+        return JSONResponse({
+            "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE",
+            "accounts": [account],
+            "added": added,
+            "modified": [],
+            "removed": [],
+            "next_cursor": str(cursor + 1),
+            "has_more": False,
+            "request_id": uuid.uuid4().hex
+        })
+
+    async def transactions_get(self, request: Request) -> Response:
+        body = await request.json()
+        access_token = body.get("access_token", "")
+        account = self._account(access_token)
+        options = body.get("options") or {}
+        total = 60
+        offset = int(options.get("offset", 0))
+        count = max(0, min(int(options.get("count", 100)), total - offset))
+        start = date.fromisoformat(body.get("start_date", date.today().isoformat()))
+        return JSONResponse({
+            "accounts": [account],
+            "transactions": [self._transaction(account["account_id"], start + timedelta(days=index % 28)) for index in range(count)],
+            "total_transactions": total,
+            "item": self._item(access_token),
+            "request_id": uuid.uuid4().hex
+        })
+
+
+class Table:
+    """Rows of one PostgREST table, indexed by the column most queries filter on"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.rows: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._next_id = 1
+
+    def insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        row = {column: _now() if value == "now()" else value for column, value in row.items()}
+        if "id" not in row:
+            row["id"] = self._next_id
+            self._next_id += 1
+        row.setdefault("created_at", _now())
+        self.rows.append(row)
+        self._by_key.setdefault(_text(row.get(self.key)), []).append(row)
+        return row
+
+    def candidates(self, filters: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+        for column, operator, value in filters:
+            if column == self.key and operator == "eq":
+                return self._by_key.get(value, [])
+        return self.rows
+
+    def update(self, row: Dict[str, Any], values: Dict[str, Any]):
+        old_key = _text(row.get(self.key))
+        row.update({column: _now() if value == "now()" else value for column, value in values.items()})
+        new_key = _text(row.get(self.key))
+        if new_key != old_key:
+            self._by_key[old_key].remove(row)
+            self._by_key.setdefault(new_key, []).append(row)
+
+    def delete(self, row: Dict[str, Any]):
+        self.rows.remove(row)
+        self._by_key[_text(row.get(self.key))].remove(row)
+
+
+def _text(value: Any) -> str:
+    """A column value as PostgREST filters spell it"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _split_list(value: str) -> List[str]:
+    """Items of an in.(...) filter, which quotes items containing reserved characters"""
+    items, current, quoted, escaped = [], [], False, False
+    for char in value.strip()[1:-1]:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            items.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if current or items:
+        items.append("".join(current))
+    return items
+
+
+def _matches(row: Dict[str, Any], column: str, operator: str, value: str) -> bool:
+    actual = row.get(column)
+    if operator == "eq":
+        return _text(actual) == value
+    if operator == "neq":
+        return _text(actual) != value
+    if operator == "in":
+        return _text(actual) in _split_list(value)
+    if operator == "is":
+        return _text(actual) == value
+    if actual is None:
+        return False
+    try:
+        left, right = float(actual), float(value)
+    except (TypeError, ValueError):
+        left, right = str(actual), value
+    return {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[operator]
+
+
+class FakePostgrest(FakeUpstream):
+    """
+    Supabase's PostgREST API over in-memory tables.
+
+    Supports what the API's queries use: column selection, eq/neq/gt/gte/lt/
+    lte/in/is filters, order, limit and offset, single-object responses, and
+    insert, upsert, update and delete returning the affected rows.
+    """
+
+    name = "supabase"
+
+    FILTER_OPERATORS = {"eq", "neq", "gt", "gte", "lt", "lte", "in", "is"}
+    RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+    def __init__(self, profile: FaultProfile, rng: random.Random):
+        super().__init__(profile, rng)
+        self.tables: Dict[str, Table] = {"users": Table("id")}
+
+    def table(self, name: str) -> Table:
+        if name not in self.tables:
+            self.tables[name] = Table("user_id")
+        return self.tables[name]
+
+    def seed(self, users: List[str], charities: List[str]):
+        """Give every user settings, a linked bank account and one to three charities"""
+        for user_id in users:
+            self.table("users").insert({"id": user_id, "total_donation_amount": 0.0})
+            self.table("user_settings").insert({
+                "user_id": user_id,
+                "auto_donation_percentage": self.rng.choice([0.01, 0.02, 0.05]),
+                "auto_donate_enabled": True
+            })
+            self.table("user_plaid_tokens").insert({
+                "user_id": user_id,
+                "access_token": f"access-sandbox-{uuid.uuid4()}"
+            })
+            chosen = self.rng.sample(charities, self.rng.randint(1, min(3, len(charities))))
+            split = [100 // len(chosen)] * len(chosen)
+            split[0] += 100 - sum(split)
+            for charity_id, percentage in zip(chosen, split):
+                self.table("user_charity_preferences").insert({
+                    "user_id": user_id,
+                    "charity_id": charity_id,
+                    "allocation_percentage": percentage,
+                    "is_active": True
+                })
+
+    def routes(self) -> List[Route]:
+        return [Route(
+            "/rest/v1/{table}",
+            # Counted per method and table in handle()
+            self.endpoint(None, self.handle),
+            methods=["GET", "HEAD", "POST", "PATCH", "DELETE"]
+        )]
+
+    def error_response(self) -> Response:
+        return self._error(self.profile.error_status, "XX000", "Injected failure")
+
+    @staticmethod
+    def _error(status_code: int, code: str, message: str, details: Optional[str] = None) -> Response:
+        return JSONResponse({"code": code, "details": details, "hint": None, "message": message}, status_code=status_code)
+
+    async def handle(self, request: Request) -> Response:
+        name = request.path_params["table"]
+        method = request.method
+        label = f"{method} {name}"
+        self.calls[label] = self.calls.get(label, 0) + 1
+        table = self.table(name)
+
+        filters = []
+        for column, raw in request.query_params.multi_items():
+            if column in self.RESERVED_PARAMS:
+                continue
+            operator, _, value = raw.partition(".")
+            if operator not in self.FILTER_OPERATORS:
+                return self._error(400, "PGRST100", f'"failed to parse filter ({raw})"')
+            filters.append((column, operator, value))
+        rows = [row for row in table.candidates(filters) if all(_matches(row, *f) for f in filters)]
+
+        if method == "POST":
+            body = json.loads(await request.body() or b"[]")
+            rows = self._insert(table, body if isinstance(body, list) else [body], request)
+            status_code = 201
+        elif method == "PATCH":
+            values = json.loads(await request.body() or b"{}")
+            for row in rows:
+                table.update(row, values)
+            status_code = 200
+        elif method == "DELETE":
+            for row in rows:
+                table.delete(row)
+            status_code = 200
+        else:
+            rows = self._order(rows, request.query_params.get("order"))
+            offset = int(request.query_params.get("offset", 0))
+            limit = request.query_params.get("limit")
+            rows = rows[offset:offset + int(limit) if limit is not None else None]
+            status_code = 200
+
+        rows = self._select(rows, request.query_params.get("select"))
+        if "vnd.pgrst.object" in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return self._error(
+                    406, "PGRST116", "JSON object requested, multiple (or no) rows returned",
+                    f"The result contains {len(rows)} rows"
+                )
+            return JSONResponse(rows[0], status_code=status_code)
+        if method != "GET" and "return=representation" not in request.headers.get("prefer", ""):
+            return Response(status_code=204 if status_code == 200 else status_code)
+        return JSONResponse(rows, status_code=status_code)
+
+    @staticmethod
+    def _insert(table: Table, rows: List[Dict[str, Any]], request: Request) -> List[Dict[str, Any]]:
+        prefer = request.headers.get("prefer", "")
+        merge = "resolution=merge-duplicates" in prefer
+        ignore = "resolution=ignore-duplicates" in prefer
+        conflict_columns = request.query_params.get("on_conflict", "id").split(",")
+        inserted = []
+        for row in rows:
+            existing = None
+            if (merge or ignore) and all(column in row for column in conflict_columns):
+                filters = [(column, "eq", _text(row[column])) for column in conflict_columns]
+                existing = next(
+                    (candidate for candidate in table.candidates(filters)
+                     if all(_text(candidate.get(column)) == value for column, _, value in filters)),
+                    None
+                )
+            if existing is None:
+                inserted.append(table.insert(row))
+            elif merge:
+                table.update(existing, row)
+                inserted.append(existing)
+            # With ignore-duplicates a conflicting row is skipped and not returned, like PostgREST
+        return inserted
+
+    @staticmethod
+    def _order(rows: List[Dict[str, Any]], order: Optional[str]) -> List[Dict[str, Any]]:
+        if not order:
+            return rows
+        for term in reversed(order.split(",")):
+            column, _, direction = term.partition(".")
+            descending = direction.startswith("desc")
+            rows = sorted(rows, key=lambda row: (row.get(column) is None, row.get(column)), reverse=descending)
+        return rows
+
+    @staticmethod
+    def _select(rows: List[Dict[str, Any]], select: Optional[str]) -> List[Dict[str, Any]]:
+        columns = [column.strip() for column in (select or "*").split(",")]
+        if "*" in columns:
+            return [dict(row) for row in rows]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+
+def build_app(
+    users: int = 1000,
+    charities: int = 50,
+    pledge: Optional[FaultProfile] = None,
+    plaid: Optional[FaultProfile] = None,
+    supabase: Optional[FaultProfile] = None,
+    seed: int = 0
+) -> Starlette:
+    """One app serving all three stand-ins, seeded with the given number of users"""
+    rng = random.Random(seed)
+    charity_list = charity_ids(charities)
+    upstreams: List[FakeUpstream] = [
+        FakePledge(pledge or FaultProfile(), rng, charity_list),
+        FakePlaid(plaid or FaultProfile(), rng),
+        FakePostgrest(supabase or FaultProfile(), rng)
+    ]
+    upstreams[2].seed(user_ids(users), charity_list)
+
+    async def stats(request: Request) -> Response:
+        return JSONResponse({upstream.name: upstream.stats() for upstream in upstreams})
+
+    routes = [Route("/_stats", stats, methods=["GET"])]
+    for upstream in upstreams:
+        routes.extend(upstream.routes())
+    return Starlette(routes=routes)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Options shared with the load test runner"""
+    parser.add_argument("--users", type=int, default=1000, help="Synthetic users seeded into the stand-ins")
+    parser.add_argument("--charities", type=int, default=50, help="Synthetic Pledge.to organizations")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for data and injected faults")
+    parser.add_argument("--pledge", default="latency=80,p99=300", help="Pledge.to fault profile")
+    parser.add_argument("--plaid", default="latency=150,p99=800", help="Plaid fault profile")
+    parser.add_argument("--supabase", default="latency=15,p99=60", help="Supabase (PostgREST) fault profile")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Pledge.to, Plaid and Supabase stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    app = build_app(
+        users=args.users,
+        charities=args.charities,
+        pledge=FaultProfile.parse(args.pledge),
+        plaid=FaultProfile.parse(args.plaid),
+        supabase=FaultProfile.parse(args.supabase),
+        seed=args.seed
+    )
+    print(f"Upstream stand-ins on http://{args.host}:{args.port} (PLEDGE_TO_BASE_URL, PLAID_HOST and SUPABASE_URL)")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+import orjson
+from config import settings
+from services.tracing import tracer
+
+# Attributes every LogRecord has; anything else was passed through extra= and is logged as a field
+_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_REDACTIONS = [
+    # Plaid access and public tokens
+    (re.compile(r"\b(access|public)-(sandbox|development|production)-[0-9a-f-]{8,}\b", re.I), r"\1-\2-[REDACTED]"),
+    # Bearer credentials and JWTs (Supabase service role keys, Plaid webhook verification)
+    (re.compile(r"\bBearer\s+[A-Za-z0-9._~+/=-]+", re.I), "Bearer [REDACTED]"),
+    (re.compile(r"\beyJ[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+"), "[REDACTED_JWT]"),
+    # Email addresses, keeping the domain for debugging
+    (re.compile(r"\b[A-Za-z0-9._%+-]+@([A-Za-z0-9.-]+\.[A-Za-z]{2,})\b"), r"[REDACTED]@\1"),
+]
+_SECRET_KEYS = re.compile(r"token|secret|password|authorization|api_key", re.I)
+
+
+def redact(text: str) -> str:
+    """Mask tokens, credentials and email addresses in a log message"""
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def _redact_value(key: str, value: Any) -> Any:
+    if _SECRET_KEYS.search(key):
+        return "[REDACTED]"
+    if isinstance(value, str):
+        return redact(value)
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per line.
+
+    Fields passed with extra= are included as top-level keys, and the active
+    trace and span IDs are attached when a trace is in progress. Redaction
+    runs here, on the listener thread, so callers never pay for it.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": redact(record.getMessage())
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS and not key.startswith("_"):
+                entry[key] = _redact_value(key, value)
+        if record.exc_info:
+            entry["exception"] = redact(self.formatException(record.exc_info))
+        elif record.exc_text:
+            entry["exception"] = redact(record.exc_text)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class RedactingFormatter(logging.Formatter):
+    """The plain text format, with the same redaction as JSON output"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return redact(super().format(record))
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in N INFO-and-below records per logger; warnings and errors always pass.
+
+    Sampling is counter based, so a rate of 0.01 keeps exactly every hundredth
+    message rather than a random share.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.every = {name: max(1, round(1 / rate)) if rate > 0 else 0 for name, rate in rates.items()}
+        self._counts: Dict[str, int] = {}
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        every = self.every.get(record.name)
+        if every is None or every == 1:
+            return True
+        count = self._counts.get(record.name, 0)
+        self._counts[record.name] = count + 1
+        if every and count % every == 0:
+            return True
+        self.dropped += 1
+        return False
+
+
+class TraceContextFilter(logging.Filter):
+    """Stamps records with the active trace, which the listener thread cannot see"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = tracer.current_span()
+        if span is not None:
+            record.trace_id = span.trace.trace_id
+            record.span_id = span.span_id
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread with only the message built.
+
+    The message is built from its arguments here, in the caller, once the
+    record has passed the level and sampling filters: the arguments are often
+    dicts or Plaid models the event loop keeps changing, so formatting them
+    later on the listener thread could log a different value, or race with the
+    owner. Tracebacks are rendered here too, while the frames still exist.
+    Redaction and JSON encoding are left to the listener. When the queue is
+    full, records are dropped and counted instead of blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sampling(spec: str) -> Dict[str, float]:
+    """Parse per-logger sample rates from "logger=rate,..." """
+    rates: Dict[str, float] = {}
+    for entry in spec.split(","):
+        name, _, rate = entry.strip().partition("=")
+        if name and rate:
+            try:
+                rates[name.strip()] = float(rate)
+            except ValueError:
+                print(f"Ignoring malformed LOG_SAMPLING entry: {entry}", file=sys.stderr)
+    return rates
+
+
+def skip_unused_record_fields():
+    """
+    Stop filling in LogRecord fields neither output format uses
+
+    Finding the calling file and line walks the stack on every call and is
+    the largest single cost of creating a record.
+    """
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logMultiprocessing = False
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_output: Optional[logging.Handler] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+_sampler: Optional[SamplingFilter] = None
+
+
+def configure_logging():
+    """
+    Route all application logging through a queue to a background writer
+
+    LOG_FORMAT picks JSON lines or the plain text format. Records filtered
+    out by level or sampling are never formatted.
+    """
+    global _listener, _output, _handler, _sampler
+    if _handler is not None:
+        return
+
+    output = _output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(RedactingFormatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    handler = _handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _sampler = SamplingFilter(parse_sampling(settings.LOG_SAMPLING))
+    handler.addFilter(_sampler)
+    handler.addFilter(TraceContextFilter())
+
+    skip_unused_record_fields()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(logging.DEBUG if settings.DEBUG else getattr(logging, settings.LOG_LEVEL, logging.INFO))
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread
+
+    Anything logged afterwards is written directly, so late shutdown messages
+    are not lost.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger()
+        root.removeHandler(_handler)
+        _output.addFilter(_sampler)
+        root.addHandler(_output)
+
+
+def _restart_after_fork():
+    """
+    Give a forked worker its own queue and writer thread
+
+    The child inherits the handler but not the listener thread, and the
+    inherited queue may have been locked mid-operation by the parent.
+    """
+    global _listener
+    if _listener is not None:
+        _handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(_handler.queue, _output, respect_handler_level=True)
+        _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def stats() -> Dict[str, Any]:
+    """Get queue depth and how many records were sampled out or dropped"""
+    return {
+        "queued": _handler.queue.qsize() if _handler else 0,
+        "sampled_out": _sampler.dropped if _sampler else 0,
+        "dropped_queue_full": _handler.dropped if _handler else 0
+    }
@@ -1,10 +1,31 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
+import time
+import asyncio
 import logging
 from config import settings
+from logging_config import configure_logging, shutdown_logging
+from services.plaid_client import plaid_client
+from services.supabase_client import supabase_service
+from services.sqlite_db import local_db
+from services.webhook_queue import webhook_queue
+from services.donation_ledger import donation_ledger
+from services.settlement_scheduler import settlement_scheduler
+from services.donation_dedupe import donation_dedupe
+from services.job_queue import job_queue
+from services.auto_donation import auto_donation_service
+from services.json_response import FastJSONResponse
+from services.shutdown import shutdown_coordinator
+from middleware.compression import CompressionMiddleware
+from middleware.rate_limit import RateLimitMiddleware
+from middleware.metrics import MetricsMiddleware
+from services.metrics import instrument_app, loop_lag_monitor
+from services.tracing import trace_app
+from middleware.tracing import TracingMiddleware
+from middleware.shutdown import ShutdownMiddleware
+from server import current_worker, serve
 
 # Import route modules
 from routes.donations import router as donations_router
@@ -13,16 +34,30 @@ from routes.transactions import router as transactions_router
 from routes.health import router as health_router
 from routes.plaid import router as plaid_router
 from routes.settings import router as settings_router
+from routes.webhooks import router as webhooks_router
+from routes.jobs import router as jobs_router
+from routes.metrics import router as metrics_router
+from routes.debug import router as debug_router
 
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO if not settings.DEBUG else logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
+def warm_clients():
+    """Import the Plaid and Supabase SDKs and build their clients"""
+    started = time.perf_counter()
+    try:
+        plaid_client.api
+        supabase_service.client
+    except Exception as e:
+        # The first request that needs the client will retry and report the error
+        logger.warning("Client warmup failed: %s", e)
+        return
+    logger.info("Upstream clients ready in %.2fs", time.perf_counter() - started)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
@@ -31,9 +66,9 @@ async def lifespan(app: FastAPI):
     try:
         settings.validate_settings()
         logger.info("Settings validated successfully")
-        logger.info(f"Donation API URL: {settings.donation_base_url}")
-        logger.info(f"Organization API URL: {settings.organization_base_url}")
-        logger.info(f"Sandbox mode for donations: {settings.USE_SANDBOX_FOR_DONATIONS}")
+        logger.info("Donation API URL: %s", settings.donation_base_url)
+        logger.info("Organization API URL: %s", settings.organization_base_url)
+        logger.info("Sandbox mode for donations: %s", settings.USE_SANDBOX_FOR_DONATIONS)
         
         # Log Plaid configuration status
         import os
@@ -41,9 +76,9 @@ async def lifespan(app: FastAPI):
         plaid_client_id = os.getenv('PLAID_CLIENT_ID', 'not set')
         plaid_secret = os.getenv('PLAID_SECRET', 'not set')
         
-        logger.info(f"Plaid Environment: {plaid_env}")
-        logger.info(f"Plaid Client ID: {'configured' if plaid_client_id != 'not set' else 'not configured'}")
-        logger.info(f"Plaid Secret: {'configured' if plaid_secret != 'not set' else 'not configured'}")
+        logger.info("Plaid Environment: %s", plaid_env)
+        logger.info("Plaid Client ID: %s", 'configured' if plaid_client_id != 'not set' else 'not configured')
+        logger.info("Plaid Secret: %s", 'configured' if plaid_secret != 'not set' else 'not configured')
         
         if plaid_client_id != 'not set' and plaid_secret != 'not set':
             logger.info("Plaid integration: READY")
@@ -54,8 +89,8 @@ async def lifespan(app: FastAPI):
         supabase_url = os.getenv('SUPABASE_URL', 'not set')
         supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY', 'not set')
         
-        logger.info(f"Supabase URL: {'configured' if supabase_url != 'not set' else 'not configured'}")
-        logger.info(f"Supabase Service Role Key: {'configured' if supabase_key != 'not set' else 'not configured'}")
+        logger.info("Supabase URL: %s", 'configured' if supabase_url != 'not set' else 'not configured')
+        logger.info("Supabase Service Role Key: %s", 'configured' if supabase_key != 'not set' else 'not configured')
         
         if supabase_url != 'not set' and supabase_key != 'not set':
             logger.info("Supabase storage: READY")
@@ -63,13 +98,54 @@ async def lifespan(app: FastAPI):
             logger.warning("Supabase storage: NOT CONFIGURED - Using in-memory storage. Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables")
             
     except ValueError as e:
-        logger.error(f"Settings validation failed: {e}")
+        logger.error("Settings validation failed: %s", e)
         raise
     
+    # Under server.py, interrupted jobs and settlements were recovered before
+    # forking, and only the first worker runs the daily settlement
+    worker = current_worker()
+    await webhook_queue.start()
+    if worker is None:
+        await donation_ledger.start()
+    if worker in (None, 0):
+        await settlement_scheduler.start()
+    await donation_dedupe.start()
+    job_queue.register("auto_donate", auto_donation_service.process_auto_donate_job)
+    await job_queue.start(recover=worker is None)
+    # On SIGTERM, fail readiness and stop claiming jobs before the server stops accepting connections
+    shutdown_coordinator.on_drain(job_queue.pause)
+    shutdown_coordinator.start()
+    if settings.METRICS_ENABLED:
+        await loop_lag_monitor.start()
+    
+    # Build the SDK clients on a thread after startup, so the first request
+    # is served immediately and the first Plaid call does not pay for it
+    warmup = None
+    if settings.WARM_CLIENTS_ON_STARTUP:
+        warmup = asyncio.create_task(asyncio.to_thread(warm_clients))
+    
     yield
     
-    # Shutdown
+    # Shutdown: requests have finished; background work shares one deadline
     logger.info("Shutting down Buy4Good API")
+    shutdown_coordinator.begin()
+    deadline = time.monotonic() + settings.SHUTDOWN_TIMEOUT_SECONDS
+    if warmup is not None and not warmup.done():
+        await asyncio.wait([warmup])
+    remaining = max(0.0, deadline - time.monotonic())
+    await asyncio.gather(
+        webhook_queue.stop(timeout=remaining),
+        job_queue.stop(timeout=remaining),
+        settlement_scheduler.stop(timeout=remaining)
+    )
+    await donation_dedupe.stop()
+    await loop_lag_monitor.stop()
+    # Donation writes whose request or job was cut short finish before the clients close
+    await shutdown_coordinator.drain(max(0.0, deadline - time.monotonic()))
+    plaid_client.shutdown()
+    supabase_service.close()
+    local_db.close()
+    shutdown_logging()
 
 
 # Create FastAPI application
@@ -78,9 +154,13 @@ app = FastAPI(
     version=settings.VERSION,
     description="API for donations, transactions, and affiliate network integration via Pledge.to",
     lifespan=lifespan,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    default_response_class=FastJSONResponse
 )
 
+# Rate limit per user and route; added first so it runs inside CORS and 429s carry CORS headers
+app.add_middleware(RateLimitMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -90,6 +170,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses for clients that accept it
+app.add_middleware(CompressionMiddleware)
+
+# Record per-route request metrics; added last so it times the whole middleware stack
+if settings.METRICS_ENABLED:
+    instrument_app()
+    app.add_middleware(MetricsMiddleware)
+
+# Open a root span per request, continuing the caller's W3C trace context
+if settings.TRACING_ENABLED:
+    trace_app()
+    app.add_middleware(TracingMiddleware)
+
+# Count in-flight requests for the shutdown drain; outermost, so it sees every request
+app.add_middleware(ShutdownMiddleware)
+
 # Include route modules
 app.include_router(donations_router, prefix=settings.API_V1_PREFIX, tags=["donations"])
 app.include_router(organizations_router, prefix=settings.API_V1_PREFIX, tags=["organizations"])
@@ -97,13 +193,19 @@ app.include_router(transactions_router, prefix=f"{settings.API_V1_PREFIX}/transa
 app.include_router(health_router, tags=["health"])
 app.include_router(plaid_router, prefix=settings.API_V1_PREFIX, tags=["plaid"])
 app.include_router(settings_router, prefix=settings.API_V1_PREFIX, tags=["settings"])
+app.include_router(webhooks_router, prefix=settings.API_V1_PREFIX, tags=["webhooks"])
+app.include_router(jobs_router, prefix=settings.API_V1_PREFIX, tags=["jobs"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_router, tags=["metrics"])
+if settings.TRACING_ENABLED and settings.TRACING_DEBUG_ENDPOINT:
+    app.include_router(debug_router, tags=["debug"])
 
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """Handle validation errors"""
-    logger.error(f"Validation error: {exc}")
-    return JSONResponse(
+    logger.error("Validation error: %s", exc)
+    return FastJSONResponse(
         status_code=422,
         content={
             "error": "Validation error",
@@ -125,10 +227,15 @@ async def root():
         },
         "endpoints": {
             "health": "/health",
+            "ready": "/ready",
             "donations": f"{settings.API_V1_PREFIX}/donations",
+            "donation_ledger": f"{settings.API_V1_PREFIX}/donations/ledger/{{user_id}}",
             "organizations": f"{settings.API_V1_PREFIX}/organizations",
             "transactions": f"{settings.API_V1_PREFIX}/simulate-transaction",
             "webhooks": f"{settings.API_V1_PREFIX}/webhook",
+            "plaid_webhook": f"{settings.API_V1_PREFIX}/webhooks/plaid",
+            "jobs": f"{settings.API_V1_PREFIX}/jobs/{{job_id}}",
+            "metrics": "/metrics",
             "plaid": {
                 "create_link_token": f"{settings.API_V1_PREFIX}/create_link_token",
                 "exchange_public_token": f"{settings.API_V1_PREFIX}/exchange_public_token",
@@ -140,11 +247,14 @@ async def root():
 
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "main:app",
-        host=settings.HOST,
-        port=settings.PORT,
-        reload=settings.DEBUG,
-        log_level="info" if not settings.DEBUG else "debug"
-    )
+    if settings.DEBUG:
+        import uvicorn
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            reload=True,
+            log_level="debug"
+        )
+    else:
+        serve()
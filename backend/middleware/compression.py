@@ -0,0 +1,205 @@
+import zlib
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+
+# Bodies at least this large are compressed off the event loop
+THREAD_THRESHOLD = 256 * 1024
+
+
+class _Encoder:
+    """Incremental compressor for one response body"""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Compress a chunk; flush makes everything so far decodable by the client"""
+        if self.encoding == "br":
+            return self._compressor.process(data) + (self._compressor.flush() if flush else b"")
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + (
+                self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK) if flush else b""
+            )
+        return self._compressor.compress(data) + (self._compressor.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+    def compress_all(self, data: bytes) -> bytes:
+        return self.compress(data) + self.finish()
+
+
+def available_encodings(preference: List[str]) -> List[str]:
+    """Encodings from the preference list whose library is installed"""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in preference if installed.get(encoding)]
+
+
+def negotiate(accept_encoding: str, supported: List[str]) -> Optional[str]:
+    """
+    Pick the encoding for a request's Accept-Encoding header
+
+    The client's highest q-value wins; ties go to the earliest encoding in
+    supported. An encoding with q=0 is never chosen, and "*" matches any
+    supported encoding the client did not list.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[name] = quality
+
+    best: Tuple[float, int, Optional[str]] = (0.0, 0, None)
+    for rank, encoding in enumerate(supported):
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best[0]:
+            best = (quality, rank, encoding)
+    return best[2]
+
+
+class CompressionMiddleware:
+    """
+    Content-negotiated gzip, brotli and zstd response compression.
+
+    Complete bodies under minimum_size are sent as they are, since compressing
+    them costs more CPU than the bytes it saves. Streamed bodies (more_body),
+    such as NDJSON, are compressed chunk by chunk and flushed after every chunk,
+    so clients can decode each line as soon as it arrives.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.COMPRESSION_MINIMUM_SIZE,
+        encodings: Optional[List[str]] = None,
+        gzip_level: int = settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = settings.COMPRESSION_BROTLI_QUALITY,
+        zstd_level: int = settings.COMPRESSION_ZSTD_LEVEL
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings(encodings or settings.COMPRESSION_ENCODINGS.split(","))
+        self.levels = {"gzip": gzip_level, "br": brotli_quality, "zstd": zstd_level}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.levels[encoding], self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Wraps send for one response, deciding whether and how to compress it"""
+
+    def __init__(self, send: Send, encoding: str, level: int, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._encoder: Optional[_Encoder] = None
+        self._passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            ):
+                self._passthrough = True
+                await self._send(message)
+            else:
+                # Hold the headers until the first body chunk shows how big the body is
+                self._start = message
+            return
+
+        if message["type"] != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._encoder is None:
+            headers = MutableHeaders(raw=self._start["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body and len(body) < self.minimum_size:
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+
+            self._encoder = _Encoder(self.encoding, self.level)
+            headers["Content-Encoding"] = self.encoding
+
+            if not more_body:
+                if len(body) >= THREAD_THRESHOLD:
+                    compressed = await asyncio.to_thread(self._encoder.compress_all, body)
+                else:
+                    compressed = self._encoder.compress_all(body)
+                headers["Content-Length"] = str(len(compressed))
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": compressed, "more_body": False})
+                return
+
+            # Streaming: the final size is unknown
+            del headers["Content-Length"]
+            await self._send(self._start)
+
+        if more_body:
+            chunk = self._encoder.compress(body, flush=True)
+        else:
+            chunk = self._encoder.compress(body) + self._encoder.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,64 @@
+import time
+from typing import Any, Dict, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.metrics import HTTP_IN_FLIGHT, HTTP_LATENCY, HTTP_REQUESTS
+from middleware.routing import match_route
+
+# Requests that match no route share one label, so scanners cannot grow the series count
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Records request count and latency per route template, method and status.
+
+    The route label is the route template (e.g.
+    "/api/v1/total_donation/{user_id}"), never the raw path. Latency runs until
+    the last body chunk is sent, so streamed responses are measured in full.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._children: Dict[Tuple[str, str, str], Tuple[Any, Any]] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec()
+            counter, histogram = self._child(scope["method"], self._route(scope), str(status))
+            counter.inc()
+            histogram.observe(elapsed)
+
+    def _route(self, scope: Scope) -> str:
+        template, _ = match_route(scope)
+        if template is None:
+            # Top-level routes kept out of the schema, such as /metrics and /docs
+            template = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+        return template
+
+    def _child(self, method: str, route: str, status: str) -> Tuple[Any, Any]:
+        """Labelled metrics, cached to keep label resolution off the hot path"""
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                HTTP_REQUESTS.labels(method, route, status),
+                HTTP_LATENCY.labels(method, route, status)
+            )
+        return children
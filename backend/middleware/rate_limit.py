@@ -0,0 +1,263 @@
+import math
+import time
+import logging
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import orjson
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+from services.json_response import FastJSONResponse
+from middleware.routing import match_route
+
+logger = logging.getLogger(__name__)
+
+# Request bodies larger than this are not parsed for a user_id
+MAX_BODY_BYTES = 64 * 1024
+
+# How often idle keys are dropped from the store
+SWEEP_INTERVAL_SECONDS = 60.0
+
+
+def parse_route_limits(spec: str) -> Dict[str, Tuple[int, float]]:
+    """
+    Parse per-route rate limits from "path=requests/seconds,..."
+
+    Paths are route templates as declared, e.g. "/api/v1/balance" or
+    "/api/v1/total_donation/{user_id}".
+    """
+    limits: Dict[str, Tuple[int, float]] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        path, _, limit = entry.rpartition("=")
+        requests, _, window = limit.partition("/")
+        try:
+            limits[path.strip()] = (int(requests), float(window or settings.RATE_LIMIT_WINDOW_SECONDS))
+        except ValueError:
+            logger.warning("Ignoring malformed rate limit entry: %s", entry)
+    return limits
+
+
+def parse_concurrency_limits(spec: str) -> Dict[str, int]:
+    """Parse per-route in-flight caps from "path=count,..." """
+    limits: Dict[str, int] = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        path, _, count = entry.rpartition("=")
+        try:
+            limits[path.strip()] = int(count)
+        except ValueError:
+            logger.warning("Ignoring malformed concurrency limit entry: %s", entry)
+    return limits
+
+
+class RateLimitStore:
+    """
+    In-memory sliding-window log and in-flight counters, keyed by (client, route).
+
+    Every admitted request's timestamp is kept until it leaves the window, so
+    limits are exact rather than approximated from fixed buckets. All methods
+    run on the event loop without awaiting, which makes check-and-record atomic
+    within a process; each worker process keeps its own store.
+    """
+
+    def __init__(self):
+        self._windows: Dict[Tuple[str, str], Deque[float]] = {}
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._last_sweep = time.monotonic()
+        self.rejected_rate = 0
+        self.rejected_concurrency = 0
+
+    def hit(self, key: Tuple[str, str], limit: int, window: float, now: float) -> float:
+        """
+        Record a request if the window has room
+
+        Returns:
+            0 when admitted, otherwise the seconds until a slot frees up
+        """
+        timestamps = self._windows.get(key)
+        if timestamps is None:
+            timestamps = self._windows[key] = deque()
+
+        cutoff = now - window
+        while timestamps and timestamps[0] <= cutoff:
+            timestamps.popleft()
+
+        if len(timestamps) >= limit:
+            self.rejected_rate += 1
+            return timestamps[0] + window - now
+
+        timestamps.append(now)
+        return 0.0
+
+    def acquire(self, key: Tuple[str, str], limit: int) -> bool:
+        """Take an in-flight slot; False when the cap is reached"""
+        count = self._in_flight.get(key, 0)
+        if count >= limit:
+            self.rejected_concurrency += 1
+            return False
+        self._in_flight[key] = count + 1
+        return True
+
+    def release(self, key: Tuple[str, str]):
+        count = self._in_flight.get(key, 0) - 1
+        if count > 0:
+            self._in_flight[key] = count
+        else:
+            self._in_flight.pop(key, None)
+
+    def sweep(self, now: float, max_window: float):
+        """Drop keys whose newest request has left every window"""
+        if now - self._last_sweep < SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+        cutoff = now - max_window
+        stale = [key for key, timestamps in self._windows.items() if not timestamps or timestamps[-1] <= cutoff]
+        for key in stale:
+            del self._windows[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tracked_keys": len(self._windows),
+            "in_flight": sum(self._in_flight.values()),
+            "rejected_rate": self.rejected_rate,
+            "rejected_concurrency": self.rejected_concurrency
+        }
+
+
+class RateLimitMiddleware:
+    """
+    Per-user, per-route sliding-window rate limits and in-flight caps.
+
+    Requests are keyed by the route template, as listed in the OpenAPI schema,
+    and the user they act for: the user_id path parameter, else the user_id
+    field of a JSON body, else the client address. Over-limit requests get a
+    429 with Retry-After and never reach the route, so a looping client cannot
+    spend the shared Plaid and Pledge.to quotas. Rejected requests do not count
+    against the window.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Optional[RateLimitStore] = None,
+        default_limit: int = settings.RATE_LIMIT_REQUESTS,
+        default_window: float = settings.RATE_LIMIT_WINDOW_SECONDS,
+        route_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        default_concurrency: int = settings.CONCURRENCY_LIMIT_DEFAULT,
+        route_concurrency: Optional[Dict[str, int]] = None,
+        exempt_paths: Optional[List[str]] = None,
+        enabled: bool = settings.RATE_LIMIT_ENABLED
+    ):
+        self.app = app
+        self.store = store or rate_limit_store
+        self.default_limit = (default_limit, default_window)
+        self.route_limits = route_limits if route_limits is not None else parse_route_limits(settings.RATE_LIMIT_ROUTES)
+        self.default_concurrency = default_concurrency
+        self.route_concurrency = (
+            route_concurrency if route_concurrency is not None
+            else parse_concurrency_limits(settings.CONCURRENCY_LIMIT_ROUTES)
+        )
+        self.exempt_paths = set(
+            exempt_paths if exempt_paths is not None
+            else [path.strip() for path in settings.RATE_LIMIT_EXEMPT_PATHS.split(",") if path.strip()]
+        )
+        self.max_window = max([default_window] + [window for _, window in self.route_limits.values()])
+        self.enabled = enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        route_path, path_params = match_route(scope)
+        if route_path is None or route_path in self.exempt_paths:
+            # Unknown and undocumented paths never reach upstream services
+            await self.app(scope, receive, send)
+            return
+
+        user_id = path_params.get("user_id")
+        if not user_id and scope["method"] in ("POST", "PUT", "PATCH"):
+            user_id, receive = await self._user_from_body(scope, receive)
+        client = f"user:{user_id}" if user_id else f"ip:{scope['client'][0] if scope.get('client') else 'unknown'}"
+        key = (client, route_path)
+
+        now = time.monotonic()
+        self.store.sweep(now, self.max_window)
+
+        concurrency = self.route_concurrency.get(route_path, self.default_concurrency)
+        if not self.store.acquire(key, concurrency):
+            logger.warning("Concurrency limit of %s reached for %s on %s", concurrency, client, route_path)
+            await self._reject(scope, receive, send, 1.0, f"Too many concurrent requests to {route_path}")
+            return
+
+        try:
+            limit, window = self.route_limits.get(route_path, self.default_limit)
+            retry_after = self.store.hit(key, limit, window, now)
+            if retry_after > 0:
+                logger.warning("Rate limit of %s/%gs exceeded for %s on %s", limit, window, client, route_path)
+                await self._reject(scope, receive, send, retry_after, f"Rate limit of {limit} requests per {window:g} seconds exceeded")
+                return
+
+            await self.app(scope, receive, send)
+        finally:
+            self.store.release(key)
+
+    async def _user_from_body(self, scope: Scope, receive: Receive) -> Tuple[Optional[str], Receive]:
+        """
+        Read the user_id from a JSON request body
+
+        The body is buffered here, so a replaying receive is returned for the
+        route to read it again.
+        """
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("application/json"):
+            return None, receive
+
+        messages: List[Message] = []
+        size = 0
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            size += len(message.get("body", b""))
+            if not message.get("more_body", False) or size > MAX_BODY_BYTES:
+                break
+
+        async def replay() -> Message:
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        if size > MAX_BODY_BYTES or messages[-1]["type"] != "http.request" or messages[-1].get("more_body", False):
+            return None, replay
+
+        try:
+            body = orjson.loads(b"".join(message.get("body", b"") for message in messages))
+        except orjson.JSONDecodeError:
+            return None, replay
+        user_id = body.get("user_id") if isinstance(body, dict) else None
+        return (str(user_id) if user_id else None), replay
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send, retry_after: float, detail: str):
+        seconds = max(1, math.ceil(retry_after))
+        response = FastJSONResponse(
+            status_code=429,
+            content={
+                "error": "Too many requests",
+                "detail": detail,
+                "retry_after": seconds,
+                "status_code": 429
+            },
+            headers={"Retry-After": str(seconds)}
+        )
+        await response(scope, receive, send)
+
+
+# Global instance
+rate_limit_store = RateLimitStore()
@@ -0,0 +1,42 @@
+from typing import Dict, List, Optional, Pattern, Set, Tuple
+from starlette.routing import compile_path
+from starlette.types import Scope
+
+# Where the resolved template is cached, so each middleware matches a request only once
+SCOPE_KEY = "buy4good.route"
+
+_tables: Dict[int, List[Tuple[Pattern, Set[str], str]]] = {}
+
+
+def _route_table(app) -> List[Tuple[Pattern, Set[str], str]]:
+    """Compile the app's documented routes, built on the first request once every router is included"""
+    table = _tables.get(id(app))
+    if table is None:
+        table = []
+        paths = app.openapi().get("paths", {}) if hasattr(app, "openapi") else {}
+        for template, operations in paths.items():
+            regex, _, _ = compile_path(template)
+            table.append((regex, {method.upper() for method in operations}, template))
+        _tables[id(app)] = table
+    return table
+
+
+def match_route(scope: Scope) -> Tuple[Optional[str], Dict[str, str]]:
+    """
+    The full route template and path params a request will be dispatched to
+
+    Templates come from the OpenAPI schema, which carries router prefixes
+    (e.g. "/api/v1/total_donation/{user_id}"), so this works before routing
+    has run. Routes left out of the schema do not match.
+    """
+    cached = scope.get(SCOPE_KEY)
+    if cached is None:
+        cached = (None, {})
+        path = scope["path"]
+        for regex, methods, template in _route_table(scope.get("app")):
+            match = regex.match(path)
+            if match and scope["method"] in methods:
+                cached = (template, match.groupdict())
+                break
+        scope[SCOPE_KEY] = cached
+    return cached
@@ -0,0 +1,32 @@
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.shutdown import shutdown_coordinator
+
+
+class ShutdownMiddleware:
+    """
+    Counts in-flight requests for the shutdown drain.
+
+    Once draining has started, requests are still served, but every response
+    carries Connection: close so keep-alive clients reconnect, and land on an
+    instance that is not shutting down.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_close(message: Message):
+            if message["type"] == "http.response.start" and shutdown_coordinator.draining:
+                MutableHeaders(raw=message["headers"])["connection"] = "close"
+            await send(message)
+
+        shutdown_coordinator.in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_close)
+        finally:
+            shutdown_coordinator.in_flight -= 1
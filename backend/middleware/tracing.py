@@ -0,0 +1,38 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from services.tracing import tracer
+from middleware.routing import match_route
+
+
+class TracingMiddleware:
+    """
+    Opens the root span for every HTTP request.
+
+    A valid W3C traceparent header continues the caller's trace; otherwise a
+    new trace starts. The span is named after the route template, and the
+    response carries a traceresponse header so clients can quote the trace ID.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route, _ = match_route(scope)
+        name = f"{scope['method']} {route or scope['path']}"
+        traceparent = Headers(scope=scope).get("traceparent")
+
+        with tracer.start_trace(name, traceparent, **{"http.method": scope["method"], "http.target": scope["path"]}) as span:
+            if route:
+                span.set_attribute("http.route", route)
+
+            async def send_with_trace(message: Message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    MutableHeaders(raw=message["headers"])["traceresponse"] = span.traceparent
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
@@ -134,6 +134,24 @@ class SimulateTransactionResponse(BaseModel):
     created_at: str = Field(..., description="Creation timestamp")
 
 
+class AutoDonateRequest(BaseModel):
+    """Request model for creating an auto-donation for a transaction"""
+    user_id: str
+    transaction_amount: float
+    original_transaction_id: str
+    donation_percentage: float = 0.01  # 1% default
+    date: str = None  # Optional date, will use current date if not provided
+    charity_id: Optional[str] = None  # Optional charity ID for specific charity donation
+    merchant_name: Optional[str] = None  # Optional merchant name
+    product_name: Optional[str] = None  # Optional product name
+    merchant_logo: Optional[str] = None  # Optional merchant logo URL
+
+
+class AutoDonateBatchRequest(BaseModel):
+    """Request model for creating auto-donations for many transactions at once"""
+    transactions: List[AutoDonateRequest] = Field(..., min_length=1, max_length=1000, description="Transactions to donate for")
+
+
 class WebhookRequest(BaseModel):
     """Request model for webhook handling"""
     event_type: str = Field(..., description="Type of webhook event")
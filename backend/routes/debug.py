@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Query
+from services.tracing import ring_buffer, tracer
+
+router = APIRouter()
+
+
+@router.get(
+    "/debug/traces",
+    summary="Slowest recent traces",
+    description="The slowest traces in the in-process ring buffer, with every span's timing",
+    include_in_schema=False
+)
+async def slowest_traces(limit: int = Query(10, ge=1, le=100)):
+    """Show where the time went in the slowest recent requests and jobs"""
+    return {
+        "tracing": tracer.stats(),
+        "traces": ring_buffer.slowest(limit)
+    }
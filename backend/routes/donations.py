@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
 from models import DonationRequest, DonationResponse, ErrorResponse
 from services.pledge_client import pledge_client
+from services.donation_ledger import donation_ledger
+from services.json_response import FastJSONResponse
+import asyncio
 import requests
 import logging
 
@@ -33,20 +35,20 @@ async def create_donation(donation_request: DonationRequest):
     and returns the response.
     """
     try:
-        logger.info(f"Creating donation for {donation_request.email} to organization {donation_request.organization_id}")
+        logger.info("Creating donation for %s to organization %s", donation_request.email, donation_request.organization_id)
         
         # Call Pledge.to API (sandbox for donations)
         response_data = await pledge_client.create_donation(donation_request)
         
-        logger.info(f"Donation created successfully with ID: {response_data.get('id', 'unknown')}")
+        logger.info("Donation created with ID: %s", response_data.get('id', 'unknown'))
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status.HTTP_201_CREATED,
             content=response_data
         )
         
     except requests.HTTPError as e:
-        logger.error(f"Pledge.to API error: {e.response.status_code} - {e.response.text}")
+        logger.error("Pledge.to API error: %s - %s", e.response.status_code, e.response.text)
         
         # Handle different HTTP status codes from Pledge.to API
         if e.response.status_code == 400:
@@ -68,7 +70,7 @@ async def create_donation(donation_request: DonationRequest):
             # Parse validation errors from response
             try:
                 error_detail = e.response.json()
-                logger.error(f"Validation error details: {error_detail}")
+                logger.error("Validation error details: %s", error_detail)
                 raise HTTPException(
                     status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                     detail=f"Validation error: {error_detail}"
@@ -85,15 +87,45 @@ async def create_donation(donation_request: DonationRequest):
             )
             
     except requests.RequestException as e:
-        logger.error(f"Request error: {str(e)}")
+        logger.error("Request error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to connect to donation service"
         )
         
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
         )
+
+
+@router.get(
+    "/donations/ledger/{user_id}",
+    summary="Get a user's donation ledger",
+    description="Show a user's micro-donations still accruing versus those already settled to Pledge.to, per charity."
+)
+async def get_donation_ledger(user_id: str):
+    """
+    Get pending and settled donation amounts for a user.
+
+    Auto-donations accrue per charity and are settled to Pledge.to as a single
+    donation once the balance reaches the settlement threshold or window.
+    """
+    try:
+        ledger = await asyncio.to_thread(donation_ledger.get_balances, user_id)
+
+        for balance in [ledger, *ledger['charities']]:
+            for key in ('pending', 'settled', 'unconfirmed'):
+                balance[f"{key}_amount"] = balance[f"{key}_cents"] / 100
+        ledger['threshold_amount'] = ledger['threshold_cents'] / 100
+
+        return ledger
+
+    except Exception as e:
+        logger.error("Error getting donation ledger for user %s: %s", user_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get donation ledger"
+        )
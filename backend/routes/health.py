@@ -1,6 +1,7 @@
 from fastapi import APIRouter, status
-from fastapi.responses import JSONResponse
 from services.pledge_client import pledge_client
+from services.json_response import FastJSONResponse
+from services.shutdown import shutdown_coordinator
 from config import settings
 import logging
 
@@ -16,6 +17,12 @@ router = APIRouter()
 )
 async def health_check():
     """Comprehensive health check endpoint"""
+    if shutdown_coordinator.draining:
+        return FastJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "draining", "service": settings.PROJECT_NAME}
+        )
+
     try:
         # Check if Pledge.to API is accessible
         api_healthy = await pledge_client.health_check()
@@ -41,14 +48,14 @@ async def health_check():
         
         status_code = status.HTTP_200_OK if api_healthy else status.HTTP_503_SERVICE_UNAVAILABLE
         
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=status_code,
             content=health_status
         )
         
     except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return JSONResponse(
+        logger.error("Health check failed: %s", e)
+        return FastJSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={
                 "status": "unhealthy",
@@ -58,6 +65,21 @@ async def health_check():
         )
 
 
+@router.get(
+    "/ready",
+    summary="Readiness check",
+    description="Whether this instance should receive traffic; fails as soon as a graceful shutdown starts"
+)
+async def ready():
+    """Readiness endpoint for load balancers"""
+    if shutdown_coordinator.draining:
+        return FastJSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "draining"}
+        )
+    return {"status": "ready"}
+
+
 @router.get(
     "/ping",
     summary="Simple ping check",
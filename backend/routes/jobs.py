@@ -0,0 +1,35 @@
+import asyncio
+import logging
+from fastapi import APIRouter, HTTPException
+from services.job_queue import job_queue
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of a background job, and its result once it has succeeded"""
+    try:
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        return {
+            "success": True,
+            "job_id": job['job_id'],
+            "kind": job['kind'],
+            "status": job['status'],
+            "attempts": job['attempts'],
+            "max_attempts": job['max_attempts'],
+            "result": job['result'],
+            "error": job['error'],
+            "created_at": job['created_at'],
+            "updated_at": job['updated_at']
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error getting job %s: %s", job_id, e)
+        raise HTTPException(status_code=500, detail=f"Error getting job: {e}")
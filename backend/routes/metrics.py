@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from services.metrics import scrape_registry
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus metrics",
+    description="Request, upstream and event-loop metrics in the Prometheus text format",
+    include_in_schema=False
+)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(generate_latest(scrape_registry()), media_type=CONTENT_TYPE_LATEST)
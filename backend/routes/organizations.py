@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, status, Query, Response
 from models import Organization, OrganizationsListResponse, ErrorResponse
+from config import settings
 from services.pledge_client import pledge_client
+from services.json_response import dumps
+from services.shared_cache import shared_cache
 import requests
 import logging
 from typing import Optional
@@ -12,6 +14,11 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _json(body: bytes) -> Response:
+    """Serve already encoded JSON, cached or freshly fetched, as is"""
+    return Response(content=body, status_code=status.HTTP_200_OK, media_type="application/json")
+
+
 @router.get(
     "/organizations/{organization_id}",
     response_model=Organization,
@@ -28,21 +35,25 @@ async def get_organization_by_id(organization_id: str):
     """
     Get detailed information about a specific nonprofit organization by ID.
     """
+    cache_key = f"organization:{organization_id}"
+    cached = shared_cache.get(cache_key)
+    if cached is not None:
+        return _json(cached)
+
     try:
-        logger.info(f"Fetching organization details for ID: {organization_id}")
+        logger.debug("Fetching organization details for ID: %s", organization_id)
         
         # Call Pledge.to API
         response_data = await pledge_client.get_organization_by_id(organization_id)
         
-        logger.info(f"Successfully fetched organization: {response_data.get('name', 'unknown')}")
+        logger.info("Fetched organization %s", organization_id)
         
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=response_data
-        )
+        body = dumps(response_data)
+        shared_cache.put(cache_key, body, settings.ORGANIZATION_CACHE_TTL_SECONDS)
+        return _json(body)
         
     except requests.HTTPError as e:
-        logger.error(f"Pledge.to API error: {e.response.status_code} - {e.response.text}")
+        logger.error("Pledge.to API error: %s - %s", e.response.status_code, e.response.text)
         
         if e.response.status_code == 404:
             raise HTTPException(
@@ -61,14 +72,14 @@ async def get_organization_by_id(organization_id: str):
             )
             
     except requests.RequestException as e:
-        logger.error(f"Request error: {str(e)}")
+        logger.error("Request error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to connect to organizations service"
         )
         
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
@@ -96,7 +107,7 @@ async def list_organizations(
     Get a paginated list of nonprofit organizations with optional filtering.
     """
     try:
-        logger.info(f"Fetching organizations list - page: {page}, per_page: {per_page}")
+        logger.debug("Fetching organizations list - page: %s, per_page: %s", page, per_page)
         
         # Build query parameters
         params = {
@@ -108,18 +119,23 @@ async def list_organizations(
         if cause_id:
             params["cause_id"] = cause_id
         
+        # Pages are cached per filter, so a cause's organizations are shared too
+        cache_key = "organizations:" + "&".join(f"{key}={value}" for key, value in sorted(params.items()))
+        cached = shared_cache.get(cache_key)
+        if cached is not None:
+            return _json(cached)
+        
         # Call Pledge.to API
         response_data = await pledge_client.list_organizations(params)
         
-        logger.info(f"Successfully fetched organizations list")
+        logger.info("Fetched organizations list page %s", page)
         
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=response_data
-        )
+        body = dumps(response_data)
+        shared_cache.put(cache_key, body, settings.ORGANIZATION_CACHE_TTL_SECONDS)
+        return _json(body)
         
     except requests.HTTPError as e:
-        logger.error(f"Pledge.to API error: {e.response.status_code} - {e.response.text}")
+        logger.error("Pledge.to API error: %s - %s", e.response.status_code, e.response.text)
         
         if e.response.status_code == 401:
             raise HTTPException(
@@ -133,14 +149,14 @@ async def list_organizations(
             )
             
     except requests.RequestException as e:
-        logger.error(f"Request error: {str(e)}")
+        logger.error("Request error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to connect to organizations service"
         )
         
     except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
+        logger.error("Unexpected error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
@@ -1,23 +1,22 @@
 from fastapi import APIRouter, HTTPException, Request, Depends
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
-import plaid
-from plaid.api import plaid_api
-from plaid.model.link_token_create_request import LinkTokenCreateRequest
-from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-from plaid.model.products import Products
-from plaid.model.country_code import CountryCode
-from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
-from plaid.model.accounts_balance_get_request import AccountsBalanceGetRequest
-from plaid.api import plaid_api
+from pydantic import BaseModel, Field
+from typing import Optional, Any
 import os
 import logging
 from config import settings
 from services.supabase_client import supabase_service
+from services.plaid_client import plaid_client, PlaidBulkheadFullError
+from services.transaction_store import transaction_store
+from services.balance_cache import balance_cache
+from services.json_response import FastJSONResponse
+from services.lazy import lazy_import
+import asyncio
 
 logger = logging.getLogger(__name__)
 
+# The Plaid SDK and its request models load on the first Plaid request, not at startup
+plaid = lazy_import("plaid")
+
 router = APIRouter()
 
 # Pydantic models for request/response
@@ -31,20 +30,7 @@ class ExchangeTokenRequest(BaseModel):
 
 class BalanceRequest(BaseModel):
     user_id: str
-
-# Plaid client configuration
-def get_plaid_client():
-    """Create and return a configured Plaid client"""
-    configuration = plaid.Configuration(
-        host=plaid.Environment.Sandbox if os.getenv('PLAID_ENV') == 'sandbox' else plaid.Environment.Production,
-        api_key={
-            'clientId': os.getenv('PLAID_CLIENT_ID'),
-            'secret': os.getenv('PLAID_SECRET'),
-        }
-    )
-    
-    api_client = plaid.ApiClient(configuration)
-    return plaid_api.PlaidApi(api_client)
+    max_age: Optional[float] = Field(None, ge=0, description="Maximum acceptable balance age in seconds (0 forces a fresh fetch)")
 
 # Fallback in-memory storage (used only if Supabase is not configured)
 user_access_tokens = {}
@@ -66,7 +52,7 @@ async def store_user_access_token(user_id: str, access_token: str):
     if not success:
         # Fallback to in-memory storage
         user_access_tokens[user_id] = access_token
-        logger.warning(f"Stored access token in memory for user: {user_id}")
+        logger.warning("Stored access token in memory for user: %s", user_id)
 
 @router.post(
     "/create_link_token",
@@ -75,8 +61,12 @@ async def store_user_access_token(user_id: str, access_token: str):
 )
 async def create_link_token(request: CreateLinkTokenRequest, req: Request):
     """Creates a Link token and returns it"""
+    from plaid.model.link_token_create_request import LinkTokenCreateRequest
+    from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
+    from plaid.model.products import Products
+    from plaid.model.country_code import CountryCode
+
     try:
-        client = get_plaid_client()
         user_id = request.user_id or f"user_{req.client.host}"
         
         # Create user object
@@ -91,6 +81,10 @@ async def create_link_token(request: CreateLinkTokenRequest, req: Request):
             country_codes=[CountryCode("US")]
         )
         
+        # Have Plaid notify us about new transactions
+        if settings.PLAID_WEBHOOK_URL:
+            payload.webhook = settings.PLAID_WEBHOOK_URL
+        
         # Add platform-specific configurations
         if request.address == "localhost":
             # iOS configuration
@@ -104,16 +98,19 @@ async def create_link_token(request: CreateLinkTokenRequest, req: Request):
                 payload.android_package_name = android_package
         
         # Create the link token
-        response = client.link_token_create(payload)
+        response = await plaid_client.call("link_token_create", payload)
         
-        logger.info(f"Link token created successfully for user: {user_id}")
-        return response.to_dict()
+        logger.info("Link token created for user: %s", user_id)
+        return FastJSONResponse(response)
         
+    except PlaidBulkheadFullError as e:
+        logger.warning("Plaid executor saturated while creating link token: %s", e)
+        raise HTTPException(status_code=503, detail="Plaid service is busy, please retry shortly")
     except plaid.ApiException as e:
-        logger.error(f"Plaid API error creating link token: {str(e)}")
+        logger.error("Plaid API error creating link token: %s", e)
         raise HTTPException(status_code=500, detail=f"Plaid API error: {str(e)}")
     except Exception as e:
-        logger.error(f"Error creating link token: {str(e)}")
+        logger.error("Error creating link token: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to create link token: {str(e)}")
 
 @router.post(
@@ -123,40 +120,48 @@ async def create_link_token(request: CreateLinkTokenRequest, req: Request):
 )
 async def exchange_public_token(request: ExchangeTokenRequest, req: Request):
     """Exchanges the public token from Plaid Link for an access token"""
+    from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
+
     try:
-        client = get_plaid_client()
-        
         # Exchange the public token for an access token
         exchange_request = ItemPublicTokenExchangeRequest(
             public_token=request.public_token
         )
         
-        response = client.item_public_token_exchange(exchange_request)
+        response = await plaid_client.call("item_public_token_exchange", exchange_request)
         access_token = response['access_token']
         
         # Store access token for the specific user
         await store_user_access_token(request.user_id, access_token)
         
-        logger.info(f"Public token exchanged successfully for user: {request.user_id}")
+        # A new item starts a fresh transactions/sync history and balance
+        await asyncio.to_thread(transaction_store.delete_user, request.user_id)
+        await asyncio.to_thread(transaction_store.link_item, request.user_id, response['item_id'])
+        balance_cache.invalidate(request.user_id)
+        
+        logger.info("Public token exchanged for user: %s", request.user_id)
         return {"success": True}
         
+    except PlaidBulkheadFullError as e:
+        logger.warning("Plaid executor saturated while exchanging public token: %s", e)
+        raise HTTPException(status_code=503, detail="Plaid service is busy, please retry shortly")
     except plaid.ApiException as e:
-        logger.error(f"Plaid API error exchanging public token: {str(e)}")
+        logger.error("Plaid API error exchanging public token: %s", e)
         raise HTTPException(status_code=500, detail=f"Plaid API error: {str(e)}")
     except Exception as e:
-        logger.error(f"Error exchanging public token: {str(e)}")
+        logger.error("Error exchanging public token: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to exchange public token: {str(e)}")
 
 @router.post(
     "/balance",
     summary="Get Account Balance",
-    description="Fetches balance data using the Plaid API"
+    description="Fetches balance data using the Plaid API, served from a short-lived per-user cache"
 )
 async def get_balance(request: BalanceRequest, req: Request):
     """Fetches balance data using the Plaid API"""
-    try:
-        client = get_plaid_client()
-        
+    async def fetch_balance() -> Any:
+        from plaid.model.accounts_balance_get_request import AccountsBalanceGetRequest
+
         # Get access token for the specific user
         access_token = await get_user_access_token(request.user_id)
         
@@ -165,18 +170,32 @@ async def get_balance(request: BalanceRequest, req: Request):
         
         # Get account balances
         balance_request = AccountsBalanceGetRequest(access_token=access_token)
-        response = client.accounts_balance_get(balance_request)
+        response = await plaid_client.call("accounts_balance_get", balance_request)
         
-        logger.info(f"Balance retrieved successfully for user: {request.user_id}")
-        return {
-            "Balance": response.to_dict()
-        }
+        logger.info("Balance retrieved for user: %s", request.user_id)
+        # The cache holds the Plaid model; it is encoded once, on the way out
+        return response
+    
+    try:
+        result = await balance_cache.get(request.user_id, fetch_balance, max_age=request.max_age)
         
+        return FastJSONResponse({
+            "Balance": result['balance'],
+            "age_seconds": result['age_seconds'],
+            "fetched_at": result['fetched_at'],
+            "cached": result['cached']
+        })
+        
+    except HTTPException:
+        raise
+    except PlaidBulkheadFullError as e:
+        logger.warning("Plaid executor saturated while getting balance: %s", e)
+        raise HTTPException(status_code=503, detail="Plaid service is busy, please retry shortly")
     except plaid.ApiException as e:
-        logger.error(f"Plaid API error getting balance: {str(e)}")
+        logger.error("Plaid API error getting balance: %s", e)
         raise HTTPException(status_code=500, detail=f"Plaid API error: {str(e)}")
     except Exception as e:
-        logger.error(f"Error getting balance: {str(e)}")
+        logger.error("Error getting balance: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to get balance: {str(e)}")
 
 @router.delete(
@@ -189,12 +208,14 @@ async def delete_access_token(user_id: str):
     try:
         success = await supabase_service.delete_access_token(user_id)
         if success:
+            await asyncio.to_thread(transaction_store.delete_user, user_id)
+            balance_cache.invalidate(user_id)
             return {"success": True, "message": f"Access token deleted for user: {user_id}"}
         else:
             raise HTTPException(status_code=404, detail="No access token found for this user")
             
     except Exception as e:
-        logger.error(f"Error deleting access token: {e}")
+        logger.error("Error deleting access token: %s", e)
         raise HTTPException(status_code=500, detail=f"Error deleting access token: {e}")
 
 @router.get(
@@ -213,7 +234,7 @@ async def get_total_donation(user_id: str):
         }
         
     except Exception as e:
-        logger.error(f"Error getting total donation amount: {e}")
+        logger.error("Error getting total donation amount: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting total donation amount: {e}")
 
 @router.get(
@@ -231,7 +252,7 @@ async def get_recent_donations(user_id: str, limit: int = 10):
         }
         
     except Exception as e:
-        logger.error(f"Error getting recent donations: {e}")
+        logger.error("Error getting recent donations: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting recent donations: {e}")
 
 @router.get(
@@ -256,7 +277,7 @@ async def check_plaid_connection(user_id: str):
             }
             
     except Exception as e:
-        logger.error(f"Error checking Plaid connection for user {user_id}: {str(e)}")
+        logger.error("Error checking Plaid connection for user %s: %s", user_id, e)
         return {
             "connected": False,
             "message": "Error checking connection status"
@@ -275,7 +296,7 @@ async def plaid_health_check():
         missing_vars = [var for var in required_vars if not os.getenv(var)]
         
         if missing_vars:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=503,
                 content={
                     "status": "unhealthy",
@@ -285,7 +306,7 @@ async def plaid_health_check():
             )
         
         # Test Plaid client creation
-        client = get_plaid_client()
+        plaid_client.api
         
         return {
             "status": "healthy",
@@ -296,12 +317,14 @@ async def plaid_health_check():
                 "secret_configured": bool(os.getenv('PLAID_SECRET')),
                 "redirect_uri_configured": bool(os.getenv('PLAID_SANDBOX_REDIRECT_URI')),
                 "android_package_configured": bool(os.getenv('PLAID_ANDROID_PACKAGE_NAME'))
-            }
+            },
+            "executor": plaid_client.stats(),
+            "balance_cache": balance_cache.stats()
         }
         
     except Exception as e:
-        logger.error(f"Plaid health check failed: {str(e)}")
-        return JSONResponse(
+        logger.error("Plaid health check failed: %s", e)
+        return FastJSONResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
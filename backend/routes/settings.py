@@ -1,7 +1,9 @@
 import logging
+from typing import Dict, List, Optional
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from services.supabase_client import supabase_service
+from services.donation_rules import PLAID_CATEGORIES
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -20,6 +22,15 @@ class UpdateAllocationPercentageRequest(BaseModel):
     charity_id: str
     allocation_percentage: float
 
+class DonationRules(BaseModel):
+    category_percentages: Dict[str, float] = Field(default_factory=dict)  # e.g. {"FOOD_AND_DRINK": 0.02}
+    excluded_merchants: List[str] = Field(default_factory=list, max_length=1000)
+    daily_cap: Optional[float] = Field(None, ge=0)  # Dollars per day of purchases
+
+class UpdateDonationRulesRequest(BaseModel):
+    user_id: str
+    rules: DonationRules
+
 @router.post("/update_donation_percentage")
 async def update_donation_percentage(request: UpdateDonationPercentageRequest):
     """Update user's auto-donation percentage"""
@@ -42,7 +53,7 @@ async def update_donation_percentage(request: UpdateDonationPercentageRequest):
             raise HTTPException(status_code=500, detail="Failed to update donation percentage")
 
     except Exception as e:
-        logger.error(f"Error updating donation percentage: {e}")
+        logger.error("Error updating donation percentage: %s", e)
         raise HTTPException(status_code=500, detail=f"Error updating donation percentage: {e}")
 
 @router.post("/toggle_auto_donate")
@@ -64,7 +75,7 @@ async def toggle_auto_donate(request: ToggleAutoDonateRequest):
             raise HTTPException(status_code=500, detail="Failed to toggle auto-donate")
 
     except Exception as e:
-        logger.error(f"Error toggling auto-donate: {e}")
+        logger.error("Error toggling auto-donate: %s", e)
         raise HTTPException(status_code=500, detail=f"Error toggling auto-donate: {e}")
 
 @router.get("/get_user_settings/{user_id}")
@@ -79,7 +90,7 @@ async def get_user_settings(user_id: str):
         }
 
     except Exception as e:
-        logger.error(f"Error getting user settings: {e}")
+        logger.error("Error getting user settings: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting user settings: {e}")
 
 @router.get("/get_user_charity_preferences/{user_id}")
@@ -94,7 +105,7 @@ async def get_user_charity_preferences(user_id: str):
         }
 
     except Exception as e:
-        logger.error(f"Error getting user charity preferences: {e}")
+        logger.error("Error getting user charity preferences: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting user charity preferences: {e}")
 
 @router.post("/update_allocation_percentage")
@@ -121,9 +132,37 @@ async def update_allocation_percentage(request: UpdateAllocationPercentageReques
             raise HTTPException(status_code=500, detail="Failed to update allocation percentage")
 
     except Exception as e:
-        logger.error(f"Error updating allocation percentage: {e}")
+        logger.error("Error updating allocation percentage: %s", e)
         raise HTTPException(status_code=500, detail=f"Error updating allocation percentage: {e}")
 
+@router.post("/update_donation_rules")
+async def update_donation_rules(request: UpdateDonationRulesRequest):
+    """Update user's category donation rules, merchant exclusions and daily cap"""
+    try:
+        unknown_categories = set(request.rules.category_percentages) - set(PLAID_CATEGORIES)
+        if unknown_categories:
+            raise HTTPException(status_code=400, detail=f"Unknown categories: {', '.join(sorted(unknown_categories))}")
+        if any(percentage < 0 or percentage > 0.1 for percentage in request.rules.category_percentages.values()):
+            raise HTTPException(status_code=400, detail="Category percentages must be between 0% and 10%")
+
+        rules = request.rules.model_dump()
+        success = await supabase_service.update_donation_rules(request.user_id, rules)
+
+        if success:
+            return {
+                "success": True,
+                "message": "Donation rules updated successfully",
+                "rules": rules
+            }
+        else:
+            raise HTTPException(status_code=500, detail="Failed to update donation rules")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error updating donation rules: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error updating donation rules: {e}")
+
 @router.get("/settings_health")
 async def settings_health_check():
     """Health check for settings endpoint"""
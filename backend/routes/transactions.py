@@ -1,23 +1,36 @@
 import os
+import asyncio
 import logging
-import json
-from typing import Optional, List
+from typing import Optional, List, Literal
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import plaid
-from plaid.api import plaid_api
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from config import settings
+from models import AutoDonateRequest, AutoDonateBatchRequest
 from services.supabase_client import supabase_service
-from datetime import datetime
+from services.plaid_client import plaid_client, PlaidBulkheadFullError
+from services.transaction_store import transaction_store
+from services.transaction_sync import transaction_sync_service
+from services.transaction_pager import transaction_pager
+from services.auto_donation import auto_donation_service
+from services.donation_dedupe import donation_dedupe
+from services.job_queue import job_queue
+from services.sandbox_generator import sandbox_generator
+from services.json_response import FastJSONResponse, dumps
+from services.lazy import lazy_import
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+plaid = lazy_import("plaid")
+
 # Pydantic models
 class GetTransactionsRequest(BaseModel):
     user_id: str
     start_date: str
     end_date: str
     account_ids: Optional[List[str]] = None
+    refresh: bool = True  # Sync new changes from Plaid before reading the local store
 
 class CreateSandboxTransactionRequest(BaseModel):
     user_id: str
@@ -26,28 +39,13 @@ class CreateSandboxTransactionRequest(BaseModel):
     category: str = "FOOD_AND_DRINK"
     date: str
 
-class AutoDonateRequest(BaseModel):
+class BulkSandboxTransactionsRequest(BaseModel):
     user_id: str
-    transaction_amount: float
-    original_transaction_id: str
-    donation_percentage: float = 0.01  # 1% default
-    date: str = None  # Optional date, will use current date if not provided
-    charity_id: Optional[str] = None  # Optional charity ID for specific charity donation
-    merchant_name: Optional[str] = None  # Optional merchant name
-    product_name: Optional[str] = None  # Optional product name
-    merchant_logo: Optional[str] = None  # Optional merchant logo URL
-
-def get_plaid_client():
-    """Create and return a configured Plaid client"""
-    configuration = plaid.Configuration(
-        host=plaid.Environment.Sandbox if os.getenv('PLAID_ENV') == 'sandbox' else plaid.Environment.Production,
-        api_key={
-            'clientId': os.getenv('PLAID_CLIENT_ID'),
-            'secret': os.getenv('PLAID_SECRET'),
-        }
-    )
-    api_client = plaid.ApiClient(configuration)
-    return plaid_api.PlaidApi(api_client)
+    count: int = Field(1000, ge=1, le=100000)
+    seed: int = 0  # Same seed, count and dates produce the same dataset
+    target: Literal["local", "plaid"] = "local"
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
 
 async def get_user_access_token(user_id: str) -> Optional[str]:
     """Get access token for a specific user"""
@@ -61,33 +59,101 @@ async def get_user_access_token(user_id: str) -> Optional[str]:
 
 @router.post("/get_transactions")
 async def get_transactions(request: GetTransactionsRequest):
-    """Get transactions for a user"""
+    """Get transactions for a user from the local store, syncing new changes from Plaid first"""
     try:
-        access_token = await get_user_access_token(request.user_id)
-        if not access_token:
-            raise HTTPException(status_code=404, detail="No access token available for this user")
+        sync_summary = None
+        if request.refresh:
+            access_token = await get_user_access_token(request.user_id)
+            if not access_token:
+                raise HTTPException(status_code=404, detail="No access token available for this user")
 
-        plaid_client = get_plaid_client()
-        
-        # Get transactions
-        response = plaid_client.transactions_get({
-            'access_token': access_token,
-            'start_date': request.start_date,
-            'end_date': request.end_date,
-            'options': {
-                'account_ids': request.account_ids
+            # Pull only what changed since the stored cursor
+            delta = await transaction_sync_service.sync_user(request.user_id, access_token)
+            sync_summary = {
+                "added": len(delta['added']),
+                "modified": len(delta['modified']),
+                "removed": len(delta['removed']),
+                "donations_created": delta['donations_created']
             }
-        })
 
-        return response.to_dict()
+        transactions = await asyncio.to_thread(
+            transaction_store.get_transactions,
+            request.user_id,
+            request.start_date,
+            request.end_date,
+            request.account_ids
+        )
+
+        # Returned as a response so thousands of transactions skip jsonable_encoder
+        return FastJSONResponse({
+            "transactions": transactions,
+            "total_transactions": len(transactions),
+            "sync": sync_summary
+        })
 
+    except HTTPException:
+        raise
+    except PlaidBulkheadFullError as e:
+        logger.warning("Plaid executor saturated: %s", e)
+        raise HTTPException(status_code=503, detail="Plaid service is busy, please retry shortly")
     except plaid.ApiException as e:
-        logger.error(f"Plaid API error: {e}")
+        logger.error("Plaid API error: %s", e)
         raise HTTPException(status_code=400, detail=f"Plaid API error: {e}")
     except Exception as e:
-        logger.error(f"Error getting transactions: {e}")
+        logger.error("Error getting transactions: %s", e)
         raise HTTPException(status_code=500, detail=f"Error getting transactions: {e}")
 
+@router.post("/stream_transactions")
+async def stream_transactions(request: GetTransactionsRequest):
+    """Stream every transaction in a date window straight from Plaid as NDJSON"""
+    try:
+        access_token = await get_user_access_token(request.user_id)
+        if not access_token:
+            raise HTTPException(status_code=404, detail="No access token available for this user")
+
+        # Fetch the first page up front so errors still map to a proper status code
+        first_page = await transaction_pager.get_page(
+            access_token,
+            request.start_date,
+            request.end_date,
+            0,
+            request.account_ids
+        )
+
+    except HTTPException:
+        raise
+    except PlaidBulkheadFullError as e:
+        logger.warning("Plaid executor saturated: %s", e)
+        raise HTTPException(status_code=503, detail="Plaid service is busy, please retry shortly")
+    except plaid.ApiException as e:
+        logger.error("Plaid API error: %s", e)
+        raise HTTPException(status_code=400, detail=f"Plaid API error: {e}")
+    except Exception as e:
+        logger.error("Error streaming transactions: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error streaming transactions: {e}")
+
+    async def ndjson_lines():
+        try:
+            async for page in transaction_pager.iter_pages(
+                first_page,
+                access_token,
+                request.start_date,
+                request.end_date,
+                request.account_ids
+            ):
+                # Transaction is a composed Plaid model; each line must be its fields, not its repr
+                yield b"".join(dumps(transaction.to_dict()) + b"\n" for transaction in page)
+        except Exception as e:
+            # Headers are already sent, so report the failure as the last line
+            logger.error("Error streaming transactions for user %s: %s", request.user_id, e)
+            yield dumps({"error": f"Error streaming transactions: {e}"}) + b"\n"
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Total-Transactions": str(first_page['total_transactions'])}
+    )
+
 @router.post("/create_sandbox_transaction")
 async def create_sandbox_transaction(request: CreateSandboxTransactionRequest):
     """Create a sandbox transaction for testing"""
@@ -96,10 +162,8 @@ async def create_sandbox_transaction(request: CreateSandboxTransactionRequest):
         if not access_token:
             raise HTTPException(status_code=404, detail="No access token available for this user")
 
-        plaid_client = get_plaid_client()
-        
         # Create sandbox transaction
-        response = plaid_client.sandbox_transactions_create({
+        response = await plaid_client.call("sandbox_transactions_create", {
             'access_token': access_token,
             'transactions': [{
                 'amount': request.amount,
@@ -109,221 +173,95 @@ async def create_sandbox_transaction(request: CreateSandboxTransactionRequest):
             }]
         })
 
-        return response.to_dict()
+        return FastJSONResponse(response)
 
+    except PlaidBulkheadFullError as e:
+        logger.warning("Plaid executor saturated: %s", e)
+        raise HTTPException(status_code=503, detail="Plaid service is busy, please retry shortly")
     except plaid.ApiException as e:
-        logger.error(f"Plaid API error: {e}")
+        logger.error("Plaid API error: %s", e)
         raise HTTPException(status_code=400, detail=f"Plaid API error: {e}")
     except Exception as e:
-        logger.error(f"Error creating sandbox transaction: {e}")
+        logger.error("Error creating sandbox transaction: %s", e)
         raise HTTPException(status_code=500, detail=f"Error creating sandbox transaction: {e}")
 
-@router.post("/auto_donate")
-async def auto_donate(request: AutoDonateRequest):
-    """Create auto-donation for a transaction using Pledge API"""
+@router.post("/create_sandbox_transactions_bulk")
+async def create_sandbox_transactions_bulk(request: BulkSandboxTransactionsRequest):
+    """Generate a reproducible synthetic dataset of purchases for load testing"""
     try:
-        # Calculate donation amount
-        donation_amount = request.transaction_amount * request.donation_percentage
-        
-        # Use current date if not provided
-        donation_date = request.date or datetime.now().strftime('%Y-%m-%d')
-        
-        # If specific charity_id is provided, use it
-        if request.charity_id:
-            charity_id = request.charity_id
-            charity_name = await supabase_service.get_charity_name(charity_id)
-        else:
-            # Get user's charity preferences with allocation percentages
-            charity_preferences = await supabase_service.get_user_charity_preferences(request.user_id)
-            
-            if not charity_preferences:
-                # Fallback to mock donation if no preferences
-                logger.info(f"No charity preferences found for user {request.user_id}, creating mock donation")
-                return await create_mock_donation(request, donation_amount, donation_date)
-            
-            # For now, use the first charity preference
-            # TODO: Implement distribution across multiple charities based on allocation percentages
-            charity_id = charity_preferences[0]['charity_id']
-            charity_name = await supabase_service.get_charity_name(charity_id)
-        
-        # For now, let's create a mock donation to test the flow
-        # TODO: Fix Pledge API integration
-        mock_donation_id = f"mock_donation_{int(datetime.now().timestamp())}"
-        
-        # Store donation record in database
-        donation_data = {
-            'user_id': request.user_id,
-            'charity_id': charity_id,
-            'charity_name': charity_name or f"Charity {charity_id}",
-            'donation_amount': donation_amount,
-            'transaction_id': mock_donation_id,
-            'original_transaction_id': request.original_transaction_id,
-            'donation_percentage': request.donation_percentage,
-            'donation_date': donation_date,
-            'merchant_name': request.merchant_name,
-            'product_name': request.product_name,
-            'merchant_logo': request.merchant_logo
-        }
-        
-        donation_created = await supabase_service.create_user_donation(donation_data)
-        if not donation_created:
-            logger.error(f"Failed to create donation record for user: {request.user_id}")
-        else:
-            logger.info(f"Successfully created donation record for user: {request.user_id}")
-        
-        # Update user's total donation amount
-        await supabase_service.update_user_total_donation(request.user_id, donation_amount)
+        access_token = None
+        if request.target == "plaid":
+            access_token = await get_user_access_token(request.user_id)
+            if not access_token:
+                raise HTTPException(status_code=404, detail="No access token available for this user")
 
-        return {
-            "success": True,
-            "donation_amount": donation_amount,
-            "charity_name": charity_name or f"Charity {charity_id}",
-            "transaction_id": mock_donation_id,
-            "charity_id": charity_id,
-            "note": "Mock donation created - Pledge API integration pending"
-        }
-            
-    except Exception as e:
-        logger.error(f"Error creating auto-donation: {e}")
-        raise HTTPException(status_code=500, detail=f"Error creating auto-donation: {e}")
-
-async def create_pledge_donation(charity_id: str, amount: float, user_id: str):
-    """Create a donation through Pledge API"""
-    try:
-        from services.pledge_client import pledge_client
-        from models import DonationRequest
-        
-        # Create donation request object
-        donation_request = DonationRequest(
-            organization_id=charity_id,
-            amount=str(amount),  # Convert to string
-            email=f"user_{user_id}@buy4good.com",  # Mock email
-            first_name="User",
-            last_name=user_id[:8],  # Use part of user ID as last name
-            send_tax_receipt=False,  # Don't send tax receipt for auto-donations
-            metadata=json.dumps({
-                "source": "buy4good_auto_donation",
-                "user_id": user_id,
-                "anonymous": True
-            })
+        return await sandbox_generator.generate(
+            request.user_id,
+            request.count,
+            seed=request.seed,
+            target=request.target,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            access_token=access_token
         )
-        
-        # Call Pledge API to create donation
-        response_data = await pledge_client.create_donation(donation_request)
-        
-        logger.info(f"Successfully created Pledge donation: {response_data.get('id')}")
-        return response_data
-        
+
+    except HTTPException:
+        raise
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PlaidBulkheadFullError as e:
+        logger.warning("Plaid executor saturated: %s", e)
+        raise HTTPException(status_code=503, detail="Plaid service is busy, please retry shortly")
+    except plaid.ApiException as e:
+        logger.error("Plaid API error: %s", e)
+        raise HTTPException(status_code=400, detail=f"Plaid API error: {e}")
     except Exception as e:
-        logger.error(f"Error creating Pledge donation: {e}")
-        return {"success": False, "error": str(e)}
+        logger.error("Error generating sandbox transactions: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error generating sandbox transactions: {e}")
 
-async def create_mock_donation(request: AutoDonateRequest, donation_amount: float, donation_date: str):
-    """Create a mock donation for testing purposes"""
+@router.post("/auto_donate", status_code=202)
+async def auto_donate(request: AutoDonateRequest):
+    """Queue an auto-donation for a transaction; poll the returned job for the result"""
     try:
-        # Create sandbox transaction for donation
-        access_token = await get_user_access_token(request.user_id)
-        if not access_token:
-            raise HTTPException(status_code=404, detail="No access token available for this user")
-
-        plaid_client = get_plaid_client()
-        
-        # Create donation transaction with mock charity
-        donation_response = plaid_client.sandbox_transactions_create({
-            'access_token': access_token,
-            'transactions': [{
-                'amount': donation_amount,
-                'date_transacted': donation_date,
-                'date_posted': donation_date,
-                'description': "Donation to Test Charity"
-            }]
-        })
-
-        # Store donation in user_donation_summary table with mock charity
-        donation_response_dict = donation_response.to_dict()
-        transaction_id = donation_response_dict.get('transaction_id', 'mock_transaction_123')
-        
-        # Create donation record in user_donations table
-        donation_data = {
-            'user_id': request.user_id,
-            'charity_id': 'mock_charity_123',
-            'charity_name': 'Test Charity (Mock)',
-            'donation_amount': donation_amount,
-            'transaction_id': transaction_id,
-            'original_transaction_id': request.original_transaction_id,
-            'donation_percentage': request.donation_percentage,
-            'donation_date': donation_date
-        }
-        
-        donation_created = await supabase_service.create_user_donation(donation_data)
-        if not donation_created:
-            logger.error(f"Failed to create donation record for user: {request.user_id}")
-        else:
-            logger.info(f"Successfully created donation record for user: {request.user_id}")
-        
-        # Update user's total donation amount
-        await supabase_service.update_user_total_donation(request.user_id, donation_amount)
+        job = await job_queue.submit(
+            "auto_donate",
+            request.model_dump(exclude_none=True),
+            dedupe_key=f"auto_donate:{request.user_id}:{request.original_transaction_id}"
+        )
 
-        return {
-            "success": True,
-            "donation_amount": donation_amount,
-            "charity_name": "Test Charity (Mock)",
-            "transaction_id": transaction_id,
-            "note": "Mock donation created for testing - no charity preferences found"
-        }
-        
+        return FastJSONResponse(
+            status_code=202,
+            content={
+                "success": True,
+                "job_id": job['job_id'],
+                "status": job['status'],
+                "status_url": f"{settings.API_V1_PREFIX}/jobs/{job['job_id']}",
+                "result": job['result']
+            }
+        )
+            
     except Exception as e:
-        logger.error(f"Error creating mock donation: {e}")
-        raise HTTPException(status_code=500, detail=f"Error creating mock donation: {e}")
-
-        # Store donation in user_donation_summary table
-        donation_response_dict = donation_response.to_dict()
-        transaction_id = donation_response_dict.get('transaction_id', 'mock_transaction_123')
-        
-        donation_data = {
-            'user_id': request.user_id,
-            'total_donated': donation_amount,
-            'total_transactions': 1,
-            'charities_supported': 1,
-            'last_donation_date': donation_date
-        }
-        
-        # Create donation record in user_donations table
-        donation_data = {
-            'user_id': request.user_id,
-            'charity_id': charity_id,
-            'charity_name': f"Charity (ID: {charity_id})",
-            'donation_amount': donation_amount,
-            'transaction_id': transaction_id,
-            'original_transaction_id': request.original_transaction_id,
-            'donation_percentage': request.donation_percentage,
-            'donation_date': donation_date
-        }
-        
-        donation_created = await supabase_service.create_user_donation(donation_data)
-        if not donation_created:
-            logger.error(f"Failed to create donation record for user: {request.user_id}")
-        else:
-            logger.info(f"Successfully created donation record for user: {request.user_id}")
-        
-        # Update user's total donation amount
-        await supabase_service.update_user_total_donation(request.user_id, donation_amount)
+        logger.error("Error creating auto-donation: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error creating auto-donation: {e}")
 
-        return {
-            "success": True,
-            "donation_amount": donation_amount,
-            "charity_name": f"Charity (ID: {charity_id})",
-            "transaction_id": transaction_id
-        }
+@router.post("/auto_donate_batch")
+async def auto_donate_batch(request: AutoDonateBatchRequest):
+    """Create auto-donations for up to 1000 transactions in one request"""
+    try:
+        return await auto_donation_service.create_auto_donations_batch(request.transactions)
 
-    except plaid.ApiException as e:
-        logger.error(f"Plaid API error: {e}")
-        raise HTTPException(status_code=400, detail=f"Plaid API error: {e}")
     except Exception as e:
-        logger.error(f"Error creating auto-donation: {e}")
-        raise HTTPException(status_code=500, detail=f"Error creating auto-donation: {e}")
+        logger.error("Error creating batch auto-donations: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error creating batch auto-donations: {e}")
 
 @router.get("/health")
 async def transactions_health_check():
     """Health check for transactions endpoint"""
-    return {"status": "healthy", "message": "Transactions endpoint is working"}
+    return {
+        "status": "healthy",
+        "message": "Transactions endpoint is working",
+        "donation_dedupe": donation_dedupe.stats(),
+        "job_queue": await asyncio.to_thread(job_queue.stats)
+    }
@@ -0,0 +1,101 @@
+import json
+import logging
+from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Request, status
+from models import WebhookRequest
+from config import settings
+from services.plaid_client import PlaidBulkheadFullError
+from services.plaid_webhook import plaid_webhook_verifier, WebhookVerificationError
+from services.webhook_queue import webhook_queue
+from services.donation_reconciler import donation_reconciler
+from services.purchase_donations import purchase_donation_service
+from services.shutdown import shutdown_coordinator
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# TRANSACTIONS webhook codes that mean new data is ready to be synced
+SYNC_WEBHOOK_CODES = {
+    "SYNC_UPDATES_AVAILABLE",
+    "INITIAL_UPDATE",
+    "HISTORICAL_UPDATE",
+    "DEFAULT_UPDATE",
+    "TRANSACTIONS_REMOVED"
+}
+
+
+@router.post(
+    "/webhooks/plaid",
+    summary="Plaid webhook receiver",
+    description="Receives Plaid TRANSACTIONS webhooks and queues them for server-side auto-donation processing"
+)
+async def plaid_webhook(req: Request):
+    """Verify, coalesce and enqueue a Plaid webhook"""
+    body = await req.body()
+    verification_token = req.headers.get('Plaid-Verification', '')
+
+    if settings.PLAID_WEBHOOK_VERIFY:
+        try:
+            await plaid_webhook_verifier.verify(body, verification_token)
+        except WebhookVerificationError as e:
+            logger.warning("Rejected Plaid webhook: %s", e)
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid webhook signature")
+        except PlaidBulkheadFullError:
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Plaid service is busy, please retry shortly")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Webhook body must be JSON")
+
+    webhook_type = payload.get('webhook_type')
+    webhook_code = payload.get('webhook_code')
+
+    if webhook_type != "TRANSACTIONS" or webhook_code not in SYNC_WEBHOOK_CODES:
+        logger.info("Ignoring Plaid webhook %s.%s", webhook_type, webhook_code)
+        return {"received": True, "queued": False}
+
+    if shutdown_coordinator.draining:
+        # The queue stops on shutdown; let Plaid deliver the event to an instance that stays up
+        logger.warning("Shutting down, asking Plaid to retry webhook")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Service is shutting down")
+
+    if webhook_queue.full():
+        # Plaid retries non-2xx responses, so push back instead of dropping the event
+        logger.warning("Webhook queue is full, asking Plaid to retry")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook queue is full")
+
+    item_id = payload.get('item_id')
+    if webhook_queue.is_queued(item_id):
+        # The queued event's sync will pick up this update too
+        logger.info("Coalescing Plaid webhook %s for item %s with one already queued", webhook_code, item_id)
+        return {"received": True, "duplicate": True, "queued": False}
+
+    event = WebhookRequest(
+        event_type=f"{webhook_type}.{webhook_code}",
+        data=payload,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        signature=verification_token or None
+    )
+
+    if not webhook_queue.enqueue(event):
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Webhook queue is full")
+
+    return {"received": True, "duplicate": False, "queued": True}
+
+
+@router.get(
+    "/webhooks/health",
+    summary="Webhook pipeline health",
+    description="Queue depth and processing latency for the Plaid webhook pipeline"
+)
+async def webhooks_health_check():
+    """Webhook queue metrics"""
+    return {
+        "status": "healthy",
+        "verification_enabled": settings.PLAID_WEBHOOK_VERIFY,
+        "queue": webhook_queue.stats(),
+        "reconciliation": donation_reconciler.stats(),
+        "purchase_donations": purchase_donation_service.stats()
+    }
@@ -0,0 +1,43 @@
+"""
+Generate a synthetic transaction dataset for load and soak testing.
+
+Run from the backend directory:
+
+    python -m scripts.generate_sandbox_transactions --user-id test_user_123 --count 50000 --seed 42
+    python -m scripts.generate_sandbox_transactions --user-id test_user_123 --count 200 --target plaid
+"""
+import argparse
+import asyncio
+import json
+from services.sandbox_generator import sandbox_generator
+from services.supabase_client import supabase_service
+
+
+async def main(args: argparse.Namespace):
+    access_token = None
+    if args.target == "plaid":
+        access_token = await supabase_service.get_access_token(args.user_id)
+        if not access_token:
+            raise SystemExit(f"No access token available for user {args.user_id}")
+
+    summary = await sandbox_generator.generate(
+        args.user_id,
+        args.count,
+        seed=args.seed,
+        target=args.target,
+        start_date=args.start_date,
+        end_date=args.end_date,
+        access_token=access_token
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic purchases for load testing")
+    parser.add_argument("--user-id", required=True, help="User the transactions belong to")
+    parser.add_argument("--count", type=int, default=1000, help="Number of transactions to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for a reproducible dataset")
+    parser.add_argument("--target", choices=["local", "plaid"], default="local", help="Where to write the transactions")
+    parser.add_argument("--start-date", help="First date to generate (YYYY-MM-DD)")
+    parser.add_argument("--end-date", help="Last date to generate (YYYY-MM-DD)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""
+Profile what importing the app costs, module by module.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+prints the slowest top-level imports by cumulative time, so a new eager
+import of a heavy SDK shows up before it slows down container starts.
+
+Run from the backend directory:
+
+    python -m scripts.profile_imports
+    python -m scripts.profile_imports --module routes.plaid --top 40 --depth 3
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+def profile(module: str) -> List[Tuple[int, int, int, str]]:
+    """
+    Import a module in a new interpreter with -X importtime
+
+    Returns:
+        (depth, self microseconds, cumulative microseconds, module name) per import
+    """
+    env = dict(os.environ)
+    # Settings validation only runs in the lifespan, but the pledge client reads its key at import
+    env.setdefault("PLEDGE_TO_API_KEY", "profile")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=False
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # the header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, int(fields[0]), int(fields[1]), name.strip()))
+    return rows
+
+
+def main(args: argparse.Namespace):
+    rows = profile(args.module)
+    total = max((cumulative for depth, _, cumulative, name in rows if name == args.module), default=0)
+    print(f"import {args.module}: {total / 1000:.1f}ms across {len(rows)} modules")
+    print()
+    print(f"{'cumulative':>12} {'self':>10}  module")
+
+    # Only imports up to --depth below the profiled module; deeper ones are counted in their parents
+    shown = [row for row in rows if row[3] != args.module and row[0] <= args.depth]
+    for depth, self_us, cumulative, name in sorted(shown, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {'  ' * (depth - 1)}{name}")
+
+    heavy = sorted({name.split(".")[0] for _, _, _, name in rows} & set(args.watch.split(",")))
+    if heavy:
+        print()
+        print(f"Loaded at import time: {', '.join(heavy)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the slowest imports when loading the app")
+    parser.add_argument("--module", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25, help="Number of imports to list")
+    parser.add_argument("--depth", type=int, default=2, help="How deep into nested imports to list")
+    parser.add_argument(
+        "--watch", default="plaid,supabase,postgrest,gotrue,realtime,storage3",
+        help="Comma separated SDK packages that should load lazily, reported if imported"
+    )
+    main(parser.parse_args())
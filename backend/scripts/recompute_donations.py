@@ -0,0 +1,44 @@
+"""
+Recompute historical auto-donations against users' current settings.
+
+Writes a diff report of every transaction whose donation would change; pass
+--apply with the report directory to write those changes back.
+
+Run from the backend directory:
+
+    python -m scripts.recompute_donations --report-dir recompute_report
+    python -m scripts.recompute_donations --report-dir recompute_report --user-id test_user_123 --since 2024-01-01
+    python -m scripts.recompute_donations --report-dir recompute_report --apply
+"""
+import argparse
+import asyncio
+import json
+from services.donation_recompute import donation_recompute
+
+
+async def main(args: argparse.Namespace):
+    if args.apply:
+        summary = await donation_recompute.apply(args.report_dir, batch_size=args.batch_size)
+    else:
+        summary = await donation_recompute.run(
+            args.report_dir,
+            user_ids=args.user_id,
+            since=args.since,
+            until=args.until,
+            workers=args.workers,
+            chunk_size=args.chunk_size
+        )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute historical donations and report or apply the differences")
+    parser.add_argument("--report-dir", required=True, help="Directory for the diff report")
+    parser.add_argument("--user-id", action="append", help="User to recompute (repeatable, defaults to every linked user)")
+    parser.add_argument("--since", help="First transaction date to recompute (YYYY-MM-DD)")
+    parser.add_argument("--until", help="Last transaction date to recompute (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, help="Worker processes (defaults to the CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Transactions a worker holds in memory at once")
+    parser.add_argument("--apply", action="store_true", help="Write an existing report's changes back instead of recomputing")
+    parser.add_argument("--batch-size", type=int, default=500, help="Transactions per bulk write when applying")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,27 @@
+"""
+Run, or resume, a donation settlement outside the daily schedule.
+
+Run from the backend directory:
+
+    python -m scripts.settle_donations
+    python -m scripts.settle_donations --run-id 2024-06-01  # resume that day's run
+"""
+import argparse
+import asyncio
+import json
+from datetime import datetime, timezone
+from services.donation_ledger import donation_ledger
+from services.settlement_scheduler import settlement_scheduler
+
+
+async def main(args: argparse.Namespace):
+    await donation_ledger.start()
+    run_id = args.run_id or f"manual_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+    summary = await settlement_scheduler.run(run_id)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Settle accrued micro-donations to Pledge.to")
+    parser.add_argument("--run-id", help="Run to start or resume (defaults to a new manual run)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,283 @@
+"""
+Production server: a pre-forking supervisor running WORKERS uvicorn processes.
+
+The supervisor imports the app and the heavy SDKs, recovers work interrupted by
+the last shutdown and binds the listening socket, then forks. Workers share the
+socket, the read-only pages of everything imported so far and the shared cache
+segment, so adding a worker costs little memory and no import time. Workers
+write their Prometheus metrics to PROMETHEUS_MULTIPROC_DIR, so a scrape of any
+worker reports all of them.
+
+Workers are recycled after WORKER_MAX_REQUESTS requests (plus up to
+WORKER_MAX_REQUESTS_JITTER more, so they do not all restart at once). A recycled
+worker stops accepting connections, finishes its in-flight requests and exits,
+and the supervisor starts a replacement. SIGHUP replaces every worker, one at a
+time; SIGTERM or SIGINT stops them all. A stopping worker fails /ready for
+SHUTDOWN_DRAIN_DELAY_SECONDS, gets WORKER_GRACEFUL_TIMEOUT seconds to finish its
+requests and SHUTDOWN_TIMEOUT_SECONDS more to drain its background work.
+
+Run from the backend directory:
+
+    WORKERS=4 python server.py
+"""
+import gc
+import os
+import glob
+import random
+import sys
+import time
+import signal
+import socket
+import logging
+import tempfile
+from typing import Dict, List, Optional
+import uvicorn
+from config import settings
+from logging_config import shutdown_logging
+
+logger = logging.getLogger(__name__)
+
+# Set in each worker process; main.py reads it to skip once-per-deployment startup work
+WORKER_ID_ENV = "BUY4GOOD_WORKER_ID"
+
+# A worker exiting this soon after starting is treated as crashing on startup
+MIN_WORKER_LIFETIME_SECONDS = 5.0
+MAX_RESTART_BACKOFF_SECONDS = 30.0
+
+
+def current_worker() -> Optional[int]:
+    """This process's worker number, or None when not running under the supervisor"""
+    worker_id = os.getenv(WORKER_ID_ENV)
+    return int(worker_id) if worker_id is not None else None
+
+
+def worker_count() -> int:
+    """WORKERS, with 0 meaning one per CPU core"""
+    return settings.WORKERS if settings.WORKERS > 0 else (os.cpu_count() or 1)
+
+
+def max_requests() -> Optional[int]:
+    """Requests a worker serves before it is recycled, jittered per worker"""
+    if settings.WORKER_MAX_REQUESTS <= 0:
+        return None
+    return settings.WORKER_MAX_REQUESTS + random.randint(0, max(0, settings.WORKER_MAX_REQUESTS_JITTER))
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def prepare_metrics_dir():
+    """
+    Point prometheus_client at a directory the workers share, before it is imported
+
+    Each worker writes its metrics to files there and a scrape of any worker
+    merges them. Files left by a previous run are removed so its counts do not
+    carry over.
+    """
+    path = settings.PROMETHEUS_MULTIPROC_DIR or tempfile.mkdtemp(prefix="buy4good-metrics-")
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+    logger.info("Writing worker metrics to %s", path)
+
+
+def warm_up():
+    """
+    Do the work every worker would otherwise repeat, before forking
+
+    Importing main builds the app, routes and middleware, and the OpenAPI
+    schema that requests are matched against is built here. The Plaid,
+    Supabase and JWT packages are imported too, but their clients are still
+    built per worker, since connection pools must not cross a fork.
+    """
+    started = time.perf_counter()
+    import main
+    from services.sqlite_db import local_db
+    from services.job_queue import job_queue
+    from services.donation_ledger import donation_ledger
+
+    main.app.openapi()
+    import plaid.api.plaid_api  # noqa: F401
+    import supabase  # noqa: F401
+    import jwt  # noqa: F401
+
+    # Recover once here rather than in each worker, where a worker restarting
+    # would re-queue jobs its siblings are still running
+    job_queue.recover()
+    donation_ledger.recover()
+    local_db.close()
+
+    # Keep the objects created so far out of the collector, so collections in
+    # the workers do not write to, and un-share, the inherited pages
+    gc.collect()
+    gc.freeze()
+    logger.info("Warmed up in %.2fs before forking", time.perf_counter() - started)
+
+
+class Supervisor:
+    """Forks the workers, replaces the ones that exit and stops them on shutdown"""
+
+    def __init__(self, sock: socket.socket, workers: int):
+        self.sock = sock
+        self.workers = workers
+        self._pids: Dict[int, int] = {}  # pid -> worker number
+        self._started: Dict[int, float] = {}
+        self._failures: Dict[int, int] = {}
+        self._retiring: List[int] = []
+        self._signalled: Optional[int] = None
+        self._stopping = False
+        self._reload = False
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_reload)
+
+        for worker_id in range(self.workers):
+            self._spawn(worker_id)
+        logger.info("Started %s workers on %s:%s", self.workers, settings.HOST, settings.PORT)
+
+        while not self._stopping:
+            if self._reload:
+                self._reload = False
+                self._retiring = list(self._pids)
+                logger.info("Reloading %s workers one at a time", len(self._retiring))
+            self._retire_next()
+            self._reap()
+            time.sleep(0.1)
+
+        self._shutdown()
+        return 0
+
+    def _spawn(self, worker_id: int):
+        pid = os.fork()
+        if pid == 0:
+            self._run_worker(worker_id)
+        self._pids[pid] = worker_id
+        self._started[pid] = time.monotonic()
+
+    def _run_worker(self, worker_id: int):
+        """Serve in the child process; never returns"""
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        os.environ[WORKER_ID_ENV] = str(worker_id)
+        status = 0
+        try:
+            config = uvicorn.Config(
+                "main:app",
+                log_level="info",
+                limit_max_requests=max_requests(),
+                timeout_graceful_shutdown=int(settings.WORKER_GRACEFUL_TIMEOUT)
+            )
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %s failed", worker_id)
+            status = 1
+        finally:
+            shutdown_logging()
+            os._exit(status)
+
+    def _reap(self):
+        """Replace workers that exited, backing off when they keep failing at startup"""
+        # Imported here: prometheus_client must not load before prepare_metrics_dir has run
+        from services.metrics import mark_worker_dead
+
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker_id = self._pids.pop(pid, None)
+            lifetime = time.monotonic() - self._started.pop(pid, time.monotonic())
+            mark_worker_dead(pid)
+            if worker_id is None or self._stopping:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            # uvicorn re-raises the signal it shut down on, so a graceful stop ends in -SIGTERM
+            if code in (0, -signal.SIGTERM, -signal.SIGINT):
+                logger.info("Worker %s (pid %s) exited after %.0fs, replacing it", worker_id, pid, lifetime)
+                self._failures[worker_id] = 0
+            else:
+                logger.error("Worker %s (pid %s) died with status %s, replacing it", worker_id, pid, code)
+                if lifetime < MIN_WORKER_LIFETIME_SECONDS:
+                    failures = self._failures[worker_id] = self._failures.get(worker_id, 0) + 1
+                    time.sleep(min(MAX_RESTART_BACKOFF_SECONDS, 0.5 * 2 ** failures))
+                else:
+                    self._failures[worker_id] = 0
+            self._spawn(worker_id)
+
+    def _retire_next(self):
+        """During a reload, stop the old workers one at a time, each once every slot is serving again"""
+        while self._retiring and self._retiring[0] not in self._pids:
+            self._retiring.pop(0)
+        if not self._retiring or self._retiring[0] == self._signalled or len(self._pids) < self.workers:
+            return
+        if time.monotonic() - max(self._started.values()) < MIN_WORKER_LIFETIME_SECONDS:
+            return
+        self._signalled = self._retiring[0]
+        self._kill(self._signalled, signal.SIGTERM)
+
+    def _shutdown(self):
+        logger.info("Stopping %s workers", len(self._pids))
+        for pid in list(self._pids):
+            self._kill(pid, signal.SIGTERM)
+
+        # Each worker fails readiness, finishes its requests, then drains its background work
+        deadline = time.monotonic() + (
+            settings.SHUTDOWN_DRAIN_DELAY_SECONDS + settings.WORKER_GRACEFUL_TIMEOUT + settings.SHUTDOWN_TIMEOUT_SECONDS + 5
+        )
+        while self._pids and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self._pids):
+            logger.warning("Worker %s (pid %s) did not stop in time, killing it", self._pids[pid], pid)
+            self._kill(pid, signal.SIGKILL)
+        while self._pids:
+            self._reap()
+            time.sleep(0.05)
+
+    def _kill(self, pid: int, signum: int):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            self._pids.pop(pid, None)
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+
+
+def serve():
+    """Run the app with WORKERS processes, or in this process when WORKERS is 1"""
+    workers = worker_count()
+    if workers == 1:
+        uvicorn.run(
+            "main:app",
+            host=settings.HOST,
+            port=settings.PORT,
+            limit_max_requests=max_requests(),
+            timeout_graceful_shutdown=int(settings.WORKER_GRACEFUL_TIMEOUT)
+        )
+        return
+
+    sock = bind_socket(settings.HOST, settings.PORT)
+    prepare_metrics_dir()
+    warm_up()
+    sys.exit(Supervisor(sock, workers).run())
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,55 @@
+import numpy as np
+from typing import Sequence
+
+
+def to_cents(amounts) -> np.ndarray:
+    """Convert dollar amounts to integer cents, rounding half to even"""
+    return np.rint(np.asarray(amounts, dtype=np.float64) * 100).astype(np.int64)
+
+
+def allocate_cents(totals_cents, allocation_percentages: Sequence[float]) -> np.ndarray:
+    """
+    Split each total across charities in proportion to their allocation percentages
+
+    Uses integer cents and the largest-remainder method: every charity first gets
+    the floor of its exact share, then the cents left over go one each to the
+    charities with the largest fractional remainders (ties go to the earlier
+    charity). Every row therefore sums exactly to its total and no share is more
+    than one cent away from its exact value.
+
+    Args:
+        totals_cents: Integer totals in cents, shape (n,)
+        allocation_percentages: Allocation weight per charity, shape (k,). The
+            weights do not need to sum to 100; shares are proportional.
+
+    Returns:
+        Integer cents per transaction and charity, shape (n, k)
+    """
+    totals = np.asarray(totals_cents, dtype=np.int64).reshape(-1)
+    # Percentages are stored with up to two decimals, so hundredths of a percent are exact
+    weights = np.rint(np.asarray(allocation_percentages, dtype=np.float64) * 100).astype(np.int64)
+
+    if weights.size == 0:
+        raise ValueError("At least one allocation is required")
+    if (weights < 0).any():
+        raise ValueError("Allocation percentages must not be negative")
+
+    weight_total = int(weights.sum())
+    if weight_total == 0:
+        # Nothing configured yet: split evenly
+        weights = np.ones_like(weights)
+        weight_total = weights.size
+
+    scaled = totals[:, None] * weights[None, :]
+    shares, remainders = np.divmod(scaled, weight_total)
+    leftover = totals - shares.sum(axis=1)
+
+    if weights.size == 1:
+        return shares + leftover[:, None]
+
+    # Rank charities by remainder, largest first, keeping the earlier charity on ties
+    order = np.argsort(-remainders, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(weights.size)[None, :], axis=1)
+
+    return shares + (ranks < leftover[:, None])
@@ -0,0 +1,547 @@
+import json
+import asyncio
+import logging
+import requests
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from pydantic import ValidationError
+from models import AutoDonateRequest, DonationRequest
+from services.allocation import allocate_cents, to_cents
+from services.supabase_client import supabase_service
+from services.plaid_client import plaid_client
+from services.donation_ledger import donation_ledger
+from services.donation_dedupe import donation_dedupe, donation_result
+from services.donation_reconciler import donation_reconciler
+from services.job_queue import PermanentJobError
+from services.shutdown import shutdown_coordinator
+
+logger = logging.getLogger(__name__)
+
+
+class AutoDonationService:
+    """Creates auto-donations for purchases, shared by the API and background workers"""
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def create_auto_donation(self, request: AutoDonateRequest) -> Dict[str, Any]:
+        """
+        Create an auto-donation for a transaction, split across the user's charities
+
+        A transaction is only ever donated on once. Repeating the request, even
+        while the first one is still running, returns the original donation
+        without calling Supabase, Pledge.to or Plaid again. Repeats in flight
+        are only joined within this worker; across workers the insert skips
+        rows that already exist and the loser returns the winner's donation.
+
+        Args:
+            request: The transaction and donation settings to donate for
+
+        Returns:
+            Dictionary describing the created donation
+        """
+        key = (request.user_id, request.original_transaction_id)
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            result = await asyncio.shield(in_flight)
+            return {**result, "duplicate": True}
+
+        future = asyncio.get_running_loop().create_future()
+        # Make sure an error nobody else waited for is not reported as unretrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        try:
+            existing = await donation_dedupe.find_existing(request.user_id, [request.original_transaction_id])
+            if existing:
+                logger.info("Transaction %s already donated on for user %s", request.original_transaction_id, request.user_id)
+                result = donation_result(existing[request.original_transaction_id])
+            else:
+                result = await self._create_auto_donation(request)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def process_auto_donate_job(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Job queue handler for auto_donate jobs"""
+        try:
+            request = AutoDonateRequest(**payload)
+        except ValidationError as e:
+            raise PermanentJobError(str(e))
+
+        try:
+            return await self.create_auto_donation(request)
+        except LookupError as e:
+            # No access token for the mock fallback; retrying will not help
+            raise PermanentJobError(str(e))
+
+    async def _create_auto_donation(self, request: AutoDonateRequest) -> Dict[str, Any]:
+        """Create the donation records for a transaction that has not been donated on yet"""
+        # Calculate donation amount in whole cents
+        donation_cents = int(to_cents([request.transaction_amount * request.donation_percentage])[0])
+        donation_amount = donation_cents / 100
+
+        # Use current date if not provided
+        donation_date = request.date or datetime.now().strftime('%Y-%m-%d')
+
+        # If specific charity_id is provided, use it
+        if request.charity_id:
+            allocations = [{'charity_id': request.charity_id, 'allocation_percentage': 100}]
+        else:
+            # Get user's charity preferences with allocation percentages
+            allocations = await supabase_service.get_user_charity_preferences(request.user_id)
+
+            if not allocations:
+                # Fallback to mock donation if no preferences
+                logger.info("No charity preferences found for user %s, creating mock donation", request.user_id)
+                return await self.create_mock_donation(request, donation_amount, donation_date)
+
+        # Split the donation across every charity by its allocation percentage
+        charity_ids = [allocation['charity_id'] for allocation in allocations]
+        allocated_cents = allocate_cents(
+            [donation_cents],
+            [allocation.get('allocation_percentage') or 0 for allocation in allocations]
+        )[0]
+        names = await asyncio.gather(*(supabase_service.get_charity_name(charity_id) for charity_id in charity_ids))
+
+        # For now, let's create a mock donation to test the flow
+        # TODO: Fix Pledge API integration
+        mock_donation_id = f"mock_donation_{int(datetime.now().timestamp())}"
+
+        # Store one donation record per charity that receives at least a cent
+        rows = []
+        for charity_id, name, cents in zip(charity_ids, names, allocated_cents):
+            if cents <= 0:
+                continue
+            rows.append({
+                'user_id': request.user_id,
+                'charity_id': charity_id,
+                'charity_name': name or f"Charity {charity_id}",
+                'donation_amount': int(cents) / 100,
+                'transaction_id': mock_donation_id,
+                'original_transaction_id': request.original_transaction_id,
+                'donation_percentage': request.donation_percentage,
+                'donation_date': donation_date,
+                'merchant_name': request.merchant_name,
+                'product_name': request.product_name,
+                'merchant_logo': request.merchant_logo
+            })
+        if len(rows) > 1:
+            for index, row in enumerate(rows):
+                row['transaction_id'] = f"{mock_donation_id}_{index}"
+
+        if rows:
+            # A shutdown or cancelled request must not leave donation rows
+            # stored without the matching total and ledger entries
+            stored = await shutdown_coordinator.complete(self._store_donations(request, rows))
+            if stored == []:
+                # Another worker donated on this transaction first
+                return await self._existing_donation(request)
+
+        # Report the charity receiving the largest share for older clients
+        primary = max(rows, key=lambda row: row['donation_amount']) if rows else {
+            'charity_id': charity_ids[0],
+            'charity_name': names[0] or f"Charity {charity_ids[0]}",
+            'transaction_id': mock_donation_id
+        }
+
+        return {
+            "success": True,
+            "donation_amount": donation_amount,
+            "charity_name": primary['charity_name'],
+            "transaction_id": primary['transaction_id'],
+            "charity_id": primary['charity_id'],
+            "allocations": [
+                {
+                    "charity_id": row['charity_id'],
+                    "charity_name": row['charity_name'],
+                    "donation_amount": row['donation_amount'],
+                    "transaction_id": row['transaction_id']
+                }
+                for row in rows
+            ],
+            "note": "Mock donation created - Pledge API integration pending"
+        }
+
+    async def _store_donations(self, request: AutoDonateRequest, rows: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Write a transaction's donation rows, then the user's total and ledger entries
+
+        Rows that already exist are skipped by the insert, so when two workers
+        donate on the same transaction only the one whose rows were written
+        updates the total and ledger.
+
+        Returns:
+            The rows that were written, or None if the insert failed
+        """
+        stored = await supabase_service.insert_new_donations(rows)
+        if stored is None:
+            # Leave the total alone so it keeps matching the stored donation rows
+            logger.error("Failed to create donation records for user %s, total not updated", request.user_id)
+            return None
+
+        donation_dedupe.remember(request.user_id, request.original_transaction_id)
+        stored_charity_ids = {row['charity_id'] for row in stored}
+        rows = [row for row in rows if row['charity_id'] in stored_charity_ids]
+        if not rows:
+            logger.info("Transaction %s was donated on by another worker for user %s", request.original_transaction_id, request.user_id)
+            return rows
+
+        logger.info("Created %s donation records for user %s", len(rows), request.user_id)
+        donation_cents = sum(round(row['donation_amount'] * 100) for row in rows)
+        await asyncio.to_thread(
+            donation_reconciler.record, request.user_id, [(request.original_transaction_id, donation_cents)]
+        )
+
+        # Update user's total donation amount
+        await supabase_service.update_user_total_donation(request.user_id, donation_cents / 100)
+
+        # Accrue toward the next Pledge.to settlement for each charity
+        await donation_ledger.accrue_and_settle(self._ledger_entries(rows))
+        return rows
+
+    async def _existing_donation(self, request: AutoDonateRequest) -> Dict[str, Any]:
+        """Look up the donation another worker stored for a transaction"""
+        existing = await donation_dedupe.find_existing(request.user_id, [request.original_transaction_id])
+        if request.original_transaction_id not in existing:
+            raise RuntimeError(f"Donation rows for transaction {request.original_transaction_id} could not be read back")
+        return donation_result(existing[request.original_transaction_id])
+
+    async def create_auto_donations_batch(self, requests: List[AutoDonateRequest]) -> Dict[str, Any]:
+        """
+        Create auto-donations for many transactions with a fixed number of upstream calls
+
+        Donation amounts are computed in one vectorized pass and split across each
+        user's charities in integer cents, charity preferences are fetched once
+        per user, charity names once per charity, all donation
+        rows are written with a single insert and each user's total is
+        incremented once. Transactions that were already donated on, or that
+        repeat within the batch, are skipped.
+
+        Args:
+            requests: The transactions to donate for
+
+        Returns:
+            Dictionary summarizing the created donations
+        """
+        received = len(requests)
+        requests = await self._skip_donated(requests)
+        if not requests:
+            return {
+                "success": True,
+                "processed": 0,
+                "duplicates": received,
+                "total_donation_amount": 0.0,
+                "users": 0,
+                "charities": 0,
+                "donations": []
+            }
+
+        donation_cents = to_cents(
+            np.fromiter((request.transaction_amount for request in requests), dtype=np.float64, count=len(requests))
+            * np.fromiter((request.donation_percentage for request in requests), dtype=np.float64, count=len(requests))
+        )
+        today = datetime.now().strftime('%Y-%m-%d')
+
+        # One preference lookup per user that needs one
+        users_needing_preferences = sorted({request.user_id for request in requests if not request.charity_id})
+        preference_lists = await asyncio.gather(*(
+            supabase_service.get_user_charity_preferences(user_id) for user_id in users_needing_preferences
+        ))
+        user_allocations = {
+            user_id: tuple(
+                (preference['charity_id'], preference.get('allocation_percentage') or 0)
+                for preference in preferences
+            )
+            for user_id, preferences in zip(users_needing_preferences, preference_lists)
+            if preferences
+        }
+
+        # Group transactions that share the same allocation so each group is split in one array pass
+        allocation_groups: Dict[tuple, List[int]] = {}
+        for index, request in enumerate(requests):
+            if request.charity_id:
+                allocation = ((request.charity_id, 100),)
+            else:
+                allocation = user_allocations.get(request.user_id, (('mock_charity_123', 100),))
+            allocation_groups.setdefault(allocation, []).append(index)
+
+        # One name lookup per distinct charity
+        distinct_charity_ids = sorted({
+            charity_id for allocation in allocation_groups for charity_id, _ in allocation
+        } - {'mock_charity_123'})
+        names = await asyncio.gather(*(supabase_service.get_charity_name(charity_id) for charity_id in distinct_charity_ids))
+        charity_names = {
+            charity_id: name or f"Charity {charity_id}"
+            for charity_id, name in zip(distinct_charity_ids, names)
+        }
+        charity_names['mock_charity_123'] = 'Test Charity (Mock)'
+
+        batch_id = f"mock_donation_batch_{int(datetime.now().timestamp())}"
+        allocated = []
+        for allocation, indices in allocation_groups.items():
+            charity_ids = [charity_id for charity_id, _ in allocation]
+            split_cents = allocate_cents(donation_cents[indices], [percentage for _, percentage in allocation])
+            for index, cents_row in zip(indices, split_cents):
+                for charity_index, cents in enumerate(cents_row):
+                    if cents > 0:
+                        allocated.append((index, charity_index, charity_ids[charity_index], int(cents)))
+        allocated.sort()
+
+        rows = []
+        for index, charity_index, charity_id, cents in allocated:
+            request = requests[index]
+            rows.append({
+                'user_id': request.user_id,
+                'charity_id': charity_id,
+                'charity_name': charity_names[charity_id],
+                'donation_amount': cents / 100,
+                'transaction_id': f"{batch_id}_{index}_{charity_index}",
+                'original_transaction_id': request.original_transaction_id,
+                'donation_percentage': request.donation_percentage,
+                'donation_date': request.date or today,
+                'merchant_name': request.merchant_name,
+                'product_name': request.product_name,
+                'merchant_logo': request.merchant_logo
+            })
+
+        # Rows, totals and ledger entries are written as a unit that outlives a cancelled request
+        stored = await shutdown_coordinator.complete(self._store_batch(requests, rows))
+        if stored is not None:
+            # Transactions another worker donated on first count as duplicates
+            stored_transactions = {(row['user_id'], row['original_transaction_id']) for row in stored}
+            raced = {(row['user_id'], row['original_transaction_id']) for row in rows} - stored_transactions
+            processed = len(requests) - len(raced)
+            rows = stored
+        else:
+            processed = len(requests)
+
+        user_count = len({row['user_id'] for row in rows})
+        logger.info("Created %s auto-donations for %s users in batch", len(rows), user_count)
+
+        return {
+            "success": stored is not None,
+            "processed": processed,
+            "duplicates": received - processed,
+            "total_donation_amount": sum(round(row['donation_amount'] * 100) for row in rows) / 100,
+            "users": user_count,
+            "charities": len({row['charity_id'] for row in rows}),
+            "donations": [
+                {
+                    "original_transaction_id": row['original_transaction_id'],
+                    "charity_id": row['charity_id'],
+                    "charity_name": row['charity_name'],
+                    "donation_amount": row['donation_amount'],
+                    "transaction_id": row['transaction_id']
+                }
+                for row in rows
+            ]
+        }
+
+    async def _store_batch(
+        self,
+        requests: List[AutoDonateRequest],
+        rows: List[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Insert a batch's donation rows, then one total increment per user and the ledger entries
+
+        Only the rows the insert wrote are counted, so transactions another
+        worker donated on concurrently are not added to totals twice.
+
+        Returns:
+            The rows that were written, or None if the insert failed
+        """
+        stored = await supabase_service.insert_new_donations(rows)
+        if stored is None:
+            # Leave totals alone so they keep matching the stored donation rows
+            logger.error("Failed to create %s donation records in batch, totals not updated", len(rows))
+            return None
+
+        for request in requests:
+            donation_dedupe.remember(request.user_id, request.original_transaction_id)
+
+        stored_keys = {(row['user_id'], row['original_transaction_id'], row['charity_id']) for row in stored}
+        rows = [row for row in rows if (row['user_id'], row['original_transaction_id'], row['charity_id']) in stored_keys]
+
+        # One aggregated total increment per user
+        donations_by_user: Dict[str, Dict[str, int]] = {}
+        for row in rows:
+            donations = donations_by_user.setdefault(row['user_id'], {})
+            donations[row['original_transaction_id']] = (
+                donations.get(row['original_transaction_id'], 0) + round(row['donation_amount'] * 100)
+            )
+        await asyncio.gather(*(
+            supabase_service.update_user_total_donation(user_id, sum(donations.values()) / 100)
+            for user_id, donations in donations_by_user.items()
+        ))
+        for user_id, donations in donations_by_user.items():
+            await asyncio.to_thread(donation_reconciler.record, user_id, list(donations.items()))
+        await donation_ledger.accrue_and_settle(self._ledger_entries(rows))
+
+        return rows
+
+    async def _skip_donated(self, requests: List[AutoDonateRequest]) -> List[AutoDonateRequest]:
+        """Drop transactions that were already donated on or appear earlier in the list"""
+        unique: Dict[Tuple[str, str], AutoDonateRequest] = {}
+        for request in requests:
+            unique.setdefault((request.user_id, request.original_transaction_id), request)
+
+        transactions_by_user: Dict[str, List[str]] = {}
+        for user_id, original_transaction_id in unique:
+            transactions_by_user.setdefault(user_id, []).append(original_transaction_id)
+
+        user_ids = list(transactions_by_user)
+        existing = await asyncio.gather(*(
+            donation_dedupe.find_existing(user_id, transactions_by_user[user_id]) for user_id in user_ids
+        ))
+        donated = {
+            (user_id, original_transaction_id)
+            for user_id, user_existing in zip(user_ids, existing)
+            for original_transaction_id in user_existing
+        }
+        if donated:
+            logger.info("Skipping %s transactions that were already donated on", len(donated))
+
+        return [request for key, request in unique.items() if key not in donated]
+
+    def _ledger_entries(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Turn donation rows into ledger entries keyed by user, purchase and charity"""
+        return [
+            {
+                'entry_id': f"{row['user_id']}:{row['original_transaction_id']}:{row['charity_id']}",
+                'user_id': row['user_id'],
+                'charity_id': row['charity_id'],
+                'amount_cents': round(row['donation_amount'] * 100),
+                'source_transaction_id': row['original_transaction_id']
+            }
+            for row in rows
+        ]
+
+    async def create_pledge_donation(
+        self,
+        charity_id: str,
+        amount: float,
+        user_id: str,
+        reference: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a donation through Pledge API, tagged with an optional reference such as a settlement id
+
+        The reference is also sent as the idempotency key, so retrying a
+        reference never creates a second donation. A failure response has
+        "rejected" set only when Pledge.to definitely refused the donation (a
+        4xx with a body); after a timeout, connection error or 5xx the donation
+        may have been created.
+        """
+        try:
+            from services.pledge_client import pledge_client
+
+            # Create donation request object
+            donation_request = DonationRequest(
+                organization_id=charity_id,
+                amount=str(amount),  # Convert to string
+                email=f"user_{user_id}@buy4good.com",  # Mock email
+                first_name="User",
+                last_name=user_id[:8],  # Use part of user ID as last name
+                send_tax_receipt=False,  # Don't send tax receipt for auto-donations
+                metadata=json.dumps({
+                    "source": "buy4good_auto_donation",
+                    "user_id": user_id,
+                    "reference": reference,
+                    "anonymous": True
+                })
+            )
+
+            # Call Pledge API to create donation
+            response_data = await pledge_client.create_donation(donation_request, idempotency_key=reference)
+
+            logger.info("Successfully created Pledge donation: %s", response_data.get('id'))
+            return response_data
+
+        except requests.HTTPError as e:
+            response = e.response
+            rejected = response is not None and 400 <= response.status_code < 500 and bool(response.content)
+            logger.error("Error creating Pledge donation: %s", e)
+            return {"success": False, "error": str(e), "rejected": rejected}
+        except Exception as e:
+            logger.error("Error creating Pledge donation: %s", e)
+            return {"success": False, "error": str(e), "rejected": False}
+
+    async def create_mock_donation(self, request: AutoDonateRequest, donation_amount: float, donation_date: str) -> Dict[str, Any]:
+        """Create a mock donation for testing purposes"""
+        # Create sandbox transaction for donation
+        access_token = await supabase_service.get_access_token(request.user_id)
+        if not access_token:
+            raise LookupError("No access token available for this user")
+
+        # Create donation transaction with mock charity
+        donation_response = await plaid_client.call("sandbox_transactions_create", {
+            'access_token': access_token,
+            'transactions': [{
+                'amount': donation_amount,
+                'date_transacted': donation_date,
+                'date_posted': donation_date,
+                'description': "Donation to Test Charity"
+            }]
+        })
+
+        # Store donation in user_donation_summary table with mock charity
+        donation_response_dict = donation_response.to_dict()
+        transaction_id = donation_response_dict.get('transaction_id', 'mock_transaction_123')
+
+        # Create donation record in user_donations table
+        donation_data = {
+            'user_id': request.user_id,
+            'charity_id': 'mock_charity_123',
+            'charity_name': 'Test Charity (Mock)',
+            'donation_amount': donation_amount,
+            'transaction_id': transaction_id,
+            'original_transaction_id': request.original_transaction_id,
+            'donation_percentage': request.donation_percentage,
+            'donation_date': donation_date
+        }
+
+        stored = await shutdown_coordinator.complete(self._store_mock_donation(request, donation_data))
+        if stored == []:
+            # Another worker donated on this transaction first
+            return await self._existing_donation(request)
+
+        return {
+            "success": True,
+            "donation_amount": donation_amount,
+            "charity_name": "Test Charity (Mock)",
+            "transaction_id": transaction_id,
+            "note": "Mock donation created for testing - no charity preferences found"
+        }
+
+    async def _store_mock_donation(self, request: AutoDonateRequest, donation_data: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Write the mock donation row unless it already exists, then the user's total"""
+        donation_amount = donation_data['donation_amount']
+        stored = await supabase_service.insert_new_donations([donation_data])
+        if stored is None:
+            # Leave the total alone so it keeps matching the stored donation rows
+            logger.error("Failed to create donation record for user %s, total not updated", request.user_id)
+            return None
+
+        donation_dedupe.remember(request.user_id, request.original_transaction_id)
+        if not stored:
+            logger.info("Transaction %s was donated on by another worker for user %s", request.original_transaction_id, request.user_id)
+            return stored
+
+        logger.info("Created donation record for user %s", request.user_id)
+        await asyncio.to_thread(
+            donation_reconciler.record, request.user_id, [(request.original_transaction_id, round(donation_amount * 100))]
+        )
+
+        # Update user's total donation amount
+        await supabase_service.update_user_total_donation(request.user_id, donation_amount)
+        return stored
+
+
+# Global instance
+auto_donation_service = AutoDonationService()
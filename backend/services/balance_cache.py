@@ -0,0 +1,137 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BalanceCache:
+    """
+    Per-user cache of Plaid balance responses with request coalescing.
+
+    Entries are served while younger than the requested max age (never older than
+    BALANCE_CACHE_MAX_STALENESS). Concurrent misses for the same user share a
+    single accounts_balance_get call instead of each hitting Plaid; that call
+    runs in its own task, so it finishes even if the caller that started it
+    is cancelled. Invalidating a user bumps their generation: a fetch started
+    before that is neither joined by later callers nor stored.
+    """
+
+    def __init__(self):
+        self.max_staleness = settings.BALANCE_CACHE_MAX_STALENESS
+        self.max_entries = settings.BALANCE_CACHE_MAX_ENTRIES
+        self._entries: Dict[str, Tuple[float, datetime, Dict[str, Any]]] = {}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get(
+        self,
+        user_id: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        max_age: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a user's balance, calling fetch only if no fresh enough copy exists
+
+        Args:
+            user_id: The user whose balance is requested
+            fetch: Coroutine function that loads the balance from Plaid
+            max_age: Maximum acceptable age in seconds (0 forces a fresh fetch)
+
+        Returns:
+            Dictionary with the balance, its age in seconds and when it was fetched
+        """
+        limit = self.max_staleness if max_age is None else min(max_age, self.max_staleness)
+
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age <= limit:
+                self.hits += 1
+                return self._result(entry, age, cached=True)
+
+        # The fetch runs in its own task so that a caller going away (a client
+        # disconnect cancels its request) does not fail the callers sharing it
+        fetching = self._in_flight.get(user_id)
+        if fetching is None:
+            self.misses += 1
+            fetching = asyncio.create_task(self._fetch(user_id, fetch, self._generations.get(user_id, 0)))
+            self._in_flight[user_id] = fetching
+            fetching.add_done_callback(partial(self._fetched, user_id))
+        else:
+            self.coalesced += 1
+
+        entry = await asyncio.shield(fetching)
+        # Everyone sharing the fetch gets data that was just loaded from Plaid
+        return self._result(entry, time.monotonic() - entry[0], cached=False)
+
+    async def _fetch(
+        self,
+        user_id: str,
+        fetch: Callable[[], Awaitable[Dict[str, Any]]],
+        generation: int
+    ) -> Tuple[float, datetime, Dict[str, Any]]:
+        balance = await fetch()
+        entry = (time.monotonic(), datetime.now(timezone.utc), balance)
+        # A balance fetched before an invalidation (say, with a replaced access token) is not cached
+        if self._generations.get(user_id, 0) == generation:
+            self._store(user_id, entry)
+        return entry
+
+    def _fetched(self, user_id: str, task: asyncio.Task):
+        if self._in_flight.get(user_id) is task:
+            del self._in_flight[user_id]
+        # Make sure an error nobody else waited for is not reported as unretrieved
+        if not task.cancelled():
+            task.exception()
+
+    def _result(self, entry: Tuple[float, datetime, Dict[str, Any]], age: float, cached: bool) -> Dict[str, Any]:
+        return {
+            "balance": entry[2],
+            "age_seconds": round(age, 3),
+            "fetched_at": entry[1].isoformat(),
+            "cached": cached
+        }
+
+    def _store(self, user_id: str, entry: Tuple[float, datetime, Dict[str, Any]]):
+        self._entries.pop(user_id, None)
+        self._entries[user_id] = entry
+
+        if len(self._entries) > self.max_entries:
+            # Drop expired entries first, then the oldest ones
+            cutoff = time.monotonic() - self.max_staleness
+            for key in [key for key, value in self._entries.items() if value[0] < cutoff]:
+                del self._entries[key]
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, user_id: str):
+        """Forget the cached balance for a user, and any fetch already in flight for them"""
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        self._entries.pop(user_id, None)
+        # Callers already waiting on the old fetch still get its result; new ones start a fresh fetch
+        self._in_flight.pop(user_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache hit and coalescing counters"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_staleness_seconds": self.max_staleness,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+
+# Global instance
+balance_cache = BalanceCache()
@@ -0,0 +1,179 @@
+import math
+import asyncio
+import hashlib
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from config import settings
+from services.supabase_client import supabase_service
+
+logger = logging.getLogger(__name__)
+
+DONATION_KEYS_PAGE_SIZE = 1000
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys using double hashing"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _key(user_id: str, original_transaction_id: str) -> str:
+    return f"{user_id}\x1f{original_transaction_id}"
+
+
+def donation_result(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Rebuild the auto_donate response from the donation rows it stored"""
+    primary = max(rows, key=lambda row: row['donation_amount'])
+    return {
+        "success": True,
+        "duplicate": True,
+        "donation_amount": round(sum(row['donation_amount'] for row in rows), 2),
+        "charity_name": primary.get('charity_name'),
+        "transaction_id": primary.get('transaction_id'),
+        "charity_id": primary.get('charity_id'),
+        "allocations": [
+            {
+                "charity_id": row.get('charity_id'),
+                "charity_name": row.get('charity_name'),
+                "donation_amount": row['donation_amount'],
+                "transaction_id": row.get('transaction_id')
+            }
+            for row in rows
+        ],
+        "note": "Donation already created for this transaction"
+    }
+
+
+class DonationDedupe:
+    """
+    Detects auto-donations that were already created for a transaction.
+
+    A Bloom filter of every (user_id, original_transaction_id) in user_donations
+    answers most checks in memory, so only possible duplicates are looked up in
+    Supabase. Until the filter has been loaded at startup every check goes to
+    Supabase.
+
+    The filter is per worker process: a miss only means the transaction was not
+    donated on when the filter loaded or through this worker since. It is a fast
+    path, not the guarantee. Donations are inserted with the unique index on
+    user_donations (user_id, original_transaction_id, charity_id) skipping rows
+    that already exist, so a repeat that reaches another worker stores nothing.
+    """
+
+    def __init__(self):
+        self.bloom = BloomFilter(settings.DONATION_DEDUPE_CAPACITY, settings.DONATION_DEDUPE_ERROR_RATE)
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+        self.skipped_lookups = 0
+        self.lookups = 0
+        self.duplicates = 0
+        self.false_positives = 0
+
+    def remember(self, user_id: str, original_transaction_id: str):
+        """Record that a transaction has been donated on"""
+        self.bloom.add(_key(user_id, original_transaction_id))
+
+    async def find_existing(self, user_id: str, original_transaction_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Find donation records already created for a user's transactions
+
+        Args:
+            user_id: The user the transactions belong to
+            original_transaction_ids: Transactions about to be donated on
+
+        Returns:
+            Donation rows grouped by original transaction ID, for duplicates only
+        """
+        if self.ready:
+            candidates = [
+                transaction_id for transaction_id in original_transaction_ids
+                if _key(user_id, transaction_id) in self.bloom
+            ]
+            self.skipped_lookups += len(original_transaction_ids) - len(candidates)
+        else:
+            candidates = list(original_transaction_ids)
+
+        if not candidates:
+            return {}
+
+        self.lookups += len(candidates)
+        rows = await supabase_service.get_transaction_donations(user_id, candidates)
+
+        existing: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            existing.setdefault(row['original_transaction_id'], []).append(row)
+        self.duplicates += len(existing)
+        if self.ready:
+            self.false_positives += len(candidates) - len(existing)
+        return existing
+
+    async def warm(self):
+        """Load every donated (user_id, original_transaction_id) into the Bloom filter"""
+        offset = 0
+        try:
+            while True:
+                rows = await supabase_service.get_donation_keys(offset, DONATION_KEYS_PAGE_SIZE)
+                for row in rows:
+                    if row.get('original_transaction_id'):
+                        self.remember(row['user_id'], row['original_transaction_id'])
+                if len(rows) < DONATION_KEYS_PAGE_SIZE:
+                    break
+                offset += len(rows)
+        except Exception as e:
+            logger.error("Failed to load donation dedupe filter, checking Supabase for every donation: %s", e)
+            return
+
+        self.ready = True
+        logger.info("Loaded %s donated transactions into the dedupe filter", self.bloom.count)
+        if self.bloom.count > self.bloom.capacity:
+            logger.warning("Donation dedupe filter is over capacity, raise DONATION_DEDUPE_CAPACITY")
+
+    async def start(self):
+        """Load the Bloom filter in the background"""
+        self._task = asyncio.create_task(self.warm())
+
+    async def stop(self):
+        """Stop loading the Bloom filter if it is still in progress"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get Bloom filter and lookup metrics"""
+        return {
+            "ready": self.ready,
+            "keys": self.bloom.count,
+            "capacity": self.bloom.capacity,
+            "size_bytes": len(self.bloom._bits),
+            "hash_count": self.bloom.hash_count,
+            "skipped_lookups": self.skipped_lookups,
+            "lookups": self.lookups,
+            "duplicates": self.duplicates,
+            "false_positives": self.false_positives
+        }
+
+
+# Global instance
+donation_dedupe = DonationDedupe()
@@ -0,0 +1,432 @@
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from services.sqlite_db import SQLiteDatabase, local_db
+from services.transaction_store import SCHEMA as TRANSACTIONS_SCHEMA
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS donation_ledger_entries (
+    entry_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    charity_id TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    source_transaction_id TEXT,
+    settlement_id TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_donation_ledger_entries_balance ON donation_ledger_entries (user_id, charity_id, settlement_id);
+CREATE INDEX IF NOT EXISTS idx_donation_ledger_entries_settlement ON donation_ledger_entries (settlement_id);
+
+CREATE TABLE IF NOT EXISTS donation_settlements (
+    settlement_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    charity_id TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    entry_count INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    pledge_donation_id TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_donation_settlements_user ON donation_settlements (user_id, charity_id, status);
+"""
+
+# Settlement states. A settlement is "processing" while its Pledge.to call is in flight.
+# One still processing after a restart, or whose call timed out or got a 5xx, may or may
+# not have reached Pledge.to, so it is marked "unconfirmed" and its entries stay attached
+# rather than risk donating twice. Only a definite rejection is "failed".
+PROCESSING = "processing"
+SETTLED = "settled"
+FAILED = "failed"
+UNCONFIRMED = "unconfirmed"
+
+# Charity used by mock donations, which have nowhere to settle to
+MOCK_CHARITY_ID = "mock_charity_123"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class DonationLedger:
+    """
+    Per-user, per-charity ledger of micro-donations.
+
+    Auto-donations accrue here in integer cents and are sent to Pledge.to as one
+    donation once a user's balance for a charity reaches the settlement threshold.
+    Smaller balances are settled by the daily settlement run once their oldest
+    unsettled entry is older than the settlement window.
+    """
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+        self.threshold_cents = settings.DONATION_SETTLEMENT_THRESHOLD_CENTS
+        self.window = timedelta(hours=settings.DONATION_SETTLEMENT_WINDOW_HOURS)
+        self._schema_ready = False
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.db.ensure_schema(SCHEMA)
+            self._schema_ready = True
+
+    def accrue(self, entries: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """
+        Record donation amounts against their user and charity
+
+        Each entry is keyed by entry_id, so replaying the same entries is a no-op.
+
+        Args:
+            entries: Dicts with entry_id, user_id, charity_id, amount_cents and source_transaction_id
+
+        Returns:
+            (user_id, charity_id) pairs whose pending balance has reached the threshold
+        """
+        self._ensure_schema()
+        entries = [entry for entry in entries if entry['charity_id'] != MOCK_CHARITY_ID]
+        if not entries:
+            return []
+
+        created_at = _now().isoformat()
+        pairs = sorted({(entry['user_id'], entry['charity_id']) for entry in entries})
+
+        with self.db.transaction() as connection:
+            connection.executemany(
+                """
+                INSERT OR IGNORE INTO donation_ledger_entries
+                    (entry_id, user_id, charity_id, amount_cents, source_transaction_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        entry['entry_id'],
+                        entry['user_id'],
+                        entry['charity_id'],
+                        int(entry['amount_cents']),
+                        entry.get('source_transaction_id'),
+                        created_at
+                    )
+                    for entry in entries
+                ]
+            )
+
+            due = []
+            for user_id, charity_id in pairs:
+                pending_cents = connection.execute(
+                    """
+                    SELECT COALESCE(SUM(amount_cents), 0) FROM donation_ledger_entries
+                    WHERE user_id = ? AND charity_id = ? AND settlement_id IS NULL
+                    """,
+                    (user_id, charity_id)
+                ).fetchone()[0]
+                if pending_cents >= self.threshold_cents:
+                    due.append((user_id, charity_id))
+        return due
+
+    def due_balances(self) -> List[Tuple[str, str]]:
+        """Get (user_id, charity_id) pairs over the threshold or past the settlement window"""
+        self._ensure_schema()
+        cutoff = (_now() - self.window).isoformat()
+        rows = self.db.execute(
+            """
+            SELECT user_id, charity_id FROM donation_ledger_entries
+            WHERE settlement_id IS NULL
+            GROUP BY user_id, charity_id
+            HAVING SUM(amount_cents) > 0 AND (SUM(amount_cents) >= ? OR MIN(created_at) <= ?)
+            """,
+            (self.threshold_cents, cutoff)
+        )
+        return [(row['user_id'], row['charity_id']) for row in rows]
+
+    def _claim(self, user_id: str, charity_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically attach a balance's unsettled entries to a new processing settlement"""
+        with self.db.transaction() as connection:
+            amount_cents, entry_count = connection.execute(
+                """
+                SELECT COALESCE(SUM(amount_cents), 0), COUNT(*) FROM donation_ledger_entries
+                WHERE user_id = ? AND charity_id = ? AND settlement_id IS NULL
+                """,
+                (user_id, charity_id)
+            ).fetchone()
+            if amount_cents <= 0:
+                return None
+
+            settlement_id = f"settlement_{uuid.uuid4().hex}"
+            connection.execute(
+                """
+                INSERT INTO donation_settlements
+                    (settlement_id, user_id, charity_id, amount_cents, entry_count, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (settlement_id, user_id, charity_id, amount_cents, entry_count, PROCESSING, _now().isoformat())
+            )
+            connection.execute(
+                """
+                UPDATE donation_ledger_entries SET settlement_id = ?
+                WHERE user_id = ? AND charity_id = ? AND settlement_id IS NULL
+                """,
+                (settlement_id, user_id, charity_id)
+            )
+        return {"settlement_id": settlement_id, "amount_cents": amount_cents, "entry_count": entry_count}
+
+    def _complete(self, settlement_id: str, pledge_donation_id: Optional[str]):
+        """Mark a settlement as sent to Pledge.to"""
+        self.db.execute(
+            "UPDATE donation_settlements SET status = ?, pledge_donation_id = ?, completed_at = ? WHERE settlement_id = ?",
+            (SETTLED, pledge_donation_id, _now().isoformat(), settlement_id)
+        )
+
+    def _fail(self, settlement_id: str, error: str):
+        """Mark a settlement as failed and return its entries to the pending balance"""
+        with self.db.transaction() as connection:
+            connection.execute(
+                "UPDATE donation_ledger_entries SET settlement_id = NULL WHERE settlement_id = ?",
+                (settlement_id,)
+            )
+            connection.execute(
+                "UPDATE donation_settlements SET status = ?, error = ?, completed_at = ? WHERE settlement_id = ?",
+                (FAILED, error, _now().isoformat(), settlement_id)
+            )
+
+    def _unconfirm(self, settlement_id: str, error: str):
+        """Mark a settlement whose outcome is unknown, keeping its entries attached"""
+        self.db.execute(
+            "UPDATE donation_settlements SET status = ?, error = ? WHERE settlement_id = ?",
+            (UNCONFIRMED, error, settlement_id)
+        )
+
+    def recover(self) -> int:
+        """
+        Mark settlements interrupted by a restart as unconfirmed
+
+        Returns:
+            Number of settlements marked unconfirmed
+        """
+        self._ensure_schema()
+        with self.db.transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE donation_settlements SET status = ?, error = ? WHERE status = ?",
+                (UNCONFIRMED, "Interrupted before Pledge.to confirmed the donation", PROCESSING)
+            )
+            interrupted = cursor.rowcount
+        if interrupted:
+            logger.error("%s donation settlements were interrupted and need manual confirmation", interrupted)
+        return interrupted
+
+    def _lock(self, user_id: str, charity_id: str) -> asyncio.Lock:
+        key = (user_id, charity_id)
+        if key not in self._locks:
+            self._locks[key] = asyncio.Lock()
+        return self._locks[key]
+
+    async def settle(self, user_id: str, charity_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Send a user's pending balance for a charity to Pledge.to as one donation
+
+        Returns:
+            The settlement, or None if there was nothing to settle
+        """
+        from services.auto_donation import auto_donation_service
+
+        async with self._lock(user_id, charity_id):
+            claim = await asyncio.to_thread(self._claim, user_id, charity_id)
+            if claim is None:
+                return None
+
+            settlement_id = claim['settlement_id']
+            amount = claim['amount_cents'] / 100
+            try:
+                response = await auto_donation_service.create_pledge_donation(
+                    charity_id, amount, user_id, reference=settlement_id
+                )
+            except Exception as e:
+                response = {"success": False, "error": str(e), "rejected": False}
+
+            if response.get('success') is False and response.get('rejected'):
+                error = response.get('error')
+                await asyncio.to_thread(self._fail, settlement_id, error)
+                logger.error("Settlement %s of %.2f to %s for user %s failed: %s", settlement_id, amount, charity_id, user_id, error)
+                return {**claim, "status": FAILED, "error": error}
+
+            if response.get('success') is False or not response.get('id'):
+                # Pledge.to may have created the donation; do not send these entries again
+                error = response.get('error') or "Pledge.to did not return a donation id"
+                await asyncio.to_thread(self._unconfirm, settlement_id, error)
+                logger.error(
+                    "Settlement %s of %.2f to %s for user %s is unconfirmed and needs manual confirmation: %s",
+                    settlement_id, amount, charity_id, user_id, error
+                )
+                return {**claim, "status": UNCONFIRMED, "error": error}
+
+            await asyncio.to_thread(self._complete, settlement_id, response['id'])
+            logger.info("Settled %.2f to %s for user %s from %s donations", amount, charity_id, user_id, claim['entry_count'])
+            return {**claim, "status": SETTLED, "pledge_donation_id": response['id']}
+
+    async def accrue_and_settle(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Accrue entries, then settle any balances they pushed over the threshold"""
+        due = await asyncio.to_thread(self.accrue, entries)
+        settlements = []
+        for user_id, charity_id in due:
+            settlement = await self.settle(user_id, charity_id)
+            if settlement:
+                settlements.append(settlement)
+        return settlements
+
+    def repoint(self, user_id: str, moves: Dict[str, str]) -> int:
+        """
+        Attribute a user's entries to the transactions that replaced their source
+
+        Args:
+            user_id: The user the entries belong to
+            moves: New source transaction ID keyed by the old one
+
+        Returns:
+            Number of entries moved
+        """
+        self._ensure_schema()
+        if not moves:
+            return 0
+        with self.db.transaction() as connection:
+            cursor = connection.executemany(
+                "UPDATE donation_ledger_entries SET source_transaction_id = ? WHERE user_id = ? AND source_transaction_id = ?",
+                [(new_id, user_id, old_id) for old_id, new_id in moves.items()]
+            )
+            return cursor.rowcount
+
+    def reverse(self, user_id: str, transaction_ids: List[str]) -> int:
+        """
+        Take back the donations accrued for transactions that no longer exist
+
+        Unsettled entries are deleted. Entries already sent to Pledge.to cannot be
+        recalled, so each gets an offsetting negative entry that is deducted from
+        the user's next settlement to the same charity.
+
+        Returns:
+            Cents reversed
+        """
+        self._ensure_schema()
+        if not transaction_ids:
+            return 0
+        placeholders = ", ".join("?" for _ in transaction_ids)
+        created_at = _now().isoformat()
+        with self.db.transaction() as connection:
+            rows = connection.execute(
+                f"""
+                SELECT entry_id, charity_id, amount_cents, source_transaction_id, settlement_id
+                FROM donation_ledger_entries
+                WHERE user_id = ? AND source_transaction_id IN ({placeholders}) AND amount_cents > 0
+                """,
+                (user_id, *transaction_ids)
+            ).fetchall()
+            connection.executemany(
+                "DELETE FROM donation_ledger_entries WHERE entry_id = ?",
+                [(row['entry_id'],) for row in rows if row['settlement_id'] is None]
+            )
+            connection.executemany(
+                """
+                INSERT OR IGNORE INTO donation_ledger_entries
+                    (entry_id, user_id, charity_id, amount_cents, source_transaction_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (f"{row['entry_id']}:reversal", user_id, row['charity_id'], -row['amount_cents'], row['source_transaction_id'], created_at)
+                    for row in rows if row['settlement_id'] is not None
+                ]
+            )
+        return sum(row['amount_cents'] for row in rows)
+
+    def donated_cents_by_date(self, user_id: str, dates: List[str]) -> Dict[str, int]:
+        """Get cents a user has accrued per purchase date, from locally synced transactions"""
+        self._ensure_schema()
+        if not dates:
+            return {}
+        self.db.ensure_schema(TRANSACTIONS_SCHEMA)
+        placeholders = ", ".join("?" for _ in dates)
+        rows = self.db.execute(
+            f"""
+            SELECT transactions.date AS date, SUM(entries.amount_cents) AS cents
+            FROM donation_ledger_entries AS entries
+            JOIN plaid_transactions AS transactions ON transactions.transaction_id = entries.source_transaction_id
+            WHERE entries.user_id = ? AND transactions.date IN ({placeholders})
+            GROUP BY transactions.date
+            """,
+            (user_id, *dates)
+        )
+        return {row['date']: row['cents'] for row in rows}
+
+    def get_balances(self, user_id: str) -> Dict[str, Any]:
+        """Get a user's pending, settled and unconfirmed amounts per charity"""
+        self._ensure_schema()
+        charities: Dict[str, Dict[str, Any]] = {}
+
+        def charity(charity_id: str) -> Dict[str, Any]:
+            if charity_id not in charities:
+                charities[charity_id] = {
+                    "charity_id": charity_id,
+                    "pending_cents": 0,
+                    "pending_count": 0,
+                    "oldest_pending_at": None,
+                    "settled_cents": 0,
+                    "settlements": 0,
+                    "last_settled_at": None,
+                    "unconfirmed_cents": 0
+                }
+            return charities[charity_id]
+
+        pending_rows = self.db.execute(
+            """
+            SELECT charity_id, SUM(amount_cents) AS cents, COUNT(*) AS entries, MIN(created_at) AS oldest
+            FROM donation_ledger_entries
+            WHERE user_id = ? AND settlement_id IS NULL
+            GROUP BY charity_id
+            """,
+            (user_id,)
+        )
+        for row in pending_rows:
+            balance = charity(row['charity_id'])
+            balance['pending_cents'] = row['cents']
+            balance['pending_count'] = row['entries']
+            balance['oldest_pending_at'] = row['oldest']
+
+        settlement_rows = self.db.execute(
+            """
+            SELECT charity_id, status, SUM(amount_cents) AS cents, COUNT(*) AS settlements, MAX(completed_at) AS last_at
+            FROM donation_settlements
+            WHERE user_id = ? AND status IN (?, ?)
+            GROUP BY charity_id, status
+            """,
+            (user_id, SETTLED, UNCONFIRMED)
+        )
+        for row in settlement_rows:
+            balance = charity(row['charity_id'])
+            if row['status'] == SETTLED:
+                balance['settled_cents'] = row['cents']
+                balance['settlements'] = row['settlements']
+                balance['last_settled_at'] = row['last_at']
+            else:
+                balance['unconfirmed_cents'] = row['cents']
+
+        balances = sorted(charities.values(), key=lambda balance: balance['charity_id'])
+        return {
+            "user_id": user_id,
+            "pending_cents": sum(balance['pending_cents'] for balance in balances),
+            "settled_cents": sum(balance['settled_cents'] for balance in balances),
+            "unconfirmed_cents": sum(balance['unconfirmed_cents'] for balance in balances),
+            "threshold_cents": self.threshold_cents,
+            "window_hours": self.window.total_seconds() / 3600,
+            "charities": balances
+        }
+
+    async def start(self):
+        """Recover settlements interrupted by the last shutdown"""
+        await asyncio.to_thread(self.recover)
+
+
+# Global instance
+donation_ledger = DonationLedger(local_db)
@@ -0,0 +1,466 @@
+import os
+import glob
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+import numpy as np
+from config import settings
+from services.allocation import allocate_cents
+from services.donation_rules import category_codes, compile_rules, evaluate_rules, normalize_merchants
+from services.supabase_client import supabase_service
+from services.donation_ledger import donation_ledger
+from services.donation_reconciler import donation_reconciler
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILE = "summary.json"
+DIFF_FILE_PATTERN = "diff-*.ndjson"
+APPLIED_FILE = "applied.ndjson"
+USERS_PAGE_SIZE = 1000
+# Transaction IDs per user_donations lookup, keeping the request URL short
+CURRENT_DONATIONS_PAGE_SIZE = 200
+
+
+def _init_worker():
+    """Give each worker process its own Supabase connections instead of the parent's"""
+    supabase_service.reset_after_fork()
+
+
+async def _current_donations(user_id: str, transaction_ids: List[str]) -> List[Dict[str, Any]]:
+    """Fetch a user's stored donation rows for the given transactions, a page at a time"""
+    rows = []
+    for offset in range(0, len(transaction_ids), CURRENT_DONATIONS_PAGE_SIZE):
+        rows.extend(await supabase_service.get_transaction_donations(
+            user_id, transaction_ids[offset:offset + CURRENT_DONATIONS_PAGE_SIZE]
+        ))
+    return rows
+
+
+def recompute_user(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Recompute one user's donations in a worker process
+
+    Streams the user's purchases from the local database in (date, transaction_id)
+    order, one chunk at a time, evaluates each chunk against the user's current
+    rules and charity allocation, and compares the result with the donation rows
+    stored in user_donations per transaction and charity. Those rows include
+    donations made before the ledger existed and mock-charity donations, which
+    the ledger does not hold. Changed transactions are appended to this
+    process's diff file, so memory stays bounded by the chunk size.
+
+    Args:
+        task: user_id, user_settings, allocation, since, until, db_path, report_dir and chunk_size
+
+    Returns:
+        Counts for the user
+    """
+    started_at = time.perf_counter()
+    connection = sqlite3.connect(f"file:{task['db_path']}?mode=ro", uri=True)
+    connection.row_factory = sqlite3.Row
+
+    user_id = task['user_id']
+    rules = compile_rules(task['user_settings'])
+    charity_ids = [charity_id for charity_id, _ in task['allocation']]
+    charity_slots = {charity_id: slot for slot, charity_id in enumerate(charity_ids)}
+    percentages = [percentage for _, percentage in task['allocation']]
+
+    summary = {
+        "user_id": user_id,
+        "transactions": 0,
+        "changed": 0,
+        "expected_cents": 0,
+        "current_cents": 0
+    }
+    last_date, last_transaction_id = task['since'], ""
+    carry_date, carry_cents = None, 0
+
+    report_path = os.path.join(task['report_dir'], f"diff-{os.getpid()}.ndjson")
+    try:
+        with open(report_path, "a") as report:
+            while True:
+                rows = connection.execute(
+                    """
+                    SELECT transaction_id, date, amount, merchant_name, category FROM plaid_transactions
+                    WHERE user_id = ? AND amount > 0 AND date <= ?
+                        AND (date > ? OR (date = ? AND transaction_id > ?))
+                    ORDER BY date, transaction_id
+                    LIMIT ?
+                    """,
+                    (user_id, task['until'], last_date, last_date, last_transaction_id, task['chunk_size'])
+                ).fetchall()
+                if not rows:
+                    break
+                last_date, last_transaction_id = rows[-1]['date'], rows[-1]['transaction_id']
+
+                transaction_ids = [row['transaction_id'] for row in rows]
+                amounts = [row['amount'] for row in rows]
+                dates = [row['date'] for row in rows]
+
+                # The daily cap carries over from the previous chunk when a date spans both
+                cents = evaluate_rules(
+                    rules,
+                    amounts,
+                    category_codes(row['category'] for row in rows),
+                    normalize_merchants(row['merchant_name'] for row in rows),
+                    dates,
+                    {carry_date: carry_cents} if carry_date else None
+                )
+                chunk_last_date_cents = int(cents[np.asarray(dates) == last_date].sum())
+                carry_cents = carry_cents + chunk_last_date_cents if carry_date == last_date else chunk_last_date_cents
+                carry_date = last_date
+
+                expected = allocate_cents(cents, percentages)
+
+                # What user_donations holds now, in the same (transaction, charity) layout
+                current = np.zeros_like(expected)
+                unknown_charity = np.zeros(len(rows), dtype=bool)
+                current_other: Dict[int, Dict[str, int]] = {}
+                index = {transaction_id: position for position, transaction_id in enumerate(transaction_ids)}
+                for donation in asyncio.run(_current_donations(user_id, transaction_ids)):
+                    position = index[donation['original_transaction_id']]
+                    charity_id = donation['charity_id']
+                    cents = round(float(donation['donation_amount']) * 100)
+                    slot = charity_slots.get(charity_id)
+                    if slot is not None:
+                        current[position, slot] += cents
+                    elif cents:
+                        unknown_charity[position] = True
+                        other = current_other.setdefault(position, {})
+                        other[charity_id] = other.get(charity_id, 0) + cents
+
+                changed = np.flatnonzero(np.any(expected != current, axis=1) | unknown_charity)
+                for position in changed:
+                    row = rows[position]
+                    current_cents = {
+                        charity_id: int(current[position, slot])
+                        for charity_id, slot in charity_slots.items() if current[position, slot]
+                    }
+                    current_cents.update(current_other.get(position, {}))
+                    expected_cents = {
+                        charity_id: int(expected[position, slot])
+                        for charity_id, slot in charity_slots.items() if expected[position, slot]
+                    }
+                    report.write(json.dumps({
+                        "user_id": user_id,
+                        "transaction_id": row['transaction_id'],
+                        "date": row['date'],
+                        "amount": row['amount'],
+                        "merchant_name": row['merchant_name'],
+                        "current_cents": current_cents,
+                        "expected_cents": expected_cents,
+                        "delta_cents": sum(expected_cents.values()) - sum(current_cents.values())
+                    }) + "\n")
+
+                summary['transactions'] += len(rows)
+                summary['changed'] += len(changed)
+                summary['expected_cents'] += int(expected.sum())
+                summary['current_cents'] += int(current.sum()) + sum(
+                    sum(other.values()) for other in current_other.values()
+                )
+    finally:
+        connection.close()
+
+    summary['seconds'] = time.perf_counter() - started_at
+    return summary
+
+
+def iter_diffs(report_dir: str) -> Iterator[Dict[str, Any]]:
+    """Stream diff records from a report directory, one user's records at a time"""
+    for path in sorted(glob.glob(os.path.join(report_dir, DIFF_FILE_PATTERN))):
+        with open(path) as report:
+            for line in report:
+                yield json.loads(line)
+
+
+class DonationRecompute:
+    """
+    Recomputes historical auto-donations against users' current settings.
+
+    Users' locally synced purchases are streamed through a process pool; each
+    worker re-evaluates one user's history against their current donation rules
+    and charity allocation and writes the transactions whose donation changed
+    to a diff report. Applying a report writes the changes back in bulk.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def _users(self, user_ids: Optional[List[str]]) -> Iterator[Dict[str, Any]]:
+        """Page through users with a linked item and the date they linked it"""
+        connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        connection.row_factory = sqlite3.Row
+        try:
+            if user_ids:
+                for user_id in user_ids:
+                    row = connection.execute(
+                        "SELECT MIN(linked_at) AS linked_at FROM plaid_items WHERE user_id = ?", (user_id,)
+                    ).fetchone()
+                    yield {"user_id": user_id, "linked_at": row['linked_at'] if row else None}
+                return
+
+            last_user_id = ""
+            while True:
+                rows = connection.execute(
+                    """
+                    SELECT user_id, MIN(linked_at) AS linked_at FROM plaid_items
+                    WHERE user_id > ? GROUP BY user_id ORDER BY user_id LIMIT ?
+                    """,
+                    (last_user_id, USERS_PAGE_SIZE)
+                ).fetchall()
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(row)
+                last_user_id = rows[-1]['user_id']
+        finally:
+            connection.close()
+
+    async def _task(self, user: Dict[str, Any], since: Optional[str], until: Optional[str], report_dir: str, chunk_size: int) -> Optional[Dict[str, Any]]:
+        """Build a worker task for a user, or None if the user should be left alone"""
+        user_id = user['user_id']
+        user_settings = await supabase_service.get_user_settings(user_id)
+        if not user_settings.get('auto_donate_enabled'):
+            return None
+
+        # Recomputing against no charities would reverse every real donation
+        preferences = await supabase_service.get_user_charity_preferences(user_id)
+        if not preferences:
+            return None
+
+        # Like the webhook path, only purchases made since the item was linked are donated on
+        start = max(since or "", (user['linked_at'] or "")[:10])
+        return {
+            "user_id": user_id,
+            "user_settings": user_settings,
+            "allocation": [
+                (preference['charity_id'], preference.get('allocation_percentage') or 0)
+                for preference in preferences
+            ],
+            "since": start,
+            "until": until or "9999-12-31",
+            "db_path": self.db_path,
+            "report_dir": report_dir,
+            "chunk_size": chunk_size
+        }
+
+    async def run(
+        self,
+        report_dir: str,
+        user_ids: Optional[List[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = 5000
+    ) -> Dict[str, Any]:
+        """
+        Recompute donations and write a diff report
+
+        Args:
+            report_dir: Directory for the diff files and summary.json
+            user_ids: Users to recompute (defaults to every user with a linked item)
+            since: First transaction date to recompute (YYYY-MM-DD)
+            until: Last transaction date to recompute (YYYY-MM-DD)
+            workers: Worker processes (defaults to the CPU count)
+            chunk_size: Transactions per chunk held in a worker's memory
+
+        Returns:
+            The run summary, also written to summary.json
+        """
+        os.makedirs(report_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(report_dir, DIFF_FILE_PATTERN)) + glob.glob(os.path.join(report_dir, APPLIED_FILE)):
+            os.remove(path)
+
+        workers = workers or os.cpu_count() or 1
+        run_id = f"recompute_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}"
+        summary = {
+            "run_id": run_id,
+            "since": since,
+            "until": until,
+            "users": 0,
+            "skipped_users": 0,
+            "transactions": 0,
+            "changed": 0,
+            "expected_cents": 0,
+            "current_cents": 0,
+            "applied_at": None
+        }
+
+        loop = asyncio.get_running_loop()
+        started_at = time.perf_counter()
+        last_progress_at = started_at
+
+        def collect(result: Dict[str, Any]):
+            summary['users'] += 1
+            for key in ("transactions", "changed", "expected_cents", "current_cents"):
+                summary[key] += result[key]
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            pending = set()
+            for user in self._users(user_ids):
+                task = await self._task(user, since, until, report_dir, chunk_size)
+                if task is None:
+                    summary['skipped_users'] += 1
+                    continue
+
+                pending.add(loop.run_in_executor(pool, recompute_user, task))
+                # Keep a bounded number of users in flight
+                if len(pending) >= workers * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        collect(future.result())
+
+                if time.perf_counter() - last_progress_at >= 10:
+                    last_progress_at = time.perf_counter()
+                    elapsed = last_progress_at - started_at
+                    logger.info(
+                        "Recomputed %s transactions for %s users (%.0f transactions/s)",
+                        summary['transactions'], summary['users'], summary['transactions'] / elapsed
+                    )
+
+            for future in asyncio.as_completed(pending):
+                collect(await future)
+
+        seconds = time.perf_counter() - started_at
+        summary['delta_cents'] = summary['expected_cents'] - summary['current_cents']
+        summary['seconds'] = round(seconds, 3)
+        summary['transactions_per_second'] = round(summary['transactions'] / seconds) if seconds else 0
+        self._write_summary(report_dir, summary)
+        return summary
+
+    def _write_summary(self, report_dir: str, summary: Dict[str, Any]):
+        with open(os.path.join(report_dir, SUMMARY_FILE), "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+
+    async def _apply_user_batch(self, run_id: str, records: List[Dict[str, Any]], charity_names: Dict[str, str]) -> bool:
+        """Replace one user's donation rows for a batch of changed transactions"""
+        user_id = records[0]['user_id']
+        transaction_ids = [record['transaction_id'] for record in records]
+
+        for charity_id in {charity_id for record in records for charity_id in record['expected_cents']}:
+            if charity_id not in charity_names:
+                charity_names[charity_id] = await supabase_service.get_charity_name(charity_id) or f"Charity {charity_id}"
+
+        rows = []
+        for record in records:
+            donation_cents = sum(record['expected_cents'].values())
+            for charity_id, cents in record['expected_cents'].items():
+                rows.append({
+                    'user_id': user_id,
+                    'charity_id': charity_id,
+                    'charity_name': charity_names[charity_id],
+                    'donation_amount': cents / 100,
+                    'transaction_id': f"{run_id}_{record['transaction_id']}_{len(rows)}",
+                    'original_transaction_id': record['transaction_id'],
+                    'donation_percentage': donation_cents / 100 / record['amount'],
+                    'donation_date': record['date'],
+                    'merchant_name': record['merchant_name']
+                })
+
+        replaced = await supabase_service.delete_transaction_donations(user_id, transaction_ids)
+        if rows and not await supabase_service.create_user_donations(rows):
+            logger.error("Failed to write %s recomputed donation records for user %s", len(rows), user_id)
+            if replaced:
+                await supabase_service.create_user_donations(replaced)
+            return False
+
+        # Adjustments are separate ledger entries, so already-settled amounts are
+        # corrected in the next settlement rather than rewritten
+        entries = [
+            {
+                'entry_id': f"{user_id}:{record['transaction_id']}:{charity_id}:{run_id}",
+                'user_id': user_id,
+                'charity_id': charity_id,
+                'amount_cents': record['expected_cents'].get(charity_id, 0) - record['current_cents'].get(charity_id, 0),
+                'source_transaction_id': record['transaction_id']
+            }
+            for record in records
+            for charity_id in record['expected_cents'].keys() | record['current_cents'].keys()
+            if record['expected_cents'].get(charity_id, 0) != record['current_cents'].get(charity_id, 0)
+        ]
+        await asyncio.to_thread(donation_ledger.accrue, entries)
+        await asyncio.to_thread(donation_reconciler.record, user_id, [
+            (record['transaction_id'], sum(record['expected_cents'].values()))
+            for record in records if record['expected_cents']
+        ])
+
+        delta_cents = sum(record['delta_cents'] for record in records)
+        if delta_cents:
+            await supabase_service.update_user_total_donation(user_id, delta_cents / 100)
+        return True
+
+    async def apply(self, report_dir: str, batch_size: int = 500) -> Dict[str, Any]:
+        """
+        Write a diff report's changes back in bulk
+
+        Each batch of one user's changed transactions is one delete and one
+        multi-row insert in user_donations, one ledger write of adjustment
+        entries and one update of the user's total. Every batch that is written
+        is recorded in applied.ndjson, so applying an interrupted or partly
+        failed report again skips the batches that already went through and
+        retries the rest. Once every batch has been written the report is
+        marked applied and cannot be applied again.
+
+        Returns:
+            The run summary with the apply counts added
+        """
+        with open(os.path.join(report_dir, SUMMARY_FILE)) as summary_file:
+            summary = json.load(summary_file)
+        if summary.get('applied_at'):
+            raise ValueError(f"Report {summary['run_id']} was already applied at {summary['applied_at']}")
+
+        applied_path = os.path.join(report_dir, APPLIED_FILE)
+        done = set()
+        if os.path.exists(applied_path):
+            with open(applied_path) as applied_file:
+                for line in applied_file:
+                    record = json.loads(line)
+                    done.update((record['user_id'], transaction_id) for transaction_id in record['transaction_ids'])
+
+        charity_names: Dict[str, str] = {}
+        applied = failed = 0
+        started_at = time.perf_counter()
+
+        with open(applied_path, "a") as applied_file:
+            async def flush(batch: List[Dict[str, Any]]):
+                nonlocal applied, failed
+                if await self._apply_user_batch(summary['run_id'], batch, charity_names):
+                    applied += len(batch)
+                    applied_file.write(json.dumps({
+                        "user_id": batch[0]['user_id'],
+                        "transaction_ids": [record['transaction_id'] for record in batch]
+                    }) + "\n")
+                    applied_file.flush()
+                    os.fsync(applied_file.fileno())
+                else:
+                    failed += len(batch)
+
+            batch: List[Dict[str, Any]] = []
+            for record in iter_diffs(report_dir):
+                if (record['user_id'], record['transaction_id']) in done:
+                    continue
+                if batch and (record['user_id'] != batch[0]['user_id'] or len(batch) >= batch_size):
+                    await flush(batch)
+                    batch = []
+                batch.append(record)
+            if batch:
+                await flush(batch)
+
+        seconds = time.perf_counter() - started_at
+        if not failed:
+            summary['applied_at'] = datetime.now(timezone.utc).isoformat()
+        summary['applied'] = len(done) + applied
+        summary['apply_skipped'] = len(done)
+        summary['apply_failed'] = failed
+        summary['apply_seconds'] = round(seconds, 3)
+        summary['applied_per_second'] = round(applied / seconds) if seconds else 0
+        self._write_summary(report_dir, summary)
+        return summary
+
+
+# Global instance
+donation_recompute = DonationRecompute(settings.LOCAL_DB_PATH)
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+from services.sqlite_db import SQLiteDatabase, local_db
+from services.supabase_client import supabase_service
+from services.donation_ledger import DonationLedger, donation_ledger
+from services.donation_dedupe import donation_dedupe
+from services.shutdown import shutdown_coordinator
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transaction_donations (
+    user_id TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    donation_cents INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, transaction_id)
+);
+"""
+
+
+class DonationReconciler:
+    """
+    Keeps each purchase's auto-donation attached to exactly one Plaid transaction.
+
+    Plaid reports a card purchase first as a pending transaction and later as a
+    posted one with a new transaction_id whose pending_transaction_id points back
+    at the pending one; the pending transaction is removed at the same time.
+    Every donated transaction is indexed locally, so the pending IDs that synced
+    transactions mention are resolved with one indexed lookup:
+
+    - a donated pending transaction that posted has its donation re-pointed to
+      the posted transaction, which is then not donated on again
+    - a donated pending transaction removed without posting (an authorization
+      that was voided) has its donation reversed
+    """
+
+    def __init__(self, db: SQLiteDatabase, ledger: DonationLedger):
+        self.db = db
+        self.ledger = ledger
+        self._schema_ready = False
+
+        self.repointed = 0
+        self.reversed = 0
+        self.reversed_cents = 0
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.db.ensure_schema(SCHEMA)
+            self._schema_ready = True
+
+    def record(self, user_id: str, donations: List[Tuple[str, int]]):
+        """
+        Index transactions that were donated on
+
+        Args:
+            user_id: The user the transactions belong to
+            donations: (transaction_id, donation_cents) pairs
+        """
+        self._ensure_schema()
+        if not donations:
+            return
+        created_at = datetime.now(timezone.utc).isoformat()
+        with self.db.transaction() as connection:
+            connection.executemany(
+                """
+                INSERT OR IGNORE INTO transaction_donations (user_id, transaction_id, donation_cents, created_at)
+                VALUES (?, ?, ?, ?)
+                """,
+                [(user_id, transaction_id, int(cents), created_at) for transaction_id, cents in donations]
+            )
+
+    def _donated(self, user_id: str, transaction_ids: List[str]) -> Dict[str, int]:
+        """Get donation cents for the given transactions that were donated on"""
+        self._ensure_schema()
+        if not transaction_ids:
+            return {}
+        placeholders = ", ".join("?" for _ in transaction_ids)
+        rows = self.db.execute(
+            f"""
+            SELECT transaction_id, donation_cents FROM transaction_donations
+            WHERE user_id = ? AND transaction_id IN ({placeholders})
+            """,
+            (user_id, *transaction_ids)
+        )
+        return {row['transaction_id']: row['donation_cents'] for row in rows}
+
+    def _apply(self, user_id: str, moves: Dict[str, str], reversals: List[str]) -> int:
+        """Re-key moved donations and drop reversed ones in the index and the ledger"""
+        with self.db.transaction() as connection:
+            connection.executemany(
+                "UPDATE transaction_donations SET transaction_id = ? WHERE user_id = ? AND transaction_id = ?",
+                [(posted_id, user_id, pending_id) for pending_id, posted_id in moves.items()]
+            )
+            connection.executemany(
+                "DELETE FROM transaction_donations WHERE user_id = ? AND transaction_id = ?",
+                [(user_id, pending_id) for pending_id in reversals]
+            )
+        self.ledger.repoint(user_id, moves)
+        return self.ledger.reverse(user_id, reversals)
+
+    async def reconcile(
+        self,
+        user_id: str,
+        transactions: List[Dict[str, Any]],
+        removed: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Resolve pending-to-posted transitions for a user's synced transactions
+
+        Both lists come from the local transaction store, not a single sync's
+        delta, so a transition is reconciled whichever caller synced it and is
+        tried again after a failure. The Supabase side of each move or reversal
+        is applied before the local index, so repeating it changes nothing.
+
+        Runs in time linear in the number of transactions: posted transactions
+        are indexed by the pending transaction they replace, and the donation
+        index is queried once for every pending ID involved.
+
+        Args:
+            user_id: The user the transactions belong to
+            transactions: Synced transactions that have not been evaluated yet
+            removed: IDs of transactions syncs removed since the last reconcile
+
+        Returns:
+            The transactions that still need to be evaluated for donations
+        """
+        posted_by_pending = {
+            transaction['pending_transaction_id']: transaction['transaction_id']
+            for transaction in transactions
+            if transaction.get('pending_transaction_id') and not transaction.get('pending')
+        }
+        transaction_ids = [transaction['transaction_id'] for transaction in transactions]
+        candidates = list(posted_by_pending.keys() | set(removed) | set(transaction_ids))
+        if not candidates:
+            return transactions
+
+        donated = await asyncio.to_thread(self._donated, user_id, candidates)
+        moves = {
+            pending_id: posted_id
+            for pending_id, posted_id in posted_by_pending.items()
+            if pending_id in donated and posted_id not in donated
+        }
+        reversals = [pending_id for pending_id in removed if pending_id in donated and pending_id not in moves]
+
+        if moves or reversals:
+            # Supabase, the ledger and the index are updated as a unit that outlives a cancelled sync
+            await shutdown_coordinator.complete(self._reconcile(user_id, moves, reversals))
+
+        # Posted transactions a donation was moved to, and ones donated on before, are already covered
+        covered = set(moves.values()) | {transaction_id for transaction_id in transaction_ids if transaction_id in donated}
+        return [transaction for transaction in transactions if transaction['transaction_id'] not in covered]
+
+    async def _reconcile(self, user_id: str, moves: Dict[str, str], reversals: List[str]):
+        await asyncio.gather(*(
+            supabase_service.repoint_transaction_donations(user_id, pending_id, posted_id)
+            for pending_id, posted_id in moves.items()
+        ))
+
+        if reversals:
+            # Rows already deleted by an earlier, interrupted attempt are not deducted again
+            deleted = await supabase_service.delete_transaction_donations(user_id, reversals)
+            deleted_amount = round(sum(row['donation_amount'] for row in deleted), 2)
+            if deleted_amount:
+                await supabase_service.update_user_total_donation(user_id, -deleted_amount)
+
+        reversed_cents = await asyncio.to_thread(self._apply, user_id, moves, reversals)
+        for posted_id in moves.values():
+            donation_dedupe.remember(user_id, posted_id)
+
+        self.repointed += len(moves)
+        self.reversed += len(reversals)
+        self.reversed_cents += reversed_cents
+        logger.info(
+            "Reconciled pending donations for user %s: %s moved to posted transactions, %s reversed",
+            user_id, len(moves), len(reversals)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get reconciliation counts since startup"""
+        return {
+            "repointed": self.repointed,
+            "reversed": self.reversed,
+            "reversed_cents": self.reversed_cents
+        }
+
+
+# Global instance
+donation_reconciler = DonationReconciler(local_db, donation_ledger)
@@ -0,0 +1,172 @@
+import json
+import numpy as np
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence
+from services.allocation import to_cents
+
+# Plaid personal_finance_category primary values. Each gets a fixed slot in the
+# compiled lookup tables; anything else falls into the trailing "other" slot.
+PLAID_CATEGORIES = [
+    "INCOME",
+    "TRANSFER_IN",
+    "TRANSFER_OUT",
+    "LOAN_PAYMENTS",
+    "BANK_FEES",
+    "ENTERTAINMENT",
+    "FOOD_AND_DRINK",
+    "GENERAL_MERCHANDISE",
+    "HOME_IMPROVEMENT",
+    "MEDICAL",
+    "PERSONAL_CARE",
+    "GENERAL_SERVICES",
+    "GOVERNMENT_AND_NON_PROFIT",
+    "TRANSPORTATION",
+    "TRAVEL",
+    "RENT_AND_UTILITIES",
+]
+CATEGORY_INDEX = {category: index for index, category in enumerate(PLAID_CATEGORIES)}
+OTHER_CATEGORY = len(PLAID_CATEGORIES)
+
+
+def category_codes(categories: Iterable[Optional[str]]) -> np.ndarray:
+    """Map category names to their lookup table slots"""
+    return np.fromiter(
+        (CATEGORY_INDEX.get(category, OTHER_CATEGORY) for category in categories),
+        dtype=np.intp
+    )
+
+
+def normalize_merchants(merchants: Iterable[Optional[str]]) -> List[str]:
+    """Case- and whitespace-insensitive merchant names"""
+    return [(merchant or "").strip().lower() for merchant in merchants]
+
+
+class CompiledRules:
+    """A user's donation rules flattened into arrays the evaluator can index directly"""
+
+    def __init__(self, percentages: np.ndarray, excluded_merchants: FrozenSet[str], daily_cap_cents: Optional[int]):
+        self.percentages = percentages
+        self.excluded_merchants = excluded_merchants
+        self.daily_cap_cents = daily_cap_cents
+
+
+def compile_rules(user_settings: Mapping[str, Any]) -> CompiledRules:
+    """
+    Compile the donation_rules stored in user_settings into lookup tables
+
+    Categories without a rule use the user's flat auto_donation_percentage.
+
+    Args:
+        user_settings: The user's user_settings row
+
+    Returns:
+        CompiledRules for evaluate_rules
+    """
+    default_percentage = user_settings.get('auto_donation_percentage') or 0.0
+    rules = user_settings.get('donation_rules') or {}
+    if isinstance(rules, str):
+        rules = json.loads(rules)
+
+    percentages = np.full(OTHER_CATEGORY + 1, default_percentage, dtype=np.float64)
+    for category, percentage in (rules.get('category_percentages') or {}).items():
+        if category in CATEGORY_INDEX:
+            percentages[CATEGORY_INDEX[category]] = percentage
+
+    excluded_merchants = frozenset(normalize_merchants(rules.get('excluded_merchants') or []))
+
+    daily_cap = rules.get('daily_cap')
+    daily_cap_cents = int(to_cents([daily_cap])[0]) if daily_cap is not None else None
+
+    return CompiledRules(percentages, excluded_merchants, daily_cap_cents)
+
+
+def evaluate_rules(
+    rules: CompiledRules,
+    amounts: Sequence[float],
+    categories: np.ndarray,
+    merchants: Sequence[str],
+    dates: Sequence[str],
+    donated_cents_by_date: Optional[Mapping[str, int]] = None
+) -> np.ndarray:
+    """
+    Compute donation cents for a batch of one user's transactions
+
+    Percentages come from indexing the category table, exclusions from one hash
+    lookup per merchant and the daily cap from cumulative sums within each
+    date, so there is no per-row branching on the rules.
+
+    Args:
+        rules: The user's compiled rules
+        amounts: Transaction amounts in dollars; only positive amounts are donated on
+        categories: Category slots from category_codes
+        merchants: Merchant names from normalize_merchants
+        dates: Transaction dates (YYYY-MM-DD); the daily cap applies per date
+        donated_cents_by_date: Cents already donated per date, counted against the cap
+
+    Returns:
+        Donation cents per transaction, in input order
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    cents = to_cents(amounts * rules.percentages[categories])
+    cents[amounts <= 0] = 0
+    if rules.excluded_merchants:
+        excluded = np.fromiter(
+            (merchant in rules.excluded_merchants for merchant in merchants), dtype=bool, count=len(cents)
+        )
+        cents[excluded] = 0
+
+    if rules.daily_cap_cents is None or len(cents) == 0:
+        return cents
+
+    # Number the dates in order of first appearance
+    date_slots: Dict[str, int] = {}
+    date_codes = np.fromiter(
+        (date_slots.setdefault(date, len(date_slots)) for date in dates), dtype=np.intp, count=len(cents)
+    )
+    donated_cents_by_date = donated_cents_by_date or {}
+    already_donated = np.array([donated_cents_by_date.get(date, 0) for date in date_slots], dtype=np.int64)
+
+    # Running total within each date, in input order
+    order = np.argsort(date_codes, kind='stable')
+    sorted_codes = date_codes[order]
+    sorted_cents = cents[order]
+    running = np.cumsum(sorted_cents)
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(sorted_cents)]))
+    running_in_date = running - (running[group_start] - sorted_cents[group_start]) + already_donated[sorted_codes]
+
+    # Each transaction gets whatever room is left under the cap
+    cap = rules.daily_cap_cents
+    allowed = np.minimum(running_in_date, cap) - np.minimum(running_in_date - sorted_cents, cap)
+
+    capped = np.empty_like(cents)
+    capped[order] = np.maximum(allowed, 0)
+    return capped
+
+
+class DonationRulesCache:
+    """Compiled rules per user, recompiled only when the stored rules change"""
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: Dict[str, tuple] = {}
+
+    def get(self, user_id: str, user_settings: Mapping[str, Any]) -> CompiledRules:
+        """Get the user's compiled rules, compiling them if the settings changed"""
+        key = json.dumps(
+            [user_settings.get('auto_donation_percentage'), user_settings.get('donation_rules')],
+            sort_keys=True,
+            default=str
+        )
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        compiled = compile_rules(user_settings)
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[user_id] = (key, compiled)
+        return compiled
+
+
+# Global instance
+donation_rules_cache = DonationRulesCache()
@@ -0,0 +1,351 @@
+import json
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from config import settings
+from services.sqlite_db import SQLiteDatabase, local_db
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+DEAD = "dead"
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when retrying the job cannot succeed"""
+    pass
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _job(row) -> Dict[str, Any]:
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    return job
+
+
+class JobQueue:
+    """
+    Durable at-least-once job queue stored in the local SQLite database.
+
+    Jobs survive restarts: a job that was running when the process stopped is
+    queued again on startup. A running job holds a lease, kept in available_at
+    and renewed by its worker while the handler runs; once it expires any worker
+    claims the job again, so a job whose worker process died is not stuck until
+    the next restart. The attempt count fences each claim, so a worker that lost
+    its lease cannot overwrite the new claim's outcome. Failed jobs are retried
+    with exponential backoff and moved to the dead state once they run out of
+    attempts.
+    """
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+        self.worker_count = settings.JOB_WORKERS
+        self.max_attempts = settings.JOB_MAX_ATTEMPTS
+        self.retry_backoff_seconds = settings.JOB_RETRY_BACKOFF_SECONDS
+        self.poll_interval_seconds = settings.JOB_POLL_INTERVAL_SECONDS
+        self.lease_seconds = settings.JOB_LEASE_SECONDS
+        self._handlers: Dict[str, JobHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._draining = False
+        self._paused = False
+        self._schema_ready = False
+
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.reclaimed = 0
+        self.lost_leases = 0
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.db.ensure_schema(SCHEMA)
+            self._schema_ready = True
+
+    def register(self, kind: str, handler: JobHandler):
+        """Register the coroutine that processes jobs of a kind"""
+        self._handlers[kind] = handler
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Durably add a job to the queue
+
+        Args:
+            kind: The registered job kind
+            payload: JSON-serializable job arguments
+            dedupe_key: Optional key; enqueueing the same key again returns the existing
+                job unless it is dead, in which case it is queued again
+
+        Returns:
+            The job
+        """
+        self._ensure_schema()
+        now = _now()
+        with self.db.transaction() as connection:
+            row = None
+            if dedupe_key is not None:
+                row = connection.execute("SELECT * FROM jobs WHERE dedupe_key = ?", (dedupe_key,)).fetchone()
+
+            if row is None:
+                job_id = f"job_{uuid.uuid4().hex}"
+                connection.execute(
+                    """
+                    INSERT INTO jobs (job_id, kind, dedupe_key, payload, status, max_attempts, available_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (job_id, kind, dedupe_key, json.dumps(payload), QUEUED, self.max_attempts, time.time(), now, now)
+                )
+            elif row['status'] == DEAD:
+                job_id = row['job_id']
+                connection.execute(
+                    """
+                    UPDATE jobs SET status = ?, attempts = 0, payload = ?, available_at = ?, error = NULL, updated_at = ?
+                    WHERE job_id = ?
+                    """,
+                    (QUEUED, json.dumps(payload), time.time(), now, job_id)
+                )
+            else:
+                return _job(row)
+
+            row = connection.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+        return _job(row)
+
+    async def submit(self, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> Dict[str, Any]:
+        """Enqueue a job from the event loop and wake an idle worker"""
+        job = await asyncio.to_thread(self.enqueue, kind, payload, dedupe_key)
+        if self._wakeup is not None and job['status'] == QUEUED:
+            self._wakeup.set()
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by ID"""
+        self._ensure_schema()
+        rows = self.db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,))
+        return _job(rows[0]) if rows else None
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically take the oldest available job and lease it
+
+        A queued job is available once its retry is due, a running job once its
+        lease has expired. A reclaimed job that has no attempts left is marked
+        dead instead of run again.
+        """
+        while True:
+            with self.db.transaction() as connection:
+                now = time.time()
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status IN (?, ?) AND available_at <= ? ORDER BY available_at LIMIT 1",
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    return None
+
+                if row['status'] == RUNNING:
+                    self.reclaimed += 1
+                    logger.warning("Reclaiming job %s (%s) after its lease expired", row['job_id'], row['kind'])
+                    if row['attempts'] >= row['max_attempts']:
+                        connection.execute(
+                            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                            (DEAD, "Lease expired on the last attempt", _now(), row['job_id'])
+                        )
+                        self.dead += 1
+                        continue
+
+                connection.execute(
+                    "UPDATE jobs SET status = ?, attempts = attempts + 1, available_at = ?, updated_at = ? WHERE job_id = ?",
+                    (RUNNING, now + self.lease_seconds, _now(), row['job_id'])
+                )
+            job = _job(row)
+            job['attempts'] += 1
+            return job
+
+    def _renew(self, job: Dict[str, Any]) -> bool:
+        """Extend a running job's lease; False if another worker has reclaimed it"""
+        with self.db.transaction() as connection:
+            return connection.execute(
+                "UPDATE jobs SET available_at = ? WHERE job_id = ? AND status = ? AND attempts = ?",
+                (time.time() + self.lease_seconds, job['job_id'], RUNNING, job['attempts'])
+            ).rowcount == 1
+
+    def _succeed(self, job: Dict[str, Any], result: Any) -> bool:
+        with self.db.transaction() as connection:
+            return connection.execute(
+                """
+                UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ?
+                WHERE job_id = ? AND status = ? AND attempts = ?
+                """,
+                (SUCCEEDED, json.dumps(result, default=str), _now(), job['job_id'], RUNNING, job['attempts'])
+            ).rowcount == 1
+
+    def _fail(self, job: Dict[str, Any], error: str, permanent: bool) -> Optional[str]:
+        """Schedule a retry with exponential backoff, or dead-letter the job; None if the lease was lost"""
+        if permanent or job['attempts'] >= job['max_attempts']:
+            status, available_at = DEAD, job['available_at']
+        else:
+            status = QUEUED
+            available_at = time.time() + self.retry_backoff_seconds * 2 ** (job['attempts'] - 1)
+        with self.db.transaction() as connection:
+            updated = connection.execute(
+                """
+                UPDATE jobs SET status = ?, available_at = ?, error = ?, updated_at = ?
+                WHERE job_id = ? AND status = ? AND attempts = ?
+                """,
+                (status, available_at, error, _now(), job['job_id'], RUNNING, job['attempts'])
+            ).rowcount
+        return status if updated else None
+
+    def recover(self) -> int:
+        """
+        Queue jobs that were running when the process last stopped
+
+        Returns:
+            Number of jobs queued again
+        """
+        self._ensure_schema()
+        with self.db.transaction() as connection:
+            # available_at holds a running job's lease expiry; make the job claimable now
+            recovered = connection.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, updated_at = ? WHERE status = ?",
+                (QUEUED, time.time(), _now(), RUNNING)
+            ).rowcount
+        if recovered:
+            logger.warning("Re-queued %s jobs interrupted by the last shutdown", recovered)
+        return recovered
+
+    async def start(self, recover: bool = True):
+        """Recover interrupted jobs (unless another process already did) and start the worker tasks"""
+        if recover:
+            await asyncio.to_thread(self.recover)
+        self._wakeup = asyncio.Event()
+        self._draining = False
+        self._paused = False
+        for index in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+        logger.info("Started %s job workers", self.worker_count)
+
+    async def stop(self, timeout: float = 10.0):
+        """Finish jobs that are available now, for up to timeout seconds, then stop the workers"""
+        if not self._workers:
+            return
+        self._draining = True
+        self._wakeup.set()
+        done, pending = await asyncio.wait(self._workers, timeout=timeout)
+        if pending:
+            logger.warning("Stopping %s job workers mid-job, their jobs will run again on restart", len(pending))
+            for worker in pending:
+                worker.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._workers = []
+
+    def pause(self):
+        """Stop claiming jobs; running jobs finish and queued ones wait for the next start"""
+        self._paused = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker(self, index: int):
+        while not self._paused:
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                if self._draining:
+                    return
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(index, job)
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        """Renew a running job's lease until the job finishes or the lease is lost"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self._renew, job):
+                logger.warning("Lost the lease on job %s (%s), another worker has claimed it", job['job_id'], job['kind'])
+                return
+
+    async def _run(self, index: int, job: Dict[str, Any]):
+        handler = self._handlers.get(job['kind'])
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler registered for job kind {job['kind']}")
+            with tracer.start_trace(f"job {job['kind']}", job_id=job['job_id'], attempt=job['attempts']):
+                result = await handler(job['payload'])
+        except Exception as e:
+            permanent = isinstance(e, PermanentJobError)
+            status = await asyncio.to_thread(self._fail, job, str(e), permanent)
+            if status is None:
+                self.lost_leases += 1
+                logger.warning("Job %s (%s) failed after its lease was lost: %s", job['job_id'], job['kind'], e)
+            elif status == DEAD:
+                self.dead += 1
+                logger.error("Job %s (%s) dead after %s attempts: %s", job['job_id'], job['kind'], job['attempts'], e)
+            else:
+                self.retried += 1
+                logger.warning("Job worker %s will retry %s (%s) after error: %s", index, job['job_id'], job['kind'], e)
+            return
+        finally:
+            heartbeat.cancel()
+
+        if await asyncio.to_thread(self._succeed, job, result):
+            self.succeeded += 1
+        else:
+            self.lost_leases += 1
+            logger.warning("Job %s (%s) finished after its lease was lost, result not recorded", job['job_id'], job['kind'])
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth by status and worker metrics"""
+        self._ensure_schema()
+        counts = {row['status']: row['jobs'] for row in self.db.execute(
+            "SELECT status, COUNT(*) AS jobs FROM jobs GROUP BY status"
+        )}
+        return {
+            "workers": len(self._workers),
+            "queued": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "succeeded": counts.get(SUCCEEDED, 0),
+            "dead": counts.get(DEAD, 0),
+            "succeeded_since_start": self.succeeded,
+            "retried_since_start": self.retried,
+            "dead_since_start": self.dead,
+            "reclaimed_since_start": self.reclaimed,
+            "lost_leases_since_start": self.lost_leases
+        }
+
+
+# Global instance
+job_queue = JobQueue(local_db)
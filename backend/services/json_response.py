@@ -0,0 +1,52 @@
+import sys
+from decimal import Decimal
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# datetimes, dates, UUIDs, dataclasses and numpy values are handled natively by orjson
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """Encode the types orjson does not know about"""
+    # Plaid models can only exist once the SDK has been imported, so look it up
+    # rather than importing it here and loading the SDK at startup
+    model_utils = sys.modules.get("plaid.model_utils")
+    if model_utils is not None:
+        if isinstance(value, model_utils.ModelNormal):
+            # A Plaid model's fields live in _data_store, keyed the same way as to_dict();
+            # nested models come back through here, so nothing is copied up front
+            return value._data_store
+        if isinstance(value, model_utils.ModelSimple):
+            return value.value
+        if isinstance(value, model_utils.ModelComposed):
+            return value.to_dict()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, Exception):
+        # Validation error contexts can carry the exception a validator raised
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize content to JSON bytes"""
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response serialized with orjson.
+
+    Accepts Plaid models, Decimals and datetimes directly, so routes can return
+    SDK responses without converting them with to_dict() first.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,27 @@
+import sys
+import importlib.util
+from types import ModuleType
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Import a module whose body only runs on first attribute access
+
+    Used for SDKs that are slow to import and only needed by some requests,
+    e.g. `plaid = lazy_import("plaid")` keeps `except plaid.ApiException`
+    working without loading the Plaid model tree at startup. Returns the
+    real module if it has already been imported.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
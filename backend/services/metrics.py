@@ -0,0 +1,246 @@
+import os
+import time
+import asyncio
+import inspect
+import logging
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upstream latencies span fast Supabase reads to slow Pledge.to donations
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+HTTP_REQUESTS = Counter(
+    "buy4good_http_requests_total",
+    "HTTP requests by route template, method and status",
+    ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "buy4good_http_request_duration_seconds",
+    "HTTP request latency by route template, method and status",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+# Under the supervisor, in-flight gauges are summed over the workers that are alive
+HTTP_IN_FLIGHT = Gauge(
+    "buy4good_http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum"
+)
+UPSTREAM_LATENCY = Histogram(
+    "buy4good_upstream_request_duration_seconds",
+    "Calls to Pledge.to, Plaid and Supabase by operation and outcome",
+    ["dependency", "operation", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+UPSTREAM_IN_FLIGHT = Gauge(
+    "buy4good_upstream_requests_in_flight",
+    "Upstream calls currently in progress",
+    ["dependency"],
+    multiprocess_mode="livesum"
+)
+LOOP_LAG = Histogram(
+    "buy4good_event_loop_lag_seconds",
+    "How late the event loop woke a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+
+def instrument(
+    target: Any,
+    dependency: str,
+    methods: Optional[Iterable[str]] = None,
+    operation: Optional[Callable[[str, Tuple[Any, ...]], str]] = None
+):
+    """
+    Time every coroutine method of a client instance
+
+    Wraps the bound methods on the instance itself, so every module that
+    imported the shared client is covered without changes.
+
+    Args:
+        target: The client instance (e.g. pledge_client)
+        dependency: Label for the upstream service
+        methods: Method names to wrap; defaults to every public coroutine method
+        operation: Maps (method name, args) to the operation label; defaults to the method name
+    """
+    if methods is None:
+        methods = [
+            name for name, _ in inspect.getmembers(type(target), inspect.iscoroutinefunction)
+            if not name.startswith("_")
+        ]
+    in_flight = UPSTREAM_IN_FLIGHT.labels(dependency)
+    children: Dict[Tuple[str, str], Any] = {}
+
+    def observe(name: str, outcome: str, seconds: float):
+        child = children.get((name, outcome))
+        if child is None:
+            child = children[(name, outcome)] = UPSTREAM_LATENCY.labels(dependency, name, outcome)
+        child.observe(seconds)
+
+    def wrap(name: str, method: Callable) -> Callable:
+        @wraps(method)
+        async def timed(*args, **kwargs):
+            label = operation(name, args) if operation else name
+            in_flight.inc()
+            started = time.perf_counter()
+            try:
+                result = await method(*args, **kwargs)
+            except Exception:
+                observe(label, "error", time.perf_counter() - started)
+                raise
+            finally:
+                in_flight.dec()
+            observe(label, "success", time.perf_counter() - started)
+            return result
+        return timed
+
+    for name in methods:
+        setattr(target, name, wrap(name, getattr(target, name)))
+
+
+class StatsCollector:
+    """
+    Exposes the numeric fields of each service's stats() as gauges.
+
+    Values are read at scrape time, so the services keep their plain counters
+    and nothing is recorded twice.
+    """
+
+    def __init__(self):
+        self._sources: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+
+    def add(self, component: str, stats: Callable[[], Dict[str, Any]]):
+        self._sources.append((component, stats))
+
+    def describe(self):
+        # Metric names depend on what stats() returns; skip the collect() the registry would do on register
+        return []
+
+    def collect(self):
+        for component, stats in self._sources:
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning("Could not collect %s stats: %s", component, e)
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)):
+                    yield GaugeMetricFamily(
+                        f"buy4good_{component}_{key}",
+                        f"{key.replace('_', ' ')} from {component}.stats()",
+                        value=float(value)
+                    )
+
+
+class LoopLagMonitor:
+    """Samples event-loop lag by timing how late a short sleep wakes up"""
+
+    def __init__(self, interval: float = settings.METRICS_LOOP_LAG_INTERVAL_SECONDS):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - expected))
+
+
+def multiprocess_enabled() -> bool:
+    """Whether metrics are written to PROMETHEUS_MULTIPROC_DIR for the supervisor's workers"""
+    return bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+
+def scrape_registry() -> CollectorRegistry:
+    """
+    The registry /metrics exposes
+
+    Under the supervisor every worker writes its counters, histograms and
+    gauges to files in PROMETHEUS_MULTIPROC_DIR, and a scrape merges them, so
+    any worker reports the whole server. The stats() gauges are read from the
+    worker that serves the scrape.
+    """
+    global _scrape_registry
+    if not multiprocess_enabled():
+        return REGISTRY
+    if _scrape_registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(stats_collector)
+        _scrape_registry = registry
+    return _scrape_registry
+
+
+def mark_worker_dead(pid: int):
+    """Drop an exited worker's live gauges from the merged metrics; its counters are kept"""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
+
+
+def instrument_app():
+    """Wrap the upstream clients and register service stats; safe to call more than once"""
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+
+    from services.pledge_client import pledge_client
+    from services.supabase_client import supabase_service
+    from services.plaid_client import plaid_client
+    from services.balance_cache import balance_cache
+    from services.donation_dedupe import donation_dedupe
+    from services.donation_reconciler import donation_reconciler
+    from services.purchase_donations import purchase_donation_service
+    from services.job_queue import job_queue
+    from services.webhook_queue import webhook_queue
+    from services.shared_cache import shared_cache
+    from services.shutdown import shutdown_coordinator
+    from services.tracing import tracer
+    from middleware.rate_limit import rate_limit_store
+    import logging_config
+
+    instrument(pledge_client, "pledge")
+    instrument(supabase_service, "supabase")
+    # Every Plaid request goes through call(); label it with the PlaidApi operation
+    instrument(plaid_client, "plaid", methods=["call"], operation=lambda name, args: args[0])
+
+    stats_collector.add("plaid_executor", plaid_client.stats)
+    stats_collector.add("balance_cache", balance_cache.stats)
+    stats_collector.add("donation_dedupe", donation_dedupe.stats)
+    stats_collector.add("donation_reconciler", donation_reconciler.stats)
+    stats_collector.add("purchase_donations", purchase_donation_service.stats)
+    stats_collector.add("job_queue", job_queue.stats)
+    stats_collector.add("webhook_queue", webhook_queue.stats)
+    stats_collector.add("shared_cache", shared_cache.stats)
+    stats_collector.add("shutdown", shutdown_coordinator.stats)
+    stats_collector.add("rate_limit", rate_limit_store.stats)
+    stats_collector.add("tracing", tracer.stats)
+    stats_collector.add("logging", logging_config.stats)
+    REGISTRY.register(stats_collector)
+
+
+_instrumented = False
+_scrape_registry: Optional[CollectorRegistry] = None
+
+# Global instances
+stats_collector = StatsCollector()
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from config import settings
+
+if TYPE_CHECKING:
+    from plaid.api import plaid_api
+
+logger = logging.getLogger(__name__)
+
+
+class PlaidBulkheadFullError(Exception):
+    """Raised when the Plaid executor cannot accept more work"""
+    pass
+
+
+class PlaidClient:
+    """
+    Runs blocking Plaid SDK calls on a dedicated, bounded thread pool.
+
+    The pool acts as a bulkhead: at most PLAID_MAX_WORKERS calls run at once and at
+    most PLAID_MAX_QUEUE callers wait for a slot (each for up to PLAID_QUEUE_TIMEOUT
+    seconds). Anything beyond that is rejected immediately, so a slow Plaid cannot
+    tie up the event loop or the default executor used by the rest of the API.
+    """
+
+    def __init__(self):
+        self.max_workers = settings.PLAID_MAX_WORKERS
+        self.max_queue = settings.PLAID_MAX_QUEUE
+        self.queue_timeout = settings.PLAID_QUEUE_TIMEOUT
+
+        self._api: Optional["plaid_api.PlaidApi"] = None
+        self._api_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Saturation metrics
+        self._in_flight = 0
+        self._waiting = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    @property
+    def api(self) -> "plaid_api.PlaidApi":
+        """
+        Get the shared Plaid API client, creating it on first use
+
+        The SDK itself is imported here rather than at module level; loading
+        its model tree is the slowest part of starting the app.
+        """
+        if self._api is None:
+            with self._api_lock:
+                if self._api is None:
+                    import plaid
+                    from plaid.api import plaid_api
+                    configuration = plaid.Configuration(
+                        host=settings.PLAID_HOST or (
+                            plaid.Environment.Sandbox if os.getenv('PLAID_ENV') == 'sandbox' else plaid.Environment.Production
+                        ),
+                        api_key={
+                            'clientId': os.getenv('PLAID_CLIENT_ID'),
+                            'secret': os.getenv('PLAID_SECRET'),
+                        }
+                    )
+                    api_client = plaid.ApiClient(configuration)
+                    self._api = plaid_api.PlaidApi(api_client)
+        return self._api
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="plaid"
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+        return self._semaphore
+
+    async def call(self, operation: str, request: Any) -> Any:
+        """
+        Run a Plaid API operation on the Plaid executor
+
+        Args:
+            operation: Name of the PlaidApi method (e.g. "transactions_get")
+            request: The request object or dict passed to that method
+
+        Returns:
+            The Plaid API response
+
+        Raises:
+            PlaidBulkheadFullError: If the queue is full or the queue timeout expires
+            plaid.ApiException: If the Plaid API request fails
+        """
+        semaphore = self._get_semaphore()
+
+        if self._in_flight + self._waiting >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            logger.warning("Plaid executor saturated, rejecting %s", operation)
+            raise PlaidBulkheadFullError("Plaid executor queue is full")
+
+        queued_at = time.monotonic()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._timed_out += 1
+            logger.warning("Timed out waiting %ss for a Plaid executor slot for %s", self.queue_timeout, operation)
+            raise PlaidBulkheadFullError("Timed out waiting for Plaid executor")
+        else:
+            self._in_flight += 1
+        finally:
+            self._waiting -= 1
+
+        wait_seconds = time.monotonic() - queued_at
+        self._total_wait_seconds += wait_seconds
+        self._max_wait_seconds = max(self._max_wait_seconds, wait_seconds)
+
+        try:
+            method = getattr(self.api, operation)
+            future = asyncio.get_running_loop().run_in_executor(self._get_executor(), partial(method, request))
+        except BaseException:
+            self._failed += 1
+            self._in_flight -= 1
+            semaphore.release()
+            raise
+
+        # The slot is held until the executor thread finishes, not until the caller
+        # stops waiting; a cancelled caller must not let more calls into the pool
+        future.add_done_callback(partial(self._release, semaphore))
+        return await asyncio.shield(future)
+
+    def _release(self, semaphore: asyncio.Semaphore, future: asyncio.Future):
+        """Free the executor slot once the Plaid call has actually finished"""
+        self._in_flight -= 1
+        semaphore.release()
+        # Retrieving the exception also keeps an abandoned call's error from being reported as unretrieved
+        if future.cancelled() or future.exception() is not None:
+            self._failed += 1
+        else:
+            self._completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get saturation metrics for the Plaid executor"""
+        started = self._completed + self._failed
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self._in_flight,
+            "waiting": self._waiting,
+            "utilization": self._in_flight / self.max_workers if self.max_workers else 0.0,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "avg_wait_seconds": self._total_wait_seconds / started if started else 0.0,
+            "max_wait_seconds": self._max_wait_seconds
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Shut down the Plaid executor, then close the API client's connection pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        if self._api is not None:
+            api_client = self._api.api_client
+            api_client.close()
+            api_client.rest_client.pool_manager.clear()
+            self._api = None
+
+
+# Global client instance
+plaid_client = PlaidClient()
@@ -0,0 +1,90 @@
+import json
+import time
+import hmac
+import hashlib
+import logging
+from typing import Any, Dict
+from services.plaid_client import plaid_client
+from services.lazy import lazy_import
+
+logger = logging.getLogger(__name__)
+
+# PyJWT and its crypto backend are only needed once a Plaid webhook arrives
+jwt = lazy_import("jwt")
+
+# Plaid signs webhooks with ES256 and expects receivers to reject anything older than 5 minutes
+MAX_WEBHOOK_AGE_SECONDS = 5 * 60
+
+
+class WebhookVerificationError(Exception):
+    """Raised when a webhook's Plaid-Verification signature is missing or invalid"""
+    pass
+
+
+class PlaidWebhookVerifier:
+    """Verifies the Plaid-Verification JWT sent with every Plaid webhook"""
+
+    def __init__(self):
+        self._keys: Dict[str, Dict[str, Any]] = {}
+
+    async def _get_key(self, key_id: str) -> Dict[str, Any]:
+        """Get a webhook verification JWK, fetching it from Plaid on first use"""
+        key = self._keys.get(key_id)
+        if key is None:
+            from plaid.model.webhook_verification_key_get_request import WebhookVerificationKeyGetRequest
+
+            response = await plaid_client.call(
+                "webhook_verification_key_get",
+                WebhookVerificationKeyGetRequest(key_id=key_id)
+            )
+            key = response['key'].to_dict()
+            self._keys[key_id] = key
+        return key
+
+    async def verify(self, body: bytes, token: str) -> Dict[str, Any]:
+        """
+        Verify a webhook body against its Plaid-Verification header
+
+        Args:
+            body: The raw request body
+            token: The Plaid-Verification header value
+
+        Returns:
+            The verified JWT claims
+
+        Raises:
+            WebhookVerificationError: If the signature, age or body hash do not match
+        """
+        if not token:
+            raise WebhookVerificationError("Missing Plaid-Verification header")
+
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as e:
+            raise WebhookVerificationError(f"Malformed verification token: {e}")
+
+        if header.get('alg') != 'ES256' or not header.get('kid'):
+            raise WebhookVerificationError("Unexpected verification token algorithm")
+
+        key = await self._get_key(header['kid'])
+        if key.get('expired_at'):
+            raise WebhookVerificationError("Verification key has expired")
+
+        try:
+            public_key = jwt.algorithms.ECAlgorithm.from_jwk(json.dumps(key))
+            claims = jwt.decode(token, public_key, algorithms=['ES256'], options={"verify_aud": False})
+        except jwt.PyJWTError as e:
+            raise WebhookVerificationError(f"Invalid webhook signature: {e}")
+
+        if time.time() - claims.get('iat', 0) > MAX_WEBHOOK_AGE_SECONDS:
+            raise WebhookVerificationError("Webhook is too old")
+
+        body_hash = hashlib.sha256(body).hexdigest()
+        if not hmac.compare_digest(body_hash, claims.get('request_body_sha256', '')):
+            raise WebhookVerificationError("Webhook body does not match signature")
+
+        return claims
+
+
+# Global instance
+plaid_webhook_verifier = PlaidWebhookVerifier()
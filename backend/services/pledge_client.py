@@ -3,6 +3,7 @@ import json
 from typing import Dict, Any, Optional
 from config import settings
 from models import DonationRequest
+from services.tracing import tracer
 
 
 class PledgeToClient:
@@ -14,24 +15,32 @@ class PledgeToClient:
     
     def _get_donation_headers(self) -> Dict[str, str]:
         """Get headers for donation operations (uses sandbox API key if enabled)"""
-        return {
+        return self._with_trace_context({
             "Content-Type": "application/json",
             "Authorization": f"Bearer {settings.donation_api_key}"
-        }
+        })
     
     def _get_organization_headers(self) -> Dict[str, str]:
         """Get headers for organization operations (always uses production API key)"""
-        return {
+        return self._with_trace_context({
             "Content-Type": "application/json",
             "Authorization": f"Bearer {settings.organization_api_key}"
-        }
+        })
     
-    async def create_donation(self, donation_data: DonationRequest) -> Dict[str, Any]:
+    def _with_trace_context(self, headers: Dict[str, str]) -> Dict[str, str]:
+        """Propagate the active trace to Pledge.to"""
+        traceparent = tracer.traceparent()
+        if traceparent:
+            headers["traceparent"] = traceparent
+        return headers
+    
+    async def create_donation(self, donation_data: DonationRequest, idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Create a donation through Pledge.to API (using sandbox if configured)
         
         Args:
             donation_data: The donation request data
+            idempotency_key: Optional key; Pledge.to creates at most one donation per key
             
         Returns:
             Dictionary containing the API response
@@ -54,11 +63,15 @@ class PledgeToClient:
         if donation_data.metadata:
             payload["metadata"] = donation_data.metadata
         
+        headers = self._get_donation_headers()
+        if idempotency_key:
+            headers["Idempotency-Key"] = idempotency_key
+        
         # Use requests instead of httpx
         response = requests.post(
             f"{settings.donation_base_url}/v1/donations",
             json=payload,
-            headers=self._get_donation_headers(),
+            headers=headers,
             timeout=30.0
         )
         
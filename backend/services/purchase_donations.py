@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from typing import Any, Dict, List
+from models import AutoDonateRequest
+from services.supabase_client import supabase_service
+from services.transaction_store import transaction_store
+from services.auto_donation import auto_donation_service
+from services.donation_ledger import donation_ledger
+from services.donation_reconciler import donation_reconciler
+from services.donation_rules import category_codes, donation_rules_cache, evaluate_rules, normalize_merchants
+
+logger = logging.getLogger(__name__)
+
+AUTO_DONATE_BATCH_SIZE = 1000
+
+
+class PurchaseDonationService:
+    """
+    Creates auto-donations for purchases synced from Plaid.
+
+    Every transactions/sync, whether a webhook or the dashboard triggered it,
+    lists the transactions it added and removed in the local store. process()
+    works through those lists rather than the sync's delta, so a purchase is
+    reconciled and evaluated whichever caller fetched it, and one that fails
+    stays listed for the next sync.
+    """
+
+    def __init__(self):
+        self.evaluated = 0
+        self.donations_created = 0
+
+    async def process(self, user_id: str) -> int:
+        """
+        Reconcile and donate on a user's synced transactions that have not been evaluated yet
+
+        Args:
+            user_id: The user whose transactions were synced
+
+        Returns:
+            Number of donations created
+        """
+        transactions = await asyncio.to_thread(transaction_store.get_transactions_to_donate, user_id)
+        removed = await asyncio.to_thread(transaction_store.get_removed_transaction_ids, user_id)
+        if not transactions and not removed:
+            return 0
+
+        # Move donations from pending transactions that posted before donating on what is left
+        remaining = await donation_reconciler.reconcile(user_id, transactions, removed)
+        if not remaining:
+            created = 0
+        else:
+            linked_at = await asyncio.to_thread(transaction_store.get_linked_at, user_id)
+            if linked_at:
+                created = await self.evaluate_auto_donations(user_id, linked_at, remaining)
+            else:
+                # Without a link time the initial historical pull cannot be told apart from new purchases
+                logger.warning("No linked item recorded for user %s, not donating on %s synced transactions", user_id, len(remaining))
+                created = 0
+
+        await asyncio.to_thread(
+            transaction_store.mark_donations_evaluated,
+            user_id,
+            [transaction['transaction_id'] for transaction in transactions],
+            removed
+        )
+        self.evaluated += len(transactions)
+        self.donations_created += created
+        return created
+
+    async def evaluate_auto_donations(self, user_id: str, linked_at: str, transactions: List[Dict[str, Any]]) -> int:
+        """
+        Apply a user's auto-donation settings to newly synced transactions
+
+        Only purchases (positive amounts) made since the item was linked are
+        donated on, so the initial historical pull does not trigger donations.
+        The percentage comes from the user's donation rules, falling back to
+        auto_donation_percentage for categories without a rule.
+
+        Returns:
+            Number of donations created
+        """
+        user_settings = await supabase_service.get_user_settings(user_id)
+        if not user_settings.get('auto_donate_enabled'):
+            return 0
+
+        linked_date = linked_at[:10]
+        purchases = [
+            transaction for transaction in transactions
+            if transaction['amount'] > 0 and str(transaction['date']) >= linked_date
+        ]
+        if not purchases:
+            return 0
+
+        # Apply the user's category rules, exclusions and daily cap to the whole batch at once
+        rules = donation_rules_cache.get(user_id, user_settings)
+        dates = [str(transaction['date']) for transaction in purchases]
+        donated_cents_by_date = None
+        if rules.daily_cap_cents is not None:
+            donated_cents_by_date = await asyncio.to_thread(
+                donation_ledger.donated_cents_by_date, user_id, sorted(set(dates))
+            )
+        donation_cents = evaluate_rules(
+            rules,
+            [transaction['amount'] for transaction in purchases],
+            category_codes((transaction.get('personal_finance_category') or {}).get('primary') for transaction in purchases),
+            normalize_merchants(transaction.get('merchant_name') or transaction.get('name') for transaction in purchases),
+            dates,
+            donated_cents_by_date
+        )
+
+        requests = [
+            AutoDonateRequest(
+                user_id=user_id,
+                transaction_amount=transaction['amount'],
+                original_transaction_id=transaction['transaction_id'],
+                # Effective percentage after rules, so the batch reproduces these exact cents
+                donation_percentage=int(cents) / 100 / transaction['amount'],
+                date=str(transaction['date']),
+                merchant_name=transaction.get('merchant_name') or transaction.get('name'),
+                merchant_logo=transaction.get('logo_url')
+            )
+            for transaction, cents in zip(purchases, donation_cents)
+            if cents > 0
+        ]
+
+        for offset in range(0, len(requests), AUTO_DONATE_BATCH_SIZE):
+            result = await auto_donation_service.create_auto_donations_batch(requests[offset:offset + AUTO_DONATE_BATCH_SIZE])
+            if not result['success']:
+                # Leave the transactions listed so the next sync tries them again
+                raise RuntimeError(f"Failed to store auto-donations for user {user_id}")
+
+        if requests:
+            logger.info("Created %s auto-donations for user %s from synced transactions", len(requests), user_id)
+        return len(requests)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get evaluation counts since startup"""
+        return {
+            "evaluated": self.evaluated,
+            "donations_created": self.donations_created
+        }
+
+
+# Global instance
+purchase_donation_service = PurchaseDonationService()
@@ -0,0 +1,193 @@
+import os
+import math
+import time
+import random
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+from services.plaid_client import plaid_client
+from services.transaction_store import transaction_store
+
+logger = logging.getLogger(__name__)
+
+# (merchant, Plaid personal_finance_category primary, relative frequency, median amount, spread)
+# Amounts are log-normal around the median, so most purchases are small with a long tail.
+MERCHANT_CATALOG = [
+    ("Starbucks", "FOOD_AND_DRINK", 14, 6.50, 0.35),
+    ("McDonald's", "FOOD_AND_DRINK", 9, 9.75, 0.40),
+    ("Chipotle", "FOOD_AND_DRINK", 7, 13.20, 0.30),
+    ("DoorDash", "FOOD_AND_DRINK", 6, 32.00, 0.45),
+    ("Whole Foods Market", "FOOD_AND_DRINK", 8, 64.00, 0.60),
+    ("Trader Joe's", "FOOD_AND_DRINK", 6, 48.00, 0.55),
+    ("Amazon", "GENERAL_MERCHANDISE", 12, 34.00, 0.90),
+    ("Target", "GENERAL_MERCHANDISE", 7, 42.00, 0.70),
+    ("Walmart", "GENERAL_MERCHANDISE", 6, 51.00, 0.70),
+    ("Nike", "GENERAL_MERCHANDISE", 2, 95.00, 0.50),
+    ("Uber", "TRANSPORTATION", 6, 18.00, 0.50),
+    ("Lyft", "TRANSPORTATION", 3, 16.00, 0.50),
+    ("Shell", "TRANSPORTATION", 5, 42.00, 0.35),
+    ("Delta Air Lines", "TRAVEL", 1, 320.00, 0.55),
+    ("Airbnb", "TRAVEL", 1, 260.00, 0.65),
+    ("Marriott", "TRAVEL", 1, 210.00, 0.45),
+    ("Netflix", "ENTERTAINMENT", 2, 15.49, 0.05),
+    ("Spotify", "ENTERTAINMENT", 2, 10.99, 0.05),
+    ("AMC Theatres", "ENTERTAINMENT", 2, 24.00, 0.40),
+    ("CVS Pharmacy", "MEDICAL", 4, 21.00, 0.70),
+    ("Walgreens", "MEDICAL", 3, 18.00, 0.70),
+    ("Sephora", "PERSONAL_CARE", 2, 45.00, 0.55),
+    ("Planet Fitness", "PERSONAL_CARE", 1, 24.99, 0.05),
+    ("The Home Depot", "HOME_IMPROVEMENT", 3, 68.00, 0.80),
+    ("Comcast", "RENT_AND_UTILITIES", 1, 89.00, 0.10),
+]
+
+# Plaid sandbox accepts at most 10 transactions per sandbox_transactions_create call,
+# dated within the last 14 days
+PLAID_SANDBOX_BATCH_SIZE = 10
+PLAID_SANDBOX_MAX_AGE_DAYS = 14
+PLAID_SANDBOX_CONCURRENCY = 4
+
+
+def generate_transactions(
+    user_id: str,
+    count: int,
+    seed: int,
+    start_date: date,
+    end_date: date,
+    account_id: str = "synthetic_account"
+) -> List[Dict[str, Any]]:
+    """
+    Generate synthetic purchases with realistic merchant, category and amount mixes
+
+    The same user, seed, count and date range always produce the same
+    transactions. Transaction IDs include the user, since the store keys
+    transactions by ID alone.
+
+    Returns:
+        List of transaction dictionaries shaped like Plaid transactions
+    """
+    rng = random.Random(seed)
+    weights = [merchant[2] for merchant in MERCHANT_CATALOG]
+    merchants = rng.choices(MERCHANT_CATALOG, weights=weights, k=count)
+    span_days = (end_date - start_date).days
+
+    transactions = []
+    for index, (merchant_name, category, _, median, spread) in enumerate(merchants):
+        amount = max(0.5, round(rng.lognormvariate(math.log(median), spread), 2))
+        transaction_date = start_date + timedelta(days=rng.randint(0, span_days))
+        transactions.append({
+            'transaction_id': f"synthetic_{user_id}_{seed}_{index}",
+            'account_id': account_id,
+            'amount': amount,
+            'date': transaction_date.isoformat(),
+            'name': merchant_name,
+            'merchant_name': merchant_name,
+            'pending': False,
+            'pending_transaction_id': None,
+            'iso_currency_code': "USD",
+            'personal_finance_category': {'primary': category}
+        })
+    return transactions
+
+
+class SandboxGenerator:
+    """Builds large synthetic transaction datasets for load and soak testing"""
+
+    async def generate(
+        self,
+        user_id: str,
+        count: int,
+        seed: int = 0,
+        target: str = "local",
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        access_token: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate transactions and load them into the local store or Plaid sandbox
+
+        Args:
+            user_id: The user the transactions belong to
+            count: Number of transactions to generate
+            seed: Random seed, for reproducible datasets
+            target: "local" to write the local transaction store, "plaid" for Plaid sandbox
+            start_date: First date to generate (defaults to 90 days ago, 14 for Plaid)
+            end_date: Last date to generate (defaults to today)
+            access_token: Plaid access token, required for the "plaid" target
+
+        Returns:
+            Summary of what was generated
+
+        Raises:
+            PermissionError: Unless PLAID_ENV is sandbox
+        """
+        # Synthetic rows land in the same store that donations are evaluated and recomputed from
+        if os.getenv('PLAID_ENV') != 'sandbox':
+            raise PermissionError("Synthetic transactions can only be generated when PLAID_ENV is sandbox")
+
+        started = time.perf_counter()
+        today = date.today()
+        end = date.fromisoformat(end_date) if end_date else today
+        default_days = PLAID_SANDBOX_MAX_AGE_DAYS if target == "plaid" else 90
+        start = date.fromisoformat(start_date) if start_date else end - timedelta(days=default_days)
+
+        if start > end:
+            raise ValueError("start_date must not be after end_date")
+
+        if target == "plaid":
+            if not access_token:
+                raise ValueError("An access token is required for the plaid target")
+            # Plaid sandbox rejects anything older than 14 days or in the future
+            end = min(end, today)
+            start = max(start, today - timedelta(days=PLAID_SANDBOX_MAX_AGE_DAYS))
+
+        transactions = generate_transactions(user_id, count, seed, start, end)
+
+        if target == "local":
+            await asyncio.to_thread(transaction_store.insert_transactions, user_id, transactions)
+        elif target == "plaid":
+            await self._create_in_plaid(access_token, transactions)
+        else:
+            raise ValueError(f"Unknown target: {target}")
+
+        elapsed = time.perf_counter() - started
+        logger.info("Generated %s %s sandbox transactions for user %s in %.2fs", count, target, user_id, elapsed)
+
+        return {
+            "user_id": user_id,
+            "target": target,
+            "seed": seed,
+            "count": len(transactions),
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "total_amount": round(sum(transaction['amount'] for transaction in transactions), 2),
+            "categories": dict(Counter(transaction['personal_finance_category']['primary'] for transaction in transactions)),
+            "elapsed_seconds": round(elapsed, 3)
+        }
+
+    async def _create_in_plaid(self, access_token: str, transactions: List[Dict[str, Any]]):
+        """Create transactions in Plaid sandbox in batches, a few batches at a time"""
+        semaphore = asyncio.Semaphore(PLAID_SANDBOX_CONCURRENCY)
+
+        async def create_batch(batch: List[Dict[str, Any]]):
+            async with semaphore:
+                await plaid_client.call("sandbox_transactions_create", {
+                    'access_token': access_token,
+                    'transactions': [{
+                        'amount': transaction['amount'],
+                        'date_transacted': transaction['date'],
+                        'date_posted': transaction['date'],
+                        'description': f"Transaction at {transaction['merchant_name']}"
+                    } for transaction in batch]
+                })
+
+        batches = [
+            transactions[offset:offset + PLAID_SANDBOX_BATCH_SIZE]
+            for offset in range(0, len(transactions), PLAID_SANDBOX_BATCH_SIZE)
+        ]
+        await asyncio.gather(*(create_batch(batch) for batch in batches))
+
+
+# Global instance
+sandbox_generator = SandboxGenerator()
@@ -0,0 +1,247 @@
+import asyncio
+import logging
+from datetime import datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from services.sqlite_db import SQLiteDatabase, local_db
+from services.donation_ledger import DonationLedger, donation_ledger, SETTLED
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settlement_runs (
+    run_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    groups INTEGER NOT NULL,
+    settled INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    amount_cents INTEGER NOT NULL DEFAULT 0,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS settlement_run_groups (
+    run_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    charity_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    settlement_id TEXT,
+    amount_cents INTEGER,
+    error TEXT,
+    PRIMARY KEY (run_id, user_id, charity_id)
+);
+"""
+
+# Run and group states. Each group is checkpointed as soon as it finishes, so a run
+# interrupted by a crash resumes with only the groups that are still pending.
+RUNNING = "running"
+COMPLETED = "completed"
+PENDING = "pending"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SettlementScheduler:
+    """
+    Daily settlement of accrued micro-donations to Pledge.to.
+
+    Once a day every ledger balance that is due is grouped by user and charity
+    and sent to Pledge.to as one donation per group. Users are processed in
+    parallel under a concurrency cap, and progress is checkpointed per group.
+    """
+
+    def __init__(self, db: SQLiteDatabase, ledger: DonationLedger):
+        self.db = db
+        self.ledger = ledger
+        self.concurrency = settings.DONATION_SETTLEMENT_CONCURRENCY
+        hour, minute = settings.DONATION_SETTLEMENT_TIME.split(":")
+        self.run_at = time(int(hour), int(minute), tzinfo=timezone.utc)
+        self._schema_ready = False
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._run_lock = asyncio.Lock()
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.db.ensure_schema(SCHEMA)
+            self._schema_ready = True
+
+    def _begin(self, run_id: str) -> List[Tuple[str, str]]:
+        """
+        Start a run, or resume it if it was interrupted
+
+        The due balances are snapshotted into settlement_run_groups when the run
+        starts, so a resumed run settles the same groups it set out to.
+
+        Returns:
+            (user_id, charity_id) groups still to settle
+        """
+        self._ensure_schema()
+        with self.db.transaction() as connection:
+            run = connection.execute("SELECT status FROM settlement_runs WHERE run_id = ?", (run_id,)).fetchone()
+            if run is None:
+                groups = self.ledger.due_balances()
+                connection.execute(
+                    "INSERT INTO settlement_runs (run_id, status, groups, started_at) VALUES (?, ?, ?, ?)",
+                    (run_id, RUNNING, len(groups), _now().isoformat())
+                )
+                connection.executemany(
+                    "INSERT INTO settlement_run_groups (run_id, user_id, charity_id, status) VALUES (?, ?, ?, ?)",
+                    [(run_id, user_id, charity_id, PENDING) for user_id, charity_id in groups]
+                )
+                return groups
+
+            if run['status'] == COMPLETED:
+                return []
+
+            rows = connection.execute(
+                "SELECT user_id, charity_id FROM settlement_run_groups WHERE run_id = ? AND status = ?",
+                (run_id, PENDING)
+            ).fetchall()
+        groups = [(row['user_id'], row['charity_id']) for row in rows]
+        logger.info("Resuming settlement run %s with %s groups left", run_id, len(groups))
+        return groups
+
+    def _checkpoint(self, run_id: str, user_id: str, charity_id: str, settlement: Optional[Dict[str, Any]]):
+        """Record the outcome of one group"""
+        if settlement is None:
+            values = (SKIPPED, None, 0, None)
+        else:
+            values = (
+                SETTLED if settlement['status'] == SETTLED else FAILED,
+                settlement['settlement_id'],
+                settlement['amount_cents'],
+                settlement.get('error')
+            )
+        self.db.execute(
+            """
+            UPDATE settlement_run_groups SET status = ?, settlement_id = ?, amount_cents = ?, error = ?
+            WHERE run_id = ? AND user_id = ? AND charity_id = ?
+            """,
+            (*values, run_id, user_id, charity_id)
+        )
+
+    def _finish(self, run_id: str) -> Dict[str, Any]:
+        """Mark a run completed and return its totals"""
+        with self.db.transaction() as connection:
+            settled, failed, amount_cents = connection.execute(
+                """
+                SELECT
+                    COALESCE(SUM(status = ?), 0),
+                    COALESCE(SUM(status = ?), 0),
+                    COALESCE(SUM(CASE WHEN status = ? THEN amount_cents ELSE 0 END), 0)
+                FROM settlement_run_groups WHERE run_id = ?
+                """,
+                (SETTLED, FAILED, SETTLED, run_id)
+            ).fetchone()
+            connection.execute(
+                """
+                UPDATE settlement_runs SET status = ?, settled = ?, failed = ?, amount_cents = ?, finished_at = ?
+                WHERE run_id = ?
+                """,
+                (COMPLETED, settled, failed, amount_cents, _now().isoformat(), run_id)
+            )
+            run = connection.execute("SELECT * FROM settlement_runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(run)
+
+    def interrupted_run(self) -> Optional[str]:
+        """Get the ID of a run that did not complete, if any"""
+        self._ensure_schema()
+        rows = self.db.execute("SELECT run_id FROM settlement_runs WHERE status = ? ORDER BY run_id LIMIT 1", (RUNNING,))
+        return rows[0]['run_id'] if rows else None
+
+    def has_run(self, run_id: str) -> bool:
+        self._ensure_schema()
+        return bool(self.db.execute("SELECT 1 FROM settlement_runs WHERE run_id = ?", (run_id,)))
+
+    async def run(self, run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Settle every due balance, one Pledge.to donation per user and charity
+
+        Args:
+            run_id: Run to start or resume (defaults to today's date in UTC)
+
+        Returns:
+            The run's totals
+        """
+        run_id = run_id or _now().date().isoformat()
+        async with self._run_lock:
+            groups = await asyncio.to_thread(self._begin, run_id)
+
+            charities_by_user: Dict[str, List[str]] = {}
+            for user_id, charity_id in groups:
+                charities_by_user.setdefault(user_id, []).append(charity_id)
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def settle_user(user_id: str, charity_ids: List[str]):
+                async with semaphore:
+                    for charity_id in charity_ids:
+                        try:
+                            settlement = await self.ledger.settle(user_id, charity_id)
+                        except Exception as e:
+                            logger.error("Settlement for user %s and charity %s failed: %s", user_id, charity_id, e)
+                            settlement = {"status": FAILED, "settlement_id": None, "amount_cents": 0, "error": str(e)}
+                        await asyncio.to_thread(self._checkpoint, run_id, user_id, charity_id, settlement)
+
+            await asyncio.gather(*(
+                settle_user(user_id, charity_ids) for user_id, charity_ids in charities_by_user.items()
+            ))
+
+            summary = await asyncio.to_thread(self._finish, run_id)
+            logger.info(
+                "Settlement run %s: %s settled, %s failed, %.2f donated across %s groups",
+                run_id, summary['settled'], summary['failed'], summary['amount_cents'] / 100, summary['groups']
+            )
+            return summary
+
+    def _next_run_at(self) -> datetime:
+        now = _now()
+        scheduled = datetime.combine(now.date(), self.run_at)
+        return scheduled if scheduled > now else scheduled + timedelta(days=1)
+
+    async def start(self):
+        """Start the daily schedule, resuming an interrupted run or catching up on a missed one"""
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._schedule())
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the schedule; a run still going after timeout seconds resumes on next start"""
+        if self._task:
+            self._stopping.set()
+            done, pending = await asyncio.wait([self._task], timeout=timeout)
+            if pending:
+                logger.warning("Stopping settlement run before it finished, it will resume on restart")
+                self._task.cancel()
+                await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _schedule(self):
+        interrupted = await asyncio.to_thread(self.interrupted_run)
+        if interrupted:
+            await self._run_safely(interrupted)
+
+        today = _now().date().isoformat()
+        if _now() >= datetime.combine(_now().date(), self.run_at) and not await asyncio.to_thread(self.has_run, today):
+            await self._run_safely(today)
+
+        while not self._stopping.is_set():
+            next_run_at = self._next_run_at()
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=(next_run_at - _now()).total_seconds())
+            except asyncio.TimeoutError:
+                await self._run_safely(next_run_at.date().isoformat())
+
+    async def _run_safely(self, run_id: str):
+        try:
+            await self.run(run_id)
+        except Exception as e:
+            logger.error("Settlement run %s failed: %s", run_id, e)
+
+
+# Global instance
+settlement_scheduler = SettlementScheduler(local_db, donation_ledger)
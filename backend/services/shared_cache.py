@@ -0,0 +1,234 @@
+import mmap
+import time
+import fcntl
+import struct
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# write sequence (odd while a write is in progress)
+_SEQUENCE = struct.Struct("<Q")
+# generation, bytes of the data area in use, live index slots
+_HEADER = struct.Struct("<QQQ")
+_HEADER_OFFSET = _SEQUENCE.size
+# key hash, data offset, data length, expiry (epoch seconds)
+_SLOT = struct.Struct("<QQId")
+_KEY_LENGTH = struct.Struct("<H")
+
+# Resetting when half the slots are used keeps probe sequences short
+MAX_LOAD_FACTOR = 0.5
+
+# Reads retried this many times while a write is in progress before counting a miss
+READ_ATTEMPTS = 4
+
+
+def _hash(key: bytes) -> int:
+    # hash() is salted per interpreter; this has to agree across processes
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+class SharedCache:
+    """
+    A key/value cache in one shared-memory segment, visible to every worker.
+
+    The segment is an anonymous shared mapping created when the module is
+    imported, which the supervisor does before forking, so all workers map
+    the same memory. It holds an open-addressing index and an append-only
+    data area of encoded values. Nothing is freed individually: when the data
+    area or the index fills up, the whole cache is cleared and refills from
+    upstream. That suits data that is read far more often than it changes,
+    like Pledge.to organizations, and keeps the layout simple enough that no
+    worker can leave it inconsistent.
+
+    Readers take no lock. A sequence number at the start of the segment is
+    odd while a write is in progress; a read that saw it odd or changed is
+    retried a few times and then counts as a miss, so a read never waits on a
+    writer. Writers take a non-blocking POSIX lock on an anonymous file, which
+    the kernel releases if the holder dies, and skip the write when another
+    worker holds it. A writer that finds the sequence odd knows the previous
+    writer died partway through and clears the cache before writing.
+    """
+
+    def __init__(
+        self,
+        size_bytes: int = settings.SHARED_CACHE_SIZE_MB * 1024 * 1024,
+        max_entries: int = settings.SHARED_CACHE_MAX_ENTRIES
+    ):
+        self.capacity = max(16, int(max_entries / MAX_LOAD_FACTOR))
+        self._index_start = _HEADER_OFFSET + _HEADER.size
+        self._data_start = self._index_start + self.capacity * _SLOT.size
+        self.data_size = max(size_bytes - self._data_start, 1024 * 1024)
+        self._memory = mmap.mmap(-1, self._data_start + self.data_size)
+        # POSIX record locks belong to a process, so forked workers exclude each other through the inherited file
+        self._lock_file = tempfile.TemporaryFile()
+        self._thread_lock = threading.Lock()
+
+        # Per-process counters
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.recovered = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get an unexpired value, or None"""
+        encoded = key.encode()
+        key_hash = _hash(encoded)
+        for _ in range(READ_ATTEMPTS):
+            (sequence,) = _SEQUENCE.unpack_from(self._memory, 0)
+            if sequence & 1:
+                continue
+            try:
+                value = self._read(encoded, key_hash)
+            except (struct.error, ValueError):
+                # A write moved the data under the read; the sequence check below retries it
+                value = None
+            if _SEQUENCE.unpack_from(self._memory, 0)[0] == sequence:
+                if value is None:
+                    break
+                self.hits += 1
+                return value
+        else:
+            self.skipped += 1
+        self.misses += 1
+        return None
+
+    def _read(self, key: bytes, key_hash: int) -> Optional[bytes]:
+        slot = self._find(key, key_hash)
+        if slot is None:
+            return None
+        _, offset, length, expires_at = _SLOT.unpack_from(self._memory, slot)
+        if expires_at <= time.time():
+            return None
+        start = self._data_start + offset + _KEY_LENGTH.size + len(key)
+        return self._memory[start:self._data_start + offset + length]
+
+    def _acquire(self, blocking: bool = False) -> bool:
+        """Take the writer lock across threads and processes"""
+        if not self._thread_lock.acquire(blocking=blocking):
+            return False
+        try:
+            fcntl.lockf(self._lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._thread_lock.release()
+            return False
+        return True
+
+    def _release(self):
+        fcntl.lockf(self._lock_file, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def _begin_write(self):
+        """Mark a write in progress, first clearing what a writer that died mid-write left"""
+        (sequence,) = _SEQUENCE.unpack_from(self._memory, 0)
+        if sequence & 1:
+            self.recovered += 1
+            logger.warning("Shared cache writer died mid-write, clearing it")
+            generation, _, _ = _HEADER.unpack_from(self._memory, _HEADER_OFFSET)
+            self._reset(generation)
+            sequence += 1
+        _SEQUENCE.pack_into(self._memory, 0, sequence + 1)
+        return sequence + 2
+
+    def _end_write(self, sequence: int):
+        _SEQUENCE.pack_into(self._memory, 0, sequence)
+
+    def put(self, key: str, value: bytes, ttl: float):
+        """Store a value for ttl seconds, replacing any previous value for the key"""
+        encoded = key.encode()
+        length = _KEY_LENGTH.size + len(encoded) + len(value)
+        if length > self.data_size // 4:
+            # One oversized entry should not flush everything else
+            return
+        key_hash = _hash(encoded)
+        if not self._acquire():
+            # Another worker is writing; this value is cached on a later miss
+            self.skipped += 1
+            return
+        try:
+            sequence = self._begin_write()
+            generation, used, entries = _HEADER.unpack_from(self._memory, _HEADER_OFFSET)
+            slot = self._find(encoded, key_hash)
+            if used + length > self.data_size or (slot is None and entries + 1 > self.capacity * MAX_LOAD_FACTOR):
+                generation, used, entries = self._reset(generation)
+                slot = None
+            if slot is None:
+                slot = self._free_slot(key_hash)
+                entries += 1
+
+            start = self._data_start + used
+            _KEY_LENGTH.pack_into(self._memory, start, len(encoded))
+            self._memory[start + _KEY_LENGTH.size:start + _KEY_LENGTH.size + len(encoded)] = encoded
+            self._memory[start + _KEY_LENGTH.size + len(encoded):start + length] = value
+            _SLOT.pack_into(self._memory, slot, key_hash, used, length, time.time() + ttl)
+            _HEADER.pack_into(self._memory, _HEADER_OFFSET, generation, used + length, entries)
+            self._end_write(sequence)
+        finally:
+            self._release()
+
+    def clear(self):
+        """Drop every entry, in every worker"""
+        self._acquire(blocking=True)
+        try:
+            sequence = self._begin_write()
+            generation, _, _ = _HEADER.unpack_from(self._memory, _HEADER_OFFSET)
+            self._reset(generation)
+            self._end_write(sequence)
+        finally:
+            self._release()
+
+    def _slot_offset(self, index: int) -> int:
+        return self._index_start + index * _SLOT.size
+
+    def _find(self, key: bytes, key_hash: int) -> Optional[int]:
+        """Byte offset of the key's index slot, or None"""
+        index = key_hash % self.capacity
+        for _ in range(self.capacity):
+            slot = self._slot_offset(index)
+            slot_hash, offset, _, _ = _SLOT.unpack_from(self._memory, slot)
+            if slot_hash == 0:
+                return None
+            if slot_hash == key_hash:
+                start = self._data_start + offset
+                (key_length,) = _KEY_LENGTH.unpack_from(self._memory, start)
+                if self._memory[start + _KEY_LENGTH.size:start + _KEY_LENGTH.size + key_length] == key:
+                    return slot
+            index = (index + 1) % self.capacity
+        return None
+
+    def _free_slot(self, key_hash: int) -> int:
+        index = key_hash % self.capacity
+        while _SLOT.unpack_from(self._memory, self._slot_offset(index))[0] != 0:
+            index = (index + 1) % self.capacity
+        return self._slot_offset(index)
+
+    def _reset(self, generation: int):
+        self._memory[self._index_start:self._data_start] = bytes(self._data_start - self._index_start)
+        header = (generation + 1, 0, 0)
+        _HEADER.pack_into(self._memory, _HEADER_OFFSET, *header)
+        logger.info("Shared cache full, cleared it (generation %s)", generation + 1)
+        return header
+
+    def stats(self) -> Dict[str, Any]:
+        """Get segment usage and this worker's hit counters"""
+        generation, used, entries = _HEADER.unpack_from(self._memory, _HEADER_OFFSET)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes_used": used,
+            "bytes_total": self.data_size,
+            "resets": generation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "contended": self.skipped,
+            "recovered_writes": self.recovered,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
+
+
+# Global instance
+shared_cache = SharedCache()
@@ -0,0 +1,141 @@
+import time
+import signal
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, TypeVar
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ShutdownCoordinator:
+    """
+    Tracks in-flight requests and critical writes so shutdown can drain them.
+
+    Once draining starts, readiness fails, the background queues stop taking
+    new work and responses ask clients to reconnect elsewhere. Requests that
+    are already running finish normally. Writes that must not be cut in half,
+    such as storing a donation and then updating the user's total, run through
+    complete(): they keep going when the request or job that started them is
+    cancelled, and drain() waits for them before upstream clients are closed.
+    """
+
+    def __init__(
+        self,
+        drain_delay: float = settings.SHUTDOWN_DRAIN_DELAY_SECONDS,
+        timeout: float = settings.SHUTDOWN_TIMEOUT_SECONDS
+    ):
+        self.drain_delay = drain_delay
+        self.timeout = timeout
+        self.draining = False
+        self.in_flight = 0
+        self._tasks: Set[asyncio.Task] = set()
+        self._on_drain: List[Callable[[], Any]] = []
+
+        self.completed_after_cancel = 0
+        self.abandoned = 0
+
+    def start(self):
+        """Mark this process ready and take over SIGTERM handling from the server"""
+        self.draining = False
+        self.install_signal_handlers()
+
+    def on_drain(self, callback: Callable[[], Any]):
+        """Call callback when draining starts, e.g. to stop a queue from claiming more work"""
+        if callback not in self._on_drain:
+            self._on_drain.append(callback)
+
+    def begin(self, reason: str = "shutdown"):
+        """Fail readiness and stop taking new background work; safe to call more than once"""
+        if self.draining:
+            return
+        self.draining = True
+        logger.info("Draining for %s: %s requests and %s writes in flight", reason, self.in_flight, len(self._tasks))
+        for callback in self._on_drain:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Drain callback %s failed: %s", callback, e)
+
+    async def complete(self, operation: Awaitable[T]) -> T:
+        """
+        Run operation to completion even if the caller is cancelled
+
+        The caller still sees the cancellation; the operation carries on in
+        its own task, which drain() waits for.
+        """
+        task = asyncio.ensure_future(operation)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self.completed_after_cancel += 1
+                logger.warning("Caller cancelled mid-write, finishing the write before shutdown")
+            raise
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for in-flight requests and critical writes, up to timeout seconds
+
+        Returns:
+            True if everything finished in time
+        """
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        while self.in_flight > 0 or self._tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.abandoned += len(self._tasks)
+                logger.error(
+                    "Shutdown deadline reached with %s requests and %s writes still running", self.in_flight, len(self._tasks)
+                )
+                return False
+            if self._tasks:
+                await asyncio.wait(list(self._tasks), timeout=min(remaining, 0.1))
+            else:
+                await asyncio.sleep(min(remaining, 0.05))
+        return True
+
+    def install_signal_handlers(self):
+        """
+        Start draining as soon as SIGTERM arrives, and pass it on to the server
+        SHUTDOWN_DRAIN_DELAY_SECONDS later
+
+        Load balancers see readiness fail while the server still accepts
+        connections, so no request is refused in between. A second SIGTERM, or
+        SIGINT, is passed on at once. Does nothing outside the main thread.
+        """
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            previous = signal.getsignal(signum)
+            if not callable(previous):
+                continue
+            try:
+                loop.add_signal_handler(signum, self._on_signal, signum, previous)
+            except (RuntimeError, ValueError, NotImplementedError):
+                return
+
+    def _on_signal(self, signum: int, previous: Callable):
+        already_draining = self.draining
+        self.begin(signal.Signals(signum).name)
+        if already_draining or signum != signal.SIGTERM or self.drain_delay <= 0:
+            previous(signum, None)
+        else:
+            asyncio.get_running_loop().call_later(self.drain_delay, previous, signum, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get drain state and in-flight counts"""
+        return {
+            "draining": self.draining,
+            "in_flight_requests": self.in_flight,
+            "in_flight_writes": len(self._tasks),
+            "completed_after_cancel": self.completed_after_cancel,
+            "abandoned": self.abandoned
+        }
+
+
+# Global instance
+shutdown_coordinator = ShutdownCoordinator()
@@ -0,0 +1,66 @@
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Optional, Sequence
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteDatabase:
+    """Thread-safe wrapper around a single local SQLite connection"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Get the SQLite connection, opening it on first use"""
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                    connection.row_factory = sqlite3.Row
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.execute("PRAGMA synchronous=NORMAL")
+                    self._connection = connection
+                    logger.info("Opened local database at %s", self.path)
+        return self._connection
+
+    def ensure_schema(self, schema: str):
+        """Create tables and indexes if they do not exist yet"""
+        with self._lock:
+            self.connection.executescript(schema)
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> List[sqlite3.Row]:
+        """Run a single statement and return all resulting rows"""
+        with self._lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of statements atomically"""
+        with self._lock:
+            connection = self.connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            else:
+                connection.execute("COMMIT")
+
+    def close(self):
+        """Close the SQLite connection"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+# Global instance
+local_db = SQLiteDatabase(settings.LOCAL_DB_PATH)
@@ -1,8 +1,11 @@
 import os
-from typing import Optional
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING, Optional
 import logging
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 logger = logging.getLogger(__name__)
 
 class SupabaseService:
@@ -10,11 +13,39 @@ class SupabaseService:
         self.supabase_url = os.getenv('SUPABASE_URL')
         self.supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
         
+        self._client: Optional["Client"] = None
+        self._client_lock = threading.Lock()
+        
         if not self.supabase_url or not self.supabase_key:
             logger.warning("Supabase credentials not configured. Using in-memory storage as fallback.")
-            self.client = None
-        else:
-            self.client = create_client(self.supabase_url, self.supabase_key)
+    
+    @property
+    def client(self) -> Optional["Client"]:
+        """
+        Get the Supabase client, creating it on first use
+
+        Importing the supabase package and building the client is slow, so it
+        is deferred until the first query or the startup warmup; None when
+        credentials are not configured.
+        """
+        if self._client is None and self.supabase_url and self.supabase_key:
+            with self._client_lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(self.supabase_url, self.supabase_key)
+        return self._client
+    
+    def close(self):
+        """Close the client's HTTP connections; the next query opens new ones"""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.postgrest.aclose()
+                self._client = None
+    
+    def reset_after_fork(self):
+        """Forget a client inherited from a parent process so this process opens its own connections"""
+        self._client = None
+        self._client_lock = threading.Lock()
     
     async def store_access_token(self, user_id: str, access_token: str) -> bool:
         """Store access token for a user"""
@@ -30,11 +61,11 @@ class SupabaseService:
                 'updated_at': 'now()'
             }).execute()
             
-            logger.info(f"Successfully stored access token for user: {user_id}")
+            logger.info("Successfully stored access token for user: %s", user_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error storing access token for user {user_id}: {str(e)}")
+            logger.error("Error storing access token for user %s: %s", user_id, e)
             return False
     
     async def get_access_token(self, user_id: str) -> Optional[str]:
@@ -47,14 +78,14 @@ class SupabaseService:
             result = self.client.table('user_plaid_tokens').select('access_token').eq('user_id', user_id).single().execute()
             
             if result.data:
-                logger.info(f"Successfully retrieved access token for user: {user_id}")
+                logger.info("Retrieved access token for user: %s", user_id)
                 return result.data['access_token']
             else:
-                logger.info(f"No access token found for user: {user_id}")
+                logger.info("No access token found for user: %s", user_id)
                 return None
                 
         except Exception as e:
-            logger.error(f"Error retrieving access token for user {user_id}: {str(e)}")
+            logger.error("Error retrieving access token for user %s: %s", user_id, e)
             return None
     
     async def delete_access_token(self, user_id: str) -> bool:
@@ -66,11 +97,11 @@ class SupabaseService:
             
             result = self.client.table('user_plaid_tokens').delete().eq('user_id', user_id).execute()
             
-            logger.info(f"Successfully deleted access token for user: {user_id}")
+            logger.info("Successfully deleted access token for user: %s", user_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error deleting access token for user {user_id}: {str(e)}")
+            logger.error("Error deleting access token for user %s: %s", user_id, e)
             return False
 
     async def get_liked_charities(self, user_id: str) -> list:
@@ -85,14 +116,14 @@ class SupabaseService:
             if result.data:
                 # Return just the charity IDs since we don't have a local charities table
                 charity_ids = [item['charity_id'] for item in result.data]
-                logger.info(f"Found {len(charity_ids)} liked charity IDs for user: {user_id}")
+                logger.info("Found %s liked charity IDs for user: %s", len(charity_ids), user_id)
                 return charity_ids
             else:
-                logger.info(f"No liked charities found for user: {user_id}")
+                logger.info("No liked charities found for user: %s", user_id)
                 return []
                 
         except Exception as e:
-            logger.error(f"Error getting liked charities for user {user_id}: {str(e)}")
+            logger.error("Error getting liked charities for user %s: %s", user_id, e)
             return []
 
     async def create_user_donation(self, donation_data: dict) -> bool:
@@ -102,17 +133,138 @@ class SupabaseService:
                 logger.warning("Supabase not configured, skipping donation creation")
                 return False
             
-            logger.info(f"Creating user donation record: {donation_data}")
+            logger.info("Creating user donation record: %s", donation_data)
             
             result = self.client.table('user_donations').insert(donation_data).execute()
             
-            logger.info(f"User donation record created successfully for user: {donation_data['user_id']}")
+            logger.info("User donation record created successfully for user: %s", donation_data['user_id'])
+            return True
+            
+        except Exception as e:
+            logger.error("Error creating user donation record: %s", e)
+            return False
+
+    async def create_user_donations(self, donations: list) -> bool:
+        """Create many donation records in user_donations with a single multi-row insert"""
+        try:
+            if not self.client:
+                logger.warning("Supabase not configured, skipping donation creation")
+                return False
+            
+            if not donations:
+                return True
+            
+            result = self.client.table('user_donations').insert(donations).execute()
+            
+            logger.info("Created %s user donation records in one insert", len(donations))
+            return True
+            
+        except Exception as e:
+            logger.error("Error creating %s user donation records: %s", len(donations), e)
+            return False
+
+    async def insert_new_donations(self, donations: list) -> Optional[list]:
+        """
+        Insert donation records, skipping any that already exist
+
+        Needs the unique index on user_donations (user_id, original_transaction_id,
+        charity_id): when two workers donate on the same transaction, only the
+        first insert writes its rows.
+
+        Returns:
+            The rows that were inserted, or None if the insert failed
+        """
+        try:
+            if not self.client:
+                logger.warning("Supabase not configured, skipping donation creation")
+                return None
+            
+            if not donations:
+                return []
+            
+            result = self.client.table('user_donations')\
+                .upsert(donations, on_conflict='user_id,original_transaction_id,charity_id', ignore_duplicates=True)\
+                .execute()
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error("Error inserting %s user donation records: %s", len(donations), e)
+            return None
+
+    async def get_transaction_donations(self, user_id: str, original_transaction_ids: list) -> list:
+        """Get a user's donation records for the given original transaction IDs"""
+        try:
+            if not self.client:
+                return []
+            
+            if not original_transaction_ids:
+                return []
+            
+            result = self.client.table('user_donations')\
+                .select('*')\
+                .eq('user_id', user_id)\
+                .in_('original_transaction_id', list(original_transaction_ids))\
+                .execute()
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error("Error getting transaction donations for user %s: %s", user_id, e)
+            raise
+
+    async def repoint_transaction_donations(self, user_id: str, from_transaction_id: str, to_transaction_id: str) -> bool:
+        """Move a user's donation records from one original transaction to another"""
+        try:
+            if not self.client:
+                return False
+            
+            result = self.client.table('user_donations')\
+                .update({'original_transaction_id': to_transaction_id})\
+                .eq('user_id', user_id)\
+                .eq('original_transaction_id', from_transaction_id)\
+                .execute()
+            
             return True
             
         except Exception as e:
-            logger.error(f"Error creating user donation record: {str(e)}")
+            logger.error("Error moving donations for user %s from %s to %s: %s", user_id, from_transaction_id, to_transaction_id, e)
             return False
 
+    async def delete_transaction_donations(self, user_id: str, original_transaction_ids: list) -> list:
+        """Delete a user's donation records for the given original transaction IDs and return them"""
+        try:
+            if not self.client:
+                return []
+            
+            if not original_transaction_ids:
+                return []
+            
+            result = self.client.table('user_donations')\
+                .delete()\
+                .eq('user_id', user_id)\
+                .in_('original_transaction_id', list(original_transaction_ids))\
+                .execute()
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error("Error deleting transaction donations for user %s: %s", user_id, e)
+            return []
+
+    async def get_donation_keys(self, offset: int, limit: int) -> list:
+        """Get one page of (user_id, original_transaction_id) pairs from user_donations"""
+        if not self.client:
+            return []
+        
+        result = self.client.table('user_donations')\
+            .select('user_id, original_transaction_id')\
+            .order('id')\
+            .range(offset, offset + limit - 1)\
+            .execute()
+        
+        return result.data or []
+
     async def update_user_total_donation(self, user_id: str, donation_amount: float) -> bool:
         """Update user's total donation amount in users table"""
         try:
@@ -126,14 +278,14 @@ class SupabaseService:
                 current_total = result.data.get('total_donation_amount', 0) if result.data else 0
             except:
                 # User doesn't exist in users table, create them
-                logger.info(f"User {user_id} not found in users table, creating record")
+                logger.info("User %s not found in users table, creating record", user_id)
                 result = self.client.table('users').insert({
                     'id': user_id,
                     'total_donation_amount': donation_amount,
                     'created_at': 'now()',
                     'updated_at': 'now()'
                 }).execute()
-                logger.info(f"Successfully created user record with total donation amount: {donation_amount}")
+                logger.info("Successfully created user record with total donation amount: %s", donation_amount)
                 return True
             
             new_total = current_total + donation_amount
@@ -144,11 +296,11 @@ class SupabaseService:
                 'updated_at': 'now()'
             }).eq('id', user_id).execute()
             
-            logger.info(f"Successfully updated total donation amount for user {user_id}: {current_total} -> {new_total}")
+            logger.info("Successfully updated total donation amount for user %s: %s -> %s", user_id, current_total, new_total)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating total donation amount for user {user_id}: {str(e)}")
+            logger.error("Error updating total donation amount for user %s: %s", user_id, e)
             return False
 
     async def get_user_total_donation(self, user_id: str) -> float:
@@ -162,14 +314,14 @@ class SupabaseService:
             
             if result.data:
                 total = result.data.get('total_donation_amount', 0)
-                logger.info(f"Found total donation amount for user {user_id}: {total}")
+                logger.info("Found total donation amount for user %s: %s", user_id, total)
                 return total
             else:
-                logger.info(f"No total donation amount found for user {user_id}, using 0")
+                logger.info("No total donation amount found for user %s, using 0", user_id)
                 return 0.0
                 
         except Exception as e:
-            logger.error(f"Error getting total donation amount for user {user_id}: {str(e)}")
+            logger.error("Error getting total donation amount for user %s: %s", user_id, e)
             return 0.0
 
     async def get_recent_donations(self, user_id: str, limit: int = 10) -> list:
@@ -179,8 +331,6 @@ class SupabaseService:
                 logger.warning("Supabase not configured, returning empty list for recent donations")
                 return []
             
-            logger.info(f"Fetching recent donations for user: {user_id}")
-            
             # Get recent donations from user_donations table
             result = self.client.table('user_donations')\
                 .select('*')\
@@ -189,17 +339,15 @@ class SupabaseService:
                 .limit(limit)\
                 .execute()
             
-            logger.info(f"Query result: {result.data}")
-            
             if result.data:
-                logger.info(f"Found {len(result.data)} recent donations for user {user_id}")
+                logger.info("Found %d recent donations for user %s", len(result.data), user_id)
                 return result.data
             else:
-                logger.info(f"No recent donations found for user {user_id}")
+                logger.info("No recent donations found for user %s", user_id)
                 return []
                 
         except Exception as e:
-            logger.error(f"Error getting recent donations for user {user_id}: {str(e)}")
+            logger.error("Error getting recent donations for user %s: %s", user_id, e)
             return []
 
     async def get_user_donation_percentage(self, user_id: str) -> float:
@@ -212,14 +360,14 @@ class SupabaseService:
             result = self.client.table('user_settings').select('auto_donation_percentage').eq('user_id', user_id).single().execute()
             
             if result.data:
-                logger.info(f"Found auto-donation percentage for user {user_id}: {result.data['auto_donation_percentage']}")
+                logger.info("Found auto-donation percentage for user %s: %s", user_id, result.data['auto_donation_percentage'])
                 return result.data['auto_donation_percentage']
             else:
-                logger.info(f"No auto-donation percentage found for user {user_id}, using default")
+                logger.info("No auto-donation percentage found for user %s, using default", user_id)
                 return 0.01  # 1% default
                 
         except Exception as e:
-            logger.error(f"Error getting auto-donation percentage for user {user_id}: {str(e)}")
+            logger.error("Error getting auto-donation percentage for user %s: %s", user_id, e)
             return 0.01  # 1% default
 
     async def update_donation_percentage(self, user_id: str, percentage: float) -> bool:
@@ -229,21 +377,21 @@ class SupabaseService:
                 logger.warning("Supabase not configured, skipping percentage update")
                 return False
             
-            logger.info(f"Attempting to update donation percentage for user: {user_id} to {percentage}")
+            logger.info("Attempting to update donation percentage for user: %s to %s", user_id, percentage)
             
             # Check if user settings exist
             try:
                 result = self.client.table('user_settings').select('*').eq('user_id', user_id).single().execute()
                 if result.data:
                     # Update existing record
-                    logger.info(f"Updating existing settings for user: {user_id}")
+                    logger.info("Updating existing settings for user: %s", user_id)
                     result = self.client.table('user_settings').update({
                         'auto_donation_percentage': percentage,
                         'updated_at': 'now()'
                     }).eq('user_id', user_id).execute()
                 else:
                     # Insert new record
-                    logger.info(f"Creating new settings for user: {user_id}")
+                    logger.info("Creating new settings for user: %s", user_id)
                     result = self.client.table('user_settings').insert({
                         'user_id': user_id,
                         'auto_donation_percentage': percentage,
@@ -252,7 +400,7 @@ class SupabaseService:
                     }).execute()
             except Exception as e:
                 # If no record exists, create one
-                logger.info(f"Creating new settings for user: {user_id} (no existing record)")
+                logger.info("Creating new settings for user: %s (no existing record)", user_id)
                 result = self.client.table('user_settings').insert({
                     'user_id': user_id,
                     'auto_donation_percentage': percentage,
@@ -260,11 +408,31 @@ class SupabaseService:
                     'updated_at': 'now()'
                 }).execute()
             
-            logger.info(f"Successfully updated donation percentage for user: {user_id}")
+            logger.info("Successfully updated donation percentage for user: %s", user_id)
+            return True
+            
+        except Exception as e:
+            logger.error("Error updating donation percentage for user %s: %s", user_id, e)
+            return False
+
+    async def update_donation_rules(self, user_id: str, rules: dict) -> bool:
+        """Store a user's category donation rules in user_settings"""
+        try:
+            if not self.client:
+                logger.warning("Supabase not configured, skipping donation rules update")
+                return False
+            
+            result = self.client.table('user_settings').upsert({
+                'user_id': user_id,
+                'donation_rules': rules,
+                'updated_at': 'now()'
+            }, on_conflict='user_id').execute()
+            
+            logger.info("Successfully updated donation rules for user: %s", user_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating donation percentage for user {user_id}: {str(e)}")
+            logger.error("Error updating donation rules for user %s: %s", user_id, e)
             return False
 
     async def toggle_auto_donate(self, user_id: str, enabled: bool) -> bool:
@@ -274,21 +442,21 @@ class SupabaseService:
                 logger.warning("Supabase not configured, skipping auto-donate toggle")
                 return False
             
-            logger.info(f"Attempting to toggle auto-donate for user: {user_id} to {enabled}")
+            logger.info("Attempting to toggle auto-donate for user: %s to %s", user_id, enabled)
             
             # Check if user settings exist
             try:
                 result = self.client.table('user_settings').select('*').eq('user_id', user_id).single().execute()
                 if result.data:
                     # Update existing record
-                    logger.info(f"Updating existing settings for user: {user_id}")
+                    logger.info("Updating existing settings for user: %s", user_id)
                     result = self.client.table('user_settings').update({
                         'auto_donate_enabled': enabled,
                         'updated_at': 'now()'
                     }).eq('user_id', user_id).execute()
                 else:
                     # Insert new record
-                    logger.info(f"Creating new settings for user: {user_id}")
+                    logger.info("Creating new settings for user: %s", user_id)
                     result = self.client.table('user_settings').insert({
                         'user_id': user_id,
                         'auto_donation_percentage': 0.01,
@@ -297,7 +465,7 @@ class SupabaseService:
                     }).execute()
             except Exception as e:
                 # If no record exists, create one
-                logger.info(f"Creating new settings for user: {user_id} (no existing record)")
+                logger.info("Creating new settings for user: %s (no existing record)", user_id)
                 result = self.client.table('user_settings').insert({
                     'user_id': user_id,
                     'auto_donation_percentage': 0.01,
@@ -305,11 +473,11 @@ class SupabaseService:
                     'updated_at': 'now()'
                 }).execute()
             
-            logger.info(f"Successfully toggled auto-donate for user: {user_id} to {enabled}")
+            logger.info("Successfully toggled auto-donate for user: %s to %s", user_id, enabled)
             return True
             
         except Exception as e:
-            logger.error(f"Error toggling auto-donate for user {user_id}: {str(e)}")
+            logger.error("Error toggling auto-donate for user %s: %s", user_id, e)
             return False
 
     async def get_user_settings(self, user_id: str) -> dict:
@@ -325,17 +493,17 @@ class SupabaseService:
             result = self.client.table('user_settings').select('*').eq('user_id', user_id).single().execute()
             
             if result.data:
-                logger.info(f"Found settings for user {user_id}")
+                logger.info("Found settings for user %s", user_id)
                 return result.data
             else:
-                logger.info(f"No settings found for user {user_id}, returning defaults")
+                logger.info("No settings found for user %s, returning defaults", user_id)
                 return {
                     'auto_donation_percentage': 0.01,
                     'auto_donate_enabled': False
                 }
                 
         except Exception as e:
-            logger.error(f"Error getting settings for user {user_id}: {str(e)}")
+            logger.error("Error getting settings for user %s: %s", user_id, e)
             return {
                 'auto_donation_percentage': 0.01,
                 'auto_donate_enabled': False
@@ -351,14 +519,14 @@ class SupabaseService:
             result = self.client.table('user_charity_preferences').select('charity_id, allocation_percentage').eq('user_id', user_id).eq('is_active', True).execute()
             
             if result.data:
-                logger.info(f"Found {len(result.data)} charity preferences for user: {user_id}")
+                logger.info("Found %s charity preferences for user: %s", len(result.data), user_id)
                 return result.data
             else:
-                logger.info(f"No charity preferences found for user: {user_id}")
+                logger.info("No charity preferences found for user: %s", user_id)
                 return []
                 
         except Exception as e:
-            logger.error(f"Error getting charity preferences for user {user_id}: {str(e)}")
+            logger.error("Error getting charity preferences for user %s: %s", user_id, e)
             return []
 
     async def get_charity_name(self, charity_id: str) -> Optional[str]:
@@ -370,14 +538,14 @@ class SupabaseService:
             organization_data = await pledge_client.get_organization_by_id(charity_id)
             
             if organization_data and 'name' in organization_data:
-                logger.info(f"Found charity name for ID {charity_id}: {organization_data['name']}")
+                logger.info("Found charity name for ID %s: %s", charity_id, organization_data['name'])
                 return organization_data['name']
             else:
-                logger.info(f"No charity found for ID: {charity_id}")
+                logger.info("No charity found for ID: %s", charity_id)
                 return None
                 
         except Exception as e:
-            logger.error(f"Error getting charity name for ID {charity_id}: {str(e)}")
+            logger.error("Error getting charity name for ID %s: %s", charity_id, e)
             return None
 
     async def update_allocation_percentage(self, user_id: str, charity_id: str, allocation_percentage: float) -> bool:
@@ -387,18 +555,18 @@ class SupabaseService:
                 logger.warning("Supabase not configured, skipping allocation update")
                 return False
             
-            logger.info(f"Updating allocation percentage for user: {user_id}, charity: {charity_id} to {allocation_percentage}%")
+            logger.info("Updating allocation percentage for user: %s, charity: %s to %s%%", user_id, charity_id, allocation_percentage)
             
             result = self.client.table('user_charity_preferences').update({
                 'allocation_percentage': allocation_percentage,
                 'updated_at': 'now()'
             }).eq('user_id', user_id).eq('charity_id', charity_id).execute()
             
-            logger.info(f"Successfully updated allocation percentage for user: {user_id}")
+            logger.info("Successfully updated allocation percentage for user: %s", user_id)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating allocation percentage for user {user_id}: {str(e)}")
+            logger.error("Error updating allocation percentage for user %s: %s", user_id, e)
             return False
 
 # Global instance
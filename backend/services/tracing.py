@@ -0,0 +1,301 @@
+import re
+import time
+import random
+import inspect
+import logging
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# version-trace_id-parent_id-flags, see https://www.w3.org/TR/trace-context/
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+SAMPLED_FLAG = 0x01
+
+
+class Trace:
+    """Spans recorded for one trace in this process"""
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.root: Optional["Span"] = None
+        self.spans: List["Span"] = []
+        self.dropped = 0
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration: Optional[float] = None
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header naming this span as the parent"""
+        return f"00-{self.trace.trace_id}-{self.span_id}-{SAMPLED_FLAG if self.trace.sampled else 0:02x}"
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    Parse an incoming traceparent header
+
+    Returns:
+        (trace_id, parent span_id, sampled), or None if the header is missing or invalid
+    """
+    if not header:
+        return None
+    match = TRACEPARENT_PATTERN.match(header.strip().lower())
+    if not match:
+        return None
+    trace_id, parent_id, flags = match.groups()
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & SAMPLED_FLAG)
+
+
+class SpanExporter:
+    """Receives each trace once its root span finishes"""
+
+    def export(self, trace: Trace, root: Span):
+        raise NotImplementedError
+
+
+class RingBufferExporter(SpanExporter):
+    """Keeps the most recent traces in memory for the debug endpoint"""
+
+    def __init__(self, capacity: int = settings.TRACING_BUFFER_SIZE):
+        self._traces: Deque[Tuple[Trace, Span]] = deque(maxlen=capacity)
+
+    def export(self, trace: Trace, root: Span):
+        self._traces.append((trace, root))
+
+    def slowest(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """The slowest buffered traces, each with its spans in start order"""
+        ranked = sorted(self._traces, key=lambda entry: entry[1].duration or 0.0, reverse=True)[:limit]
+        return [
+            {
+                "trace_id": trace.trace_id,
+                "name": root.name,
+                "duration_ms": round(root.duration * 1000, 3),
+                "start_time": root.start_time,
+                "dropped_spans": trace.dropped,
+                "spans": [span.to_dict() for span in sorted(trace.spans, key=lambda span: span.start_time)]
+            }
+            for trace, root in ranked
+        ]
+
+    def __len__(self) -> int:
+        return len(self._traces)
+
+
+class LoggingExporter(SpanExporter):
+    """Logs one line per finished trace with its slowest spans"""
+
+    def export(self, trace: Trace, root: Span):
+        children = sorted(
+            (span for span in trace.spans if span is not root and span.duration is not None),
+            key=lambda span: span.duration,
+            reverse=True
+        )[:5]
+        breakdown = ", ".join(f"{span.name}={span.duration * 1000:.1f}ms" for span in children)
+        logger.info("Trace %s %s took %.1fms [%s]", trace.trace_id, root.name, root.duration * 1000, breakdown)
+
+
+class Tracer:
+    """
+    Context-propagated spans with pluggable exporters.
+
+    The active span lives in a ContextVar, so it follows asyncio tasks and
+    asyncio.to_thread calls without being passed around. Spans opened with no
+    active trace are skipped unless they start one, which keeps background
+    chatter out of the buffer.
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = settings.TRACING_SAMPLE_RATE,
+        max_spans: int = settings.TRACING_MAX_SPANS_PER_TRACE,
+        enabled: bool = settings.TRACING_ENABLED
+    ):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_spans = max_spans
+        self.exporters: List[SpanExporter] = []
+        self._current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+        self.started = 0
+        self.exported = 0
+
+    def add_exporter(self, exporter: SpanExporter):
+        self.exporters.append(exporter)
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def traceparent(self) -> Optional[str]:
+        """traceparent header for an outgoing request, if a sampled trace is active"""
+        span = self._current.get()
+        return span.traceparent if span is not None and span.trace.sampled else None
+
+    @contextmanager
+    def start_trace(self, name: str, traceparent: Optional[str] = None, **attributes) -> Iterator[Optional[Span]]:
+        """
+        Open a root span, continuing the caller's trace when a valid traceparent is given
+
+        The sampling decision of an incoming traceparent is honoured; otherwise
+        TRACING_SAMPLE_RATE decides. Yields None when tracing is disabled.
+        """
+        if not self.enabled:
+            yield None
+            return
+        parent = parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        trace = Trace(trace_id, sampled)
+        span = trace.root = Span(trace, name, parent_id, attributes)
+        self.started += 1
+        try:
+            with self._activate(span):
+                yield span
+        finally:
+            if sampled:
+                self._export(trace, span)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Open a child of the active span; a no-op outside a sampled trace"""
+        parent = self._current.get()
+        if parent is None or not parent.trace.sampled:
+            yield None
+            return
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        with self._activate(span):
+            yield span
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[Span]:
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started
+            trace = span.trace
+            if len(trace.spans) < self.max_spans or span is trace.root:
+                trace.spans.append(span)
+            else:
+                # Bulk paths can make thousands of calls; keep the first ones and count the rest
+                trace.dropped += 1
+            self._current.reset(token)
+
+    def _export(self, trace: Trace, root: Span):
+        self.exported += 1
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace, root)
+            except Exception as e:
+                logger.warning("Trace exporter %s failed: %s", type(exporter).__name__, e)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get trace counts since startup"""
+        return {
+            "sample_rate": self.sample_rate,
+            "started": self.started,
+            "exported": self.exported,
+            "buffered": len(ring_buffer)
+        }
+
+
+def traced(
+    target: Any,
+    dependency: str,
+    methods: Optional[Iterable[str]] = None,
+    operation: Optional[Callable[[str, Tuple[Any, ...]], str]] = None
+):
+    """
+    Open a span around every coroutine method of a client instance
+
+    Like metrics.instrument, the bound methods are replaced on the shared
+    instance, so callers need no changes. Spans are named "dependency.operation".
+    """
+    if methods is None:
+        methods = [
+            name for name, _ in inspect.getmembers(type(target), inspect.iscoroutinefunction)
+            if not name.startswith("_")
+        ]
+
+    def wrap(name: str, method: Callable) -> Callable:
+        @wraps(method)
+        async def spanned(*args, **kwargs):
+            if tracer.current_span() is None:
+                return await method(*args, **kwargs)
+            label = operation(name, args) if operation else name
+            with tracer.span(f"{dependency}.{label}", dependency=dependency):
+                return await method(*args, **kwargs)
+        return spanned
+
+    for name in methods:
+        setattr(target, name, wrap(name, getattr(target, name)))
+
+
+def trace_app():
+    """Wrap the upstream clients and configure exporters; safe to call more than once"""
+    global _traced
+    if _traced:
+        return
+    _traced = True
+
+    from services.pledge_client import pledge_client
+    from services.supabase_client import supabase_service
+    from services.plaid_client import plaid_client
+
+    traced(pledge_client, "pledge")
+    traced(supabase_service, "supabase")
+    traced(plaid_client, "plaid", methods=["call"], operation=lambda name, args: args[0])
+
+    for name in settings.TRACING_EXPORTERS.split(","):
+        name = name.strip()
+        if name == "ring":
+            tracer.add_exporter(ring_buffer)
+        elif name == "log":
+            tracer.add_exporter(LoggingExporter())
+        elif name:
+            logger.warning("Unknown trace exporter: %s", name)
+
+
+_traced = False
+
+# Global instances
+ring_buffer = RingBufferExporter()
+tracer = Tracer()
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import date
+from typing import Any, AsyncIterator, List, Optional
+from config import settings
+from services.plaid_client import plaid_client
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionPager:
+    """Fetches a transactions_get window page by page with bounded concurrency"""
+
+    def __init__(self):
+        self.page_size = settings.PLAID_TRANSACTIONS_PAGE_SIZE
+        self.concurrency = settings.PLAID_PAGINATION_CONCURRENCY
+
+    async def get_page(
+        self,
+        access_token: str,
+        start_date: str,
+        end_date: str,
+        offset: int,
+        account_ids: Optional[List[str]] = None
+    ) -> Any:
+        """Fetch a single transactions_get page starting at offset"""
+        from plaid.model.transactions_get_request import TransactionsGetRequest
+        from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
+
+        options = TransactionsGetRequestOptions(count=self.page_size, offset=offset)
+        if account_ids:
+            options.account_ids = account_ids
+
+        request = TransactionsGetRequest(
+            access_token=access_token,
+            start_date=date.fromisoformat(start_date),
+            end_date=date.fromisoformat(end_date),
+            options=options
+        )
+        return await plaid_client.call("transactions_get", request)
+
+    async def iter_pages(
+        self,
+        first_page: Any,
+        access_token: str,
+        start_date: str,
+        end_date: str,
+        account_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[List[Any]]:
+        """
+        Yield every page of a window, in offset order, starting with first_page
+
+        The remaining pages are worked out from total_transactions in the first
+        response and fetched concurrently, with at most PLAID_PAGINATION_CONCURRENCY
+        requests outstanding so a slow consumer never buffers the whole window.
+
+        Args:
+            first_page: The transactions_get response for offset 0
+            access_token: The Plaid access token for the user's item
+            start_date: Window start date (YYYY-MM-DD)
+            end_date: Window end date (YYYY-MM-DD)
+            account_ids: Optional account IDs to restrict the window to
+
+        Yields:
+            Lists of Plaid Transaction models, one list per page
+        """
+        total = first_page['total_transactions']
+        first_transactions = first_page['transactions']
+        yield first_transactions
+
+        offsets = deque(range(len(first_transactions), total, self.page_size))
+        if offsets:
+            logger.info("Fetching %s more transaction pages (%s transactions) with concurrency %s", len(offsets), total, self.concurrency)
+
+        pending: deque = deque()
+        try:
+            while offsets or pending:
+                while offsets and len(pending) < self.concurrency:
+                    offset = offsets.popleft()
+                    pending.append(asyncio.create_task(
+                        self.get_page(access_token, start_date, end_date, offset, account_ids)
+                    ))
+
+                response = await pending.popleft()
+                yield response['transactions']
+        finally:
+            for task in pending:
+                task.cancel()
+
+
+# Global instance
+transaction_pager = TransactionPager()
@@ -0,0 +1,267 @@
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from services.sqlite_db import SQLiteDatabase, local_db
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS plaid_transactions (
+    transaction_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    account_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    pending INTEGER NOT NULL DEFAULT 0,
+    pending_transaction_id TEXT,
+    merchant_name TEXT,
+    category TEXT,
+    payload TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plaid_transactions_user_date ON plaid_transactions (user_id, date);
+CREATE INDEX IF NOT EXISTS idx_plaid_transactions_account ON plaid_transactions (account_id);
+
+CREATE TABLE IF NOT EXISTS plaid_sync_cursors (
+    user_id TEXT PRIMARY KEY,
+    cursor TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS plaid_items (
+    item_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    linked_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_plaid_items_user ON plaid_items (user_id);
+
+CREATE TABLE IF NOT EXISTS plaid_transactions_to_donate (
+    user_id TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, transaction_id)
+);
+
+CREATE TABLE IF NOT EXISTS plaid_transactions_removed (
+    user_id TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    PRIMARY KEY (user_id, transaction_id)
+);
+"""
+
+
+def _row_values(user_id: str, transaction: Dict[str, Any], updated_at: str) -> tuple:
+    """Flatten a Plaid transaction dict into plaid_transactions column values"""
+    category = None
+    personal_finance_category = transaction.get('personal_finance_category')
+    if personal_finance_category:
+        category = personal_finance_category.get('primary')
+
+    return (
+        transaction['transaction_id'],
+        user_id,
+        transaction['account_id'],
+        str(transaction['date']),
+        float(transaction['amount']),
+        1 if transaction.get('pending') else 0,
+        transaction.get('pending_transaction_id'),
+        transaction.get('merchant_name') or transaction.get('name'),
+        category,
+        json.dumps(transaction, default=str),
+        updated_at
+    )
+
+
+class TransactionStore:
+    """Local store of Plaid transactions kept up to date by transactions/sync"""
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+        self._schema_ready = False
+
+    def _ensure_schema(self):
+        if not self._schema_ready:
+            self.db.ensure_schema(SCHEMA)
+            self._schema_ready = True
+
+    def get_cursor(self, user_id: str) -> Optional[str]:
+        """Get the stored transactions/sync cursor for a user's item"""
+        self._ensure_schema()
+        rows = self.db.execute("SELECT cursor FROM plaid_sync_cursors WHERE user_id = ?", (user_id,))
+        return rows[0]['cursor'] if rows else None
+
+    def _upsert(self, connection, rows: List[tuple]):
+        connection.executemany(
+            """
+            INSERT INTO plaid_transactions (
+                transaction_id, user_id, account_id, date, amount, pending,
+                pending_transaction_id, merchant_name, category, payload, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (transaction_id) DO UPDATE SET
+                account_id = excluded.account_id,
+                date = excluded.date,
+                amount = excluded.amount,
+                pending = excluded.pending,
+                pending_transaction_id = excluded.pending_transaction_id,
+                merchant_name = excluded.merchant_name,
+                category = excluded.category,
+                payload = excluded.payload,
+                updated_at = excluded.updated_at
+            """,
+            rows
+        )
+
+    def apply_sync(
+        self,
+        user_id: str,
+        added: List[Dict[str, Any]],
+        modified: List[Dict[str, Any]],
+        removed: List[str],
+        next_cursor: str
+    ):
+        """
+        Apply a transactions/sync delta and advance the cursor in one transaction
+
+        Args:
+            user_id: The user the item belongs to
+            added: Newly added Plaid transactions
+            modified: Plaid transactions that changed since the last sync
+            removed: IDs of transactions Plaid no longer reports
+            next_cursor: Cursor to resume from on the next sync
+        """
+        self._ensure_schema()
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [_row_values(user_id, transaction, now) for transaction in added + modified]
+
+        with self.db.transaction() as connection:
+            if rows:
+                self._upsert(connection, rows)
+            if added:
+                # Kept until the purchase has been evaluated for an auto-donation, so a
+                # failure after the cursor moves on does not lose it
+                connection.executemany(
+                    "INSERT OR IGNORE INTO plaid_transactions_to_donate (user_id, transaction_id) VALUES (?, ?)",
+                    [(user_id, transaction['transaction_id']) for transaction in added]
+                )
+            if removed:
+                removed_keys = [(transaction_id, user_id) for transaction_id in removed]
+                connection.executemany(
+                    "DELETE FROM plaid_transactions WHERE transaction_id = ? AND user_id = ?",
+                    removed_keys
+                )
+                connection.executemany(
+                    "DELETE FROM plaid_transactions_to_donate WHERE transaction_id = ? AND user_id = ?",
+                    removed_keys
+                )
+                # Kept until a donation made on a removed pending transaction has been reconciled
+                connection.executemany(
+                    "INSERT OR IGNORE INTO plaid_transactions_removed (user_id, transaction_id) VALUES (?, ?)",
+                    [(user_id, transaction_id) for transaction_id in removed]
+                )
+            connection.execute(
+                """
+                INSERT INTO plaid_sync_cursors (user_id, cursor, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET cursor = excluded.cursor, updated_at = excluded.updated_at
+                """,
+                (user_id, next_cursor, now)
+            )
+
+        logger.info("Applied sync for user %s: %s added, %s modified, %s removed", user_id, len(added), len(modified), len(removed))
+
+    def get_transactions_to_donate(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get a user's synced transactions that have not been evaluated for auto-donations yet"""
+        self._ensure_schema()
+        rows = self.db.execute(
+            """
+            SELECT t.payload FROM plaid_transactions_to_donate d
+            JOIN plaid_transactions t ON t.transaction_id = d.transaction_id AND t.user_id = d.user_id
+            WHERE d.user_id = ?
+            ORDER BY t.date, t.transaction_id
+            """,
+            (user_id,)
+        )
+        return [json.loads(row['payload']) for row in rows]
+
+    def get_removed_transaction_ids(self, user_id: str) -> List[str]:
+        """Get IDs of transactions removed by a sync whose donations have not been reconciled yet"""
+        self._ensure_schema()
+        rows = self.db.execute("SELECT transaction_id FROM plaid_transactions_removed WHERE user_id = ?", (user_id,))
+        return [row['transaction_id'] for row in rows]
+
+    def mark_donations_evaluated(self, user_id: str, transaction_ids: List[str], removed_ids: List[str]):
+        """Take transactions off the lists returned by get_transactions_to_donate and get_removed_transaction_ids"""
+        self._ensure_schema()
+        with self.db.transaction() as connection:
+            connection.executemany(
+                "DELETE FROM plaid_transactions_to_donate WHERE user_id = ? AND transaction_id = ?",
+                [(user_id, transaction_id) for transaction_id in transaction_ids]
+            )
+            connection.executemany(
+                "DELETE FROM plaid_transactions_removed WHERE user_id = ? AND transaction_id = ?",
+                [(user_id, transaction_id) for transaction_id in removed_ids]
+            )
+
+    def insert_transactions(self, user_id: str, transactions: List[Dict[str, Any]]):
+        """Upsert transactions directly, without touching the sync cursor"""
+        self._ensure_schema()
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [_row_values(user_id, transaction, now) for transaction in transactions]
+        with self.db.transaction() as connection:
+            self._upsert(connection, rows)
+
+    def get_transactions(
+        self,
+        user_id: str,
+        start_date: str,
+        end_date: str,
+        account_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a user's stored transactions in a date range, newest first"""
+        self._ensure_schema()
+        sql = "SELECT payload FROM plaid_transactions WHERE user_id = ? AND date BETWEEN ? AND ?"
+        params: List[Any] = [user_id, start_date, end_date]
+
+        if account_ids:
+            sql += f" AND account_id IN ({', '.join('?' for _ in account_ids)})"
+            params.extend(account_ids)
+
+        sql += " ORDER BY date DESC, transaction_id"
+        rows = self.db.execute(sql, params)
+        return [json.loads(row['payload']) for row in rows]
+
+    def link_item(self, user_id: str, item_id: str):
+        """Record which user a Plaid item belongs to (webhooks only carry the item_id)"""
+        self._ensure_schema()
+        self.db.execute(
+            """
+            INSERT INTO plaid_items (item_id, user_id, linked_at) VALUES (?, ?, ?)
+            ON CONFLICT (item_id) DO UPDATE SET user_id = excluded.user_id
+            """,
+            (item_id, user_id, datetime.now(timezone.utc).isoformat())
+        )
+
+    def get_item(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """Get the user and link time for a Plaid item"""
+        self._ensure_schema()
+        rows = self.db.execute("SELECT user_id, linked_at FROM plaid_items WHERE item_id = ?", (item_id,))
+        return dict(rows[0]) if rows else None
+
+    def get_linked_at(self, user_id: str) -> Optional[str]:
+        """Get when the user's Plaid item was linked"""
+        self._ensure_schema()
+        rows = self.db.execute("SELECT MIN(linked_at) AS linked_at FROM plaid_items WHERE user_id = ?", (user_id,))
+        return rows[0]['linked_at'] if rows else None
+
+    def delete_user(self, user_id: str):
+        """Remove all stored transactions, items and the sync cursor for a user"""
+        self._ensure_schema()
+        with self.db.transaction() as connection:
+            connection.execute("DELETE FROM plaid_transactions WHERE user_id = ?", (user_id,))
+            connection.execute("DELETE FROM plaid_sync_cursors WHERE user_id = ?", (user_id,))
+            connection.execute("DELETE FROM plaid_items WHERE user_id = ?", (user_id,))
+            connection.execute("DELETE FROM plaid_transactions_to_donate WHERE user_id = ?", (user_id,))
+            connection.execute("DELETE FROM plaid_transactions_removed WHERE user_id = ?", (user_id,))
+
+
+# Global instance
+transaction_store = TransactionStore(local_db)
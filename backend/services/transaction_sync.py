@@ -0,0 +1,119 @@
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from config import settings
+from services.lazy import lazy_import
+from services.plaid_client import plaid_client
+from services.transaction_store import transaction_store
+from services.purchase_donations import purchase_donation_service
+
+logger = logging.getLogger(__name__)
+
+plaid = lazy_import("plaid")
+
+# Plaid returns this when the item changed while we were paging; the whole
+# pagination loop has to restart from the cursor we started with.
+MUTATION_DURING_PAGINATION = "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"
+MAX_SYNC_RESTARTS = 3
+
+
+def _plaid_error_code(error: "plaid.ApiException") -> Optional[str]:
+    """Extract the Plaid error_code from an API exception body"""
+    try:
+        return json.loads(error.body).get('error_code')
+    except Exception:
+        return None
+
+
+class TransactionSyncService:
+    """Incrementally ingests Plaid transactions using transactions/sync cursors"""
+
+    def __init__(self):
+        self.page_size = settings.PLAID_SYNC_PAGE_SIZE
+        self._user_locks: Dict[str, asyncio.Lock] = {}
+
+    def _get_user_lock(self, user_id: str) -> asyncio.Lock:
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        return lock
+
+    async def _fetch_delta(self, access_token: str, cursor: Optional[str]) -> Dict[str, Any]:
+        """Page through transactions/sync from a cursor until has_more is false"""
+        from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+        added: List[Dict[str, Any]] = []
+        modified: List[Dict[str, Any]] = []
+        removed: List[str] = []
+        pages = 0
+
+        while True:
+            request = TransactionsSyncRequest(access_token=access_token, count=self.page_size)
+            if cursor:
+                request.cursor = cursor
+
+            response = await plaid_client.call("transactions_sync", request)
+            pages += 1
+
+            added.extend(transaction.to_dict() for transaction in response['added'])
+            modified.extend(transaction.to_dict() for transaction in response['modified'])
+            removed.extend(transaction['transaction_id'] for transaction in response['removed'])
+            cursor = response['next_cursor']
+
+            if not response['has_more']:
+                break
+
+        return {
+            "added": added,
+            "modified": modified,
+            "removed": removed,
+            "next_cursor": cursor,
+            "pages": pages
+        }
+
+    async def sync_user(self, user_id: str, access_token: str) -> Dict[str, Any]:
+        """
+        Bring the local transaction store up to date for a user
+
+        Concurrent syncs for the same user are serialized so the cursor only
+        ever moves forward once per delta. Every sync then donates on the
+        purchases it stored, so it does not matter which caller fetched them.
+
+        Args:
+            user_id: The user whose item should be synced
+            access_token: The Plaid access token for the user's item
+
+        Returns:
+            Dictionary with the added and modified transactions, removed IDs and
+            the number of auto-donations created
+
+        Raises:
+            plaid.ApiException: If the Plaid API request fails
+        """
+        async with self._get_user_lock(user_id):
+            start_cursor = await asyncio.to_thread(transaction_store.get_cursor, user_id)
+
+            for attempt in range(MAX_SYNC_RESTARTS):
+                try:
+                    delta = await self._fetch_delta(access_token, start_cursor)
+                    break
+                except plaid.ApiException as e:
+                    if _plaid_error_code(e) != MUTATION_DURING_PAGINATION or attempt == MAX_SYNC_RESTARTS - 1:
+                        raise
+                    logger.info("Transactions changed during sync pagination for user %s, restarting", user_id)
+
+            await asyncio.to_thread(
+                transaction_store.apply_sync,
+                user_id,
+                delta['added'],
+                delta['modified'],
+                delta['removed'],
+                delta['next_cursor']
+            )
+            delta['donations_created'] = await purchase_donation_service.process(user_id)
+            return delta
+
+
+# Global instance
+transaction_sync_service = TransactionSyncService()
@@ -0,0 +1,155 @@
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+from config import settings
+from models import WebhookRequest
+from services.supabase_client import supabase_service
+from services.transaction_store import transaction_store
+from services.transaction_sync import transaction_sync_service
+from services.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookQueue:
+    """
+    In-process work queue for Plaid TRANSACTIONS webhooks.
+
+    Workers sync the item's new transactions, which creates auto-donations for
+    new purchases server-side, so clients no longer need to poll /auto_donate.
+
+    A sync fetches everything new since the stored cursor, so an event for an
+    item that already has one waiting in the queue adds nothing and is
+    dropped. Plaid retries and repeated SYNC_UPDATES_AVAILABLE webhooks
+    collapse this way without dropping an update that arrives once its sync
+    has started.
+    """
+
+    def __init__(self):
+        self.worker_count = settings.WEBHOOK_WORKERS
+        self.max_size = settings.WEBHOOK_QUEUE_SIZE
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._queued_items: Set[str] = set()
+
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.donations_created = 0
+        self._total_latency_seconds = 0.0
+        self._max_latency_seconds = 0.0
+        self._total_processing_seconds = 0.0
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_size)
+        return self._queue
+
+    async def start(self):
+        """Start the worker tasks"""
+        for index in range(self.worker_count):
+            self._workers.append(asyncio.create_task(self._worker(index)))
+        logger.info("Started %s webhook workers", self.worker_count)
+
+    async def stop(self, timeout: float = 10.0):
+        """Give queued events up to timeout seconds to finish, then stop the workers"""
+        if self._workers:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Stopping webhook workers with %s events still queued", self.queue.qsize())
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+
+    def full(self) -> bool:
+        """Check whether the queue can accept another event"""
+        return self.queue.full()
+
+    def is_queued(self, item_id: str) -> bool:
+        """Check whether an event for the item is waiting in the queue, counting the check as coalesced if so"""
+        if item_id in self._queued_items:
+            self.coalesced += 1
+            return True
+        return False
+
+    def enqueue(self, event: WebhookRequest) -> bool:
+        """
+        Add a webhook event to the queue
+
+        Returns:
+            True if the event was queued, False if the queue is full
+        """
+        try:
+            self.queue.put_nowait((time.monotonic(), event))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self._queued_items.add(event.data.get('item_id'))
+        self.enqueued += 1
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            enqueued_at, event = await self.queue.get()
+            # Events arriving from now on may carry changes this sync misses, so they are queued again
+            self._queued_items.discard(event.data.get('item_id'))
+            started_at = time.monotonic()
+            try:
+                with tracer.start_trace(f"webhook {event.event_type}", item_id=event.data.get('item_id')):
+                    await self.process(event)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error("Webhook worker %s failed to process %s: %s", index, event.event_type, e)
+            finally:
+                finished_at = time.monotonic()
+                latency = finished_at - enqueued_at
+                self._total_latency_seconds += latency
+                self._max_latency_seconds = max(self._max_latency_seconds, latency)
+                self._total_processing_seconds += finished_at - started_at
+                self.queue.task_done()
+
+    async def process(self, event: WebhookRequest):
+        """Sync the webhook's item and create auto-donations for new purchases"""
+        item_id = event.data.get('item_id')
+        item = await asyncio.to_thread(transaction_store.get_item, item_id)
+        if not item:
+            logger.warning("Received %s for unknown item: %s", event.event_type, item_id)
+            return
+
+        user_id = item['user_id']
+        access_token = await supabase_service.get_access_token(user_id)
+        if not access_token:
+            logger.warning("No access token available for user %s, skipping %s", user_id, event.event_type)
+            return
+
+        delta = await transaction_sync_service.sync_user(user_id, access_token)
+        self.donations_created += delta['donations_created']
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and processing latency metrics"""
+        finished = self.processed + self.failed
+        return {
+            "workers": len(self._workers),
+            "depth": self.queue.qsize(),
+            "max_size": self.max_size,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "coalesced": self.coalesced,
+            "donations_created": self.donations_created,
+            "avg_latency_seconds": self._total_latency_seconds / finished if finished else 0.0,
+            "max_latency_seconds": self._max_latency_seconds,
+            "avg_processing_seconds": self._total_processing_seconds / finished if finished else 0.0
+        }
+
+
+# Global instance
+webhook_queue = WebhookQueue()
@@ -212,6 +212,14 @@ async def test_endpoints():
             print(f"Status: {response.status_code}")
             print(f"Response: {json.dumps(response.json(), indent=2)}\n")
             
+            if response.status_code == 202:
+                # Auto-donations are processed in the background
+                await asyncio.sleep(2)
+                job_id = response.json()["job_id"]
+                response = await client.get(f"{base_url}/api/v1/jobs/{job_id}", timeout=30.0)
+                print(f"Job status: {response.status_code}")
+                print(f"Response: {json.dumps(response.json(), indent=2)}\n")
+            
             # Test get transactions
             print("17. Testing get transactions...")
             get_transactions_data = {
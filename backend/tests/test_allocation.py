@@ -0,0 +1,81 @@
+"""
+Property-based tests for the allocation engine (services/allocation.py).
+
+Run from the backend directory:
+
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+from hypothesis import given, settings, strategies as st
+from services.allocation import allocate_cents, to_cents
+
+# Two-decimal percentages like user_charity_preferences rows, some of them zero
+percentage = st.one_of(st.just(0.0), st.integers(0, 10_000).map(lambda hundredths: hundredths / 100))
+percentages = st.lists(percentage, min_size=1, max_size=10).map(np.array)
+# Cents per transaction, from refunds to totals far beyond any real purchase
+totals = st.lists(st.integers(-10_000, 10**11), min_size=1, max_size=40).map(lambda values: np.array(values, dtype=np.int64))
+non_negative_totals = st.lists(st.integers(0, 10**11), min_size=1, max_size=40).map(lambda values: np.array(values, dtype=np.int64))
+
+
+def effective_weights(percentages: np.ndarray) -> np.ndarray:
+    """Weights allocate_cents works with: hundredths of a percent, or an even split when all are zero"""
+    weights = np.rint(percentages * 100)
+    return weights if weights.sum() > 0 else np.ones(len(percentages))
+
+
+@given(totals, percentages)
+def test_rows_sum_to_their_totals(totals, percentages):
+    allocated = allocate_cents(totals, percentages)
+    assert allocated.shape == (len(totals), len(percentages))
+    assert allocated.dtype == np.int64
+    assert (allocated.sum(axis=1) == totals).all()
+
+
+@given(totals, percentages)
+def test_every_share_is_within_one_cent_of_exact(totals, percentages):
+    allocated = allocate_cents(totals, percentages)
+    weights = effective_weights(percentages)
+    exact = totals[:, None] * (weights / weights.sum())[None, :]
+    assert (np.abs(allocated - exact) < 1 + 1e-6).all()
+
+
+@given(non_negative_totals, percentages)
+def test_non_negative_totals_give_non_negative_shares(totals, percentages):
+    assert (allocate_cents(totals, percentages) >= 0).all()
+
+
+@given(totals, percentages)
+def test_zero_percentages_get_nothing_while_another_charity_has_weight(totals, percentages):
+    allocated = allocate_cents(totals, percentages)
+    if (np.rint(percentages * 100) > 0).any():
+        assert (allocated[:, np.rint(percentages * 100) == 0] == 0).all()
+
+
+@given(non_negative_totals, percentages)
+def test_larger_percentage_never_receives_less(totals, percentages):
+    allocated = allocate_cents(totals, percentages)
+    weights = effective_weights(percentages)
+    # Ascending weight, and for equal weights the later charity first, since earlier charities win ties
+    order = np.lexsort((-np.arange(len(weights)), weights))
+    assert (np.diff(allocated[:, order], axis=1) >= 0).all()
+
+
+@given(totals, percentages)
+def test_deterministic_and_independent_of_batching(totals, percentages):
+    allocated = allocate_cents(totals, percentages)
+    assert (allocate_cents(totals, percentages) == allocated).all()
+    assert (np.vstack([allocate_cents([total], percentages) for total in totals]) == allocated).all()
+
+
+@settings(max_examples=200)
+@given(st.lists(st.integers(-10**9, 10**9), min_size=1, max_size=50))
+def test_to_cents_is_exact_for_two_decimal_amounts(cents):
+    assert to_cents([value / 100 for value in cents]).tolist() == cents
+
+
+def test_rejects_empty_and_negative_allocations():
+    with pytest.raises(ValueError):
+        allocate_cents([100], [])
+    with pytest.raises(ValueError):
+        allocate_cents([100], [50, -10])
@@ -0,0 +1,56 @@
+"""
+Tests for synthetic transaction generation (services/sandbox_generator.py).
+
+Run from the backend directory:
+
+    python -m pytest tests
+"""
+import asyncio
+from datetime import date
+import pytest
+from services import sandbox_generator as generator_module
+from services.sandbox_generator import generate_transactions, sandbox_generator
+from services.sqlite_db import SQLiteDatabase
+from services.transaction_store import TransactionStore
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    db = SQLiteDatabase(str(tmp_path / "transactions.db"))
+    store = TransactionStore(db)
+    monkeypatch.setattr(generator_module, "transaction_store", store)
+    monkeypatch.setenv("PLAID_ENV", "sandbox")
+    yield store
+    db.close()
+
+
+def test_same_inputs_generate_the_same_transactions():
+    start, end = date(2024, 1, 1), date(2024, 3, 31)
+    assert generate_transactions("alice", 50, 7, start, end) == generate_transactions("alice", 50, 7, start, end)
+
+
+def test_transaction_ids_differ_between_users():
+    start, end = date(2024, 1, 1), date(2024, 3, 31)
+    alice = {transaction['transaction_id'] for transaction in generate_transactions("alice", 50, 0, start, end)}
+    bob = {transaction['transaction_id'] for transaction in generate_transactions("bob", 50, 0, start, end)}
+    assert len(alice) == len(bob) == 50
+    assert not alice & bob
+
+
+def test_each_user_owns_their_generated_rows(store):
+    for user_id in ("alice", "bob"):
+        result = asyncio.run(sandbox_generator.generate(
+            user_id, 25, seed=0, start_date="2024-01-01", end_date="2024-03-31"
+        ))
+        assert result['count'] == 25
+
+    for user_id in ("alice", "bob"):
+        transactions = store.get_transactions(user_id, "2024-01-01", "2024-03-31")
+        assert len(transactions) == 25
+        assert all(transaction['transaction_id'].startswith(f"synthetic_{user_id}_") for transaction in transactions)
+
+
+def test_generation_is_refused_outside_sandbox(store, monkeypatch):
+    monkeypatch.setenv("PLAID_ENV", "production")
+    with pytest.raises(PermissionError):
+        asyncio.run(sandbox_generator.generate("alice", 5))